@@ -0,0 +1,63 @@
+# async_fetch.py
+# -*- coding: utf-8 -*-
+# asyncio 并发抓取：多个 UID 的动态列表同时请求，受在途请求数与每秒请求数双重限制
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bili_api import _log_message, get_up_dynamics, get_wbi_keys_cached
+
+
+class AsyncFetcher:
+    """在独立线程池中执行阻塞的 requests 调用，由 asyncio 负责并发度 (max_in_flight) 与速率 (max_rps) 控制。"""
+
+    def __init__(self, session, log_queue=None, stop_event=None, max_in_flight=4, max_rps=2.0):
+        self.session = session; self.log_queue = log_queue; self.stop_event = stop_event
+        self.max_in_flight = max(1, int(max_in_flight)); self.max_rps = float(max_rps) if max_rps and max_rps > 0 else 0.0
+        self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="bili-fetch")
+        self._next_slot = 0.0  # 下一个允许发出请求的 monotonic 时间，跨轮次保留
+
+    def _stopped(self):
+        return self.stop_event is not None and self.stop_event.is_set()
+
+    async def _throttle(self, rate_lock):
+        """按 max_rps 均匀分配请求发出时间"""
+        if not self.max_rps: return
+        async with rate_lock:
+            wait = self._next_slot - time.monotonic()
+            if wait > 0: await asyncio.sleep(wait)
+            self._next_slot = max(time.monotonic(), self._next_slot) + 1.0 / self.max_rps
+
+    async def get_wbi_keys_async(self):
+        """在线程池中获取/刷新 Wbi Keys"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, get_wbi_keys_cached, self.session, self.log_queue, self.stop_event)
+
+    async def get_up_dynamics_async(self, host_mid, offset="", semaphore=None, rate_lock=None, since_id=None, watch_ids=None):
+        """get_up_dynamics 的异步版本，返回值与其一致"""
+        semaphore = semaphore or asyncio.Semaphore(self.max_in_flight); rate_lock = rate_lock or asyncio.Lock()
+        async with semaphore:
+            if self._stopped(): return None, None, None, None
+            await self._throttle(rate_lock)
+            if self._stopped(): return None, None, None, None
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, get_up_dynamics, self.session, host_mid, offset, self.log_queue, self.stop_event, since_id, watch_ids)
+
+    async def scan_uids(self, uids, offset="", since_ids=None, watch_ids=None):
+        """并发获取多个 UID 的动态页，返回 {uid: (items, next_offset, has_more, uname)}；since_ids / watch_ids 按 UID 传给 get_up_dynamics"""
+        since_ids = since_ids or {}; watch_ids = watch_ids or {}
+        if not uids: return {}
+        await self.get_wbi_keys_async()  # 预热 Wbi Keys，避免所有任务同时排队刷新
+        semaphore = asyncio.Semaphore(self.max_in_flight); rate_lock = asyncio.Lock()
+        results = await asyncio.gather(*(self.get_up_dynamics_async(uid, offset, semaphore, rate_lock, since_ids.get(uid), watch_ids.get(uid)) for uid in uids))
+        return dict(zip(uids, results))
+
+    def scan_uids_blocking(self, uids, offset="", since_ids=None, watch_ids=None):
+        """供同步线程调用的入口"""
+        start_time = time.time(); results = asyncio.run(self.scan_uids(list(uids), offset, since_ids, watch_ids))
+        _log_message(self.log_queue, f"并发扫描 {len(results)} 个 UID 完成 (并发 {self.max_in_flight}, 速率 {self.max_rps or '不限'}/秒)，耗时 {time.time() - start_time:.2f} 秒", target_uid='main')
+        return results
+
+    def close(self):
+        self._executor.shutdown(wait=False)
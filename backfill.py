@@ -0,0 +1,92 @@
+# backfill.py
+# -*- coding: utf-8 -*-
+# 深度回溯：按 offset/has_more 逐页向前翻动态，需要点赞的动态作为积压放入点赞队列 (边入队边预取下一页)，按页记录断点
+
+import queue
+import random
+import threading
+
+from bili_api import _log_message, get_up_dynamics
+
+
+def prefetch(iterable, stop_event, depth=1):
+    """在后台线程中提前迭代 iterable (最多领先 depth 个元素)，使消费端的处理与下一次网络请求重叠"""
+    buffer = queue.Queue(maxsize=depth); finished = object(); closed = threading.Event()
+
+    def _put(entry):
+        while not (stop_event.is_set() or closed.is_set()):
+            try: buffer.put(entry, timeout=0.2); return True
+            except queue.Full: continue
+        return False
+
+    def _worker():
+        try:
+            for element in iterable:
+                if not _put((None, element)): return
+        except BaseException as e: _put((e, None))
+        finally: _put((None, finished))
+
+    threading.Thread(target=_worker, daemon=True, name="backfill-prefetch").start()
+    try:
+        while not stop_event.is_set():
+            try: error, element = buffer.get(timeout=0.2)
+            except queue.Empty: continue
+            if error is not None: raise error
+            if element is finished: return
+            yield element
+    finally: closed.set()  # 消费端提前结束时通知后台线程不再预取
+
+
+class Backfiller:
+    """对单个 UID 执行回溯。enqueue_func(record, uid) 把需要点赞的动态放入点赞队列，返回是否为新条目；点赞由点赞线程完成。
+    wait_capacity() 在每次入队前调用，可阻塞到允许继续入队，返回 False 时结束回溯 (初始点赞额度已用完或被停止)；
+    state_store 可选，用于保存翻页断点。"""
+
+    def __init__(self, session, enqueue_func, log_queue=None, stop_event=None, state_store=None, page_delay=(1.5, 3.5), wait_capacity=None):
+        self.session = session; self.enqueue_func = enqueue_func; self.log_queue = log_queue
+        self.stop_event = stop_event if stop_event is not None else threading.Event(); self.state_store = state_store
+        self.page_delay = page_delay; self.wait_capacity = wait_capacity or (lambda: True); self.exhausted = False
+
+    def iter_pages(self, uid, start_offset):
+        """逐页产出 (本页 offset, 动态列表, 下一页 offset, has_more)，请求失败时结束"""
+        offset = start_offset
+        while not self.stop_event.is_set():
+            items, next_offset, has_more, _ = get_up_dynamics(self.session, uid, offset, self.log_queue, self.stop_event)
+            if items is None: _log_message(self.log_queue, f"回溯: 获取 offset={offset!r} 失败，停止回溯。", target_uid=uid); return
+            yield offset, items, next_offset, has_more
+            if not has_more or not next_offset: return
+            offset = next_offset; self.stop_event.wait(timeout=random.uniform(*self.page_delay))
+
+    def resume_offset(self, uid, first_page_next_offset=None):
+        """返回本次回溯的起始 offset；已回溯完毕或没有更多页时返回 None"""
+        checkpoint = self.state_store.load_backfill_checkpoint(uid) if self.state_store else None
+        if checkpoint:
+            next_offset, done = checkpoint
+            if done: return None
+            _log_message(self.log_queue, f"回溯: 从断点 offset={next_offset!r} 继续。", target_uid=uid)
+            return next_offset
+        return first_page_next_offset or None
+
+    def _checkpoint(self, uid, next_offset, done):
+        if self.state_store: self.state_store.set_backfill_checkpoint(uid, next_offset, done); self.state_store.flush()
+
+    def run_uid(self, uid, start_offset, max_items=None, since_ts=None):
+        """从 start_offset 开始回溯，最多入队 max_items 条 (None 不限)，遇到早于 since_ts 的动态停止；返回入队条数。
+        一页全部入队后断点才前进 (队列本身已持久化)；中途停止时断点仍指向该页，重新处理时已在队列中或已点赞的动态不会重复入队"""
+        stop_event = self.stop_event; queued = 0; pages = 0
+        if start_offset is None or (max_items is not None and max_items <= 0): return 0
+        for offset, items, next_offset, has_more in prefetch(self.iter_pages(uid, start_offset), stop_event):
+            pages += 1; reached_date = False; interrupted = False
+            for record in items:
+                if since_ts and record.pub_ts and record.pub_ts < since_ts and not record.pinned: reached_date = True; break
+                if not record.needs_like: continue
+                if (max_items is not None and queued >= max_items) or stop_event.is_set(): interrupted = True; break
+                if not self.wait_capacity(): self.exhausted = True; interrupted = True; break
+                if self.enqueue_func(record, uid): queued += 1
+            if interrupted: self._checkpoint(uid, offset, False); break
+            done = reached_date or not has_more or not next_offset
+            self._checkpoint(uid, next_offset, done)
+            if done: _log_message(self.log_queue, f"回溯: {'已到达日期下限' if reached_date else '已无更多动态'}，回溯完成。", target_uid=uid); break
+            if max_items is not None and queued >= max_items: break
+        _log_message(self.log_queue, f"回溯: 处理 {pages} 页，加入点赞队列 {queued} 条。", target_uid=uid)
+        return queued
@@ -0,0 +1,135 @@
+# bench_e2e.py
+# -*- coding: utf-8 -*-
+# 端到端吞吐基准：在本地模拟服务器 (mock_server.py) 上测量首页扫描耗时、监控轮次耗时与点赞速率。
+# 运行真实的 LikerEngine.run (扫描与点赞线程并行，等待间隔全部为 0)，通过 on_round / on_progress 回调计时，结果可保存为 JSON 并与上一次运行对比。
+# 用法: python bench_e2e.py --uids 50 --concurrency 8 --latency 0.05 --output bench_output.txt [--compare 上次结果.json] [--monitor feed]
+
+import argparse
+import json
+import sys
+import threading
+import time
+
+from engine import LikerEngine
+from http_session import session_stats
+from mock_server import MOCK_CSRF, MockBiliServer, mock_session
+from rate_limit import DEFAULT_BUCKETS, RateLimiter
+
+# 越大越好的指标 (对比时用于判断“变好/变差”)
+HIGHER_IS_BETTER = {"phase1_uids_per_s", "likes_per_s"}
+# 点赞线程的请求 (不计入监控轮次的请求数)
+LIKE_PATHS = {"/dynamic_like/v1/dynamic_like/thumb", "/dynamic_svr/v1/dynamic_svr/get_dynamic_detail"}
+
+
+class _DiscardLog:
+    """丢弃引擎日志，避免打印本身影响计时"""
+    def put(self, entry, block=True, timeout=None): pass
+
+
+def _remove_rate_limits(rate_limiter):
+    for endpoint in list(DEFAULT_BUCKETS) + ["qrcode_poll"]: rate_limiter.configure(endpoint, 1e6, capacity=1e6)
+
+
+class _RunRecorder:
+    """LikerEngine 的 on_round / on_progress 回调：记录首页扫描与各监控轮次的耗时、入队数和扫描请求数，以及每次点赞成功的时间；
+    每个监控轮次开始前为部分 UID 发布新动态，跑完 rounds 个监控轮次后设置 done"""
+
+    def __init__(self, server, uids, rounds, new_posts):
+        self.server = server; self.uids = uids; self.rounds = rounds; self.new_posts = new_posts; self.step = max(1, len(uids) // 4)
+        self.round_times = []; self.queued = []; self.scan_requests = []; self.phase1_ok = 0; self.like_times = []; self.done = threading.Event()
+
+    def scan_request_count(self):
+        return sum(count for path, count in self.server.request_counts.items() if path not in LIKE_PATHS)
+
+    def on_round(self, round_index, seconds, queued):
+        if round_index > self.rounds: return  # 等待点赞完成期间的多余轮次不计
+        self.round_times.append(seconds); self.queued.append(queued); self.scan_requests.append(self.scan_request_count())
+        if round_index == self.rounds: self.done.set(); return
+        for uid in self.uids[round_index % self.step::self.step]: self.server.state.publish(uid, self.new_posts)
+
+    def on_progress(self, uid, liked=0, checked_at=None, **fields):
+        if liked: self.like_times.append(time.perf_counter())
+        elif checked_at is not None and not self.round_times: self.phase1_ok += 1
+
+
+def run_benchmark(args):
+    """在后台线程运行真实的 LikerEngine.run (扫描节奏、轮间等待与点赞间隔均为 0)，跑完首页扫描与 rounds 个监控轮次、
+    并等到入队的动态 (积压最多 --likes 条) 点赞完成后停止引擎"""
+    server = MockBiliServer(latency=args.latency, inject_412=args.inject_412, inject_352=args.inject_352, seed=args.seed,
+                            page_size=args.page_size, initial_posts=args.initial_posts, followed_fraction=args.followed_fraction).start()
+    try:
+        rate_limiter = RateLimiter()  # 基准专用的限流器，通过引擎绑定到会话
+        if not args.realistic_limits: _remove_rate_limits(rate_limiter)
+        if args.breaker_cooldown is not None: rate_limiter.base_cooldown = rate_limiter.cooldown = args.breaker_cooldown
+        elif not args.realistic_limits: rate_limiter.base_cooldown = rate_limiter.cooldown = 1.0
+        session = mock_session(server); stop_event = threading.Event()
+        uids = [str(100000 + index) for index in range(args.uids)]; recorder = _RunRecorder(server, uids, args.rounds, args.new_posts)
+        engine = LikerEngine(session, MOCK_CSRF, _DiscardLog(), stop_event, fetch_concurrency=args.concurrency, fetch_rps=args.rps, monitor_mode=args.monitor,
+                             verify_mode="detail" if args.verify else "deferred", on_progress=recorder.on_progress, on_round=recorder.on_round, rate_limiter=rate_limiter)
+        engine.initial_uid_delay = engine.monitor_uid_delay = engine.poll_jitter = engine.like_delay = (0.0, 0.0)
+        if engine.fanin: engine.fanin.page_delay = (0.0, 0.0)
+
+        thread = threading.Thread(target=engine.run, args=(uids, args.likes, 0.0), name="bench-engine", daemon=True); thread.start()
+        recorder.done.wait(args.timeout)
+        if recorder.queued:
+            expected_likes = min(args.likes, recorder.queued[0]) + sum(recorder.queued[1:]); deadline = time.perf_counter() + args.timeout
+            while len(recorder.like_times) < expected_likes and time.perf_counter() < deadline and thread.is_alive(): time.sleep(0.01)
+        stop_event.set(); thread.join(10)
+
+        phase1_s = recorder.round_times[0] if recorder.round_times else None; round_times = recorder.round_times[1:]
+        monitor_requests = recorder.scan_requests[-1] - recorder.scan_requests[0] if round_times else 0
+        liked = len(recorder.like_times); like_s = recorder.like_times[-1] - recorder.like_times[0] if liked > 1 else 0.0
+        return {
+            "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+            "phase1_scan_s": round(phase1_s, 4) if phase1_s is not None else None, "phase1_uids_ok": recorder.phase1_ok, "phase1_uids_per_s": round(recorder.phase1_ok / phase1_s, 2) if phase1_s else None,
+            "monitor_round_s": [round(value, 4) for value in round_times], "monitor_round_mean_s": round(sum(round_times) / len(round_times), 4) if round_times else None,
+            "monitor_new_dynamics": sum(recorder.queued[1:]), "monitor_requests_per_round": round(monitor_requests / len(round_times), 1) if round_times else None,
+            "likes": liked, "like_total_s": round(like_s, 4), "likes_per_s": round((liked - 1) / like_s, 2) if like_s else None,  # 第一次到最后一次点赞成功之间的速率
+            "server_requests": dict(sorted(server.request_counts.items())), "connections": session_stats(session), "rate_limiter": rate_limiter.state(),
+        }
+    finally: server.stop()
+
+
+def compare(current, previous):
+    """打印与上一次结果的对比"""
+    print("\n与上次结果对比:")
+    for key in ("phase1_scan_s", "phase1_uids_per_s", "monitor_round_mean_s", "monitor_requests_per_round", "likes_per_s"):
+        old = previous.get(key); new = current.get(key)
+        if not old or new is None: continue
+        change = (new - old) / old * 100; better = change > 0 if key in HIGHER_IS_BETTER else change < 0
+        print(f"  {key:<22} {old:>10} -> {new:<10} ({change:+.1f}%{'，变好' if better else '，变差' if change else ''})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="在本地模拟服务器上运行端到端吞吐基准")
+    parser.add_argument("--uids", type=int, default=50, help="模拟 UP 主数量")
+    parser.add_argument("--concurrency", type=int, default=8, help="并发抓取数 (1 为逐个扫描)")
+    parser.add_argument("--rps", type=float, default=0.0, help="并发抓取每秒请求上限 (0 为不限)")
+    parser.add_argument("--rounds", type=int, default=3, help="监控轮次数")
+    parser.add_argument("--monitor", choices=["per_uid", "feed"], default="per_uid", help="监控方式 (同 python -m engine --monitor)")
+    parser.add_argument("--followed-fraction", type=float, default=1.0, help="feed 模式下模拟账号已关注的 UID 比例")
+    parser.add_argument("--new-posts", type=int, default=2, help="每轮为部分 UID 新发布的动态数")
+    parser.add_argument("--likes", type=int, default=30, help="初始点赞数 (首页扫描入队的积压最多点赞这么多条)")
+    parser.add_argument("--verify", action="store_true", help="点赞后请求详情确认 (即 --verify detail，含 1~2 秒等待；默认 deferred)")
+    parser.add_argument("--latency", type=float, default=0.02, help="模拟服务器每个请求的平均延迟秒数")
+    parser.add_argument("--page-size", type=int, default=12); parser.add_argument("--initial-posts", type=int, default=40)
+    parser.add_argument("--inject-412", type=float, default=0.0, help="注入 -412 的概率")
+    parser.add_argument("--inject-352", type=float, default=0.0, help="注入 -352 的概率")
+    parser.add_argument("--realistic-limits", action="store_true", help="保留默认限流速率与熔断冷却 (默认关闭限流，熔断冷却 1 秒，只测代码本身)")
+    parser.add_argument("--breaker-cooldown", type=float, default=None, help="熔断冷却秒数 (覆盖上面的默认值)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="等待监控轮次与点赞完成的最长秒数")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="结果 JSON 写入路径"); parser.add_argument("--compare", help="上一次结果 JSON，打印对比")
+    args = parser.parse_args(argv)
+
+    result = run_benchmark(args)
+    print(json.dumps({key: value for key, value in result.items() if key not in ("config", "rate_limiter")}, ensure_ascii=False, indent=1))
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f: compare(result, json.load(f))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f: json.dump(result, f, ensure_ascii=False, indent=1)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+# bench_parse.py
+# -*- coding: utf-8 -*-
+# 动态列表解析基准：旧实现 (response.json() 完整解码 + 每条一个引用原始 item 的 dict) 与 DynamicRecord 投影解码的对比，
+# 测量每条动态的解析耗时与解析结果常驻内存。可传入抓取保存的 feed/space 响应 JSON 文件 (或包含它们的目录)，否则使用合成页面。
+# 用法: python bench_parse.py [--pages 响应.json 目录 ...] [--synthetic 200] [--repeat 5] [--output bench_parse.json]
+
+import argparse
+import gc
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+from bili_api import _parse_feed_items
+from dynamic_record import JSON_BACKEND, loads
+
+
+def legacy_parse_feed_items(items, host_mid):
+    """改动前的 _parse_feed_items (全量模式)：每条动态一个 dict，并引用整个原始 item"""
+    extracted_list = []; host_uname = f"UID_{host_mid}"
+    for item in items:
+        dynamic_id = item.get("id_str")
+        if not dynamic_id or dynamic_id == "0": continue
+        pub_ts = 0
+        try:
+            author_info = item.get('modules', {}).get('module_author', {})
+            if author_info.get('name'): host_uname = author_info['name']
+            elif item.get('basic', {}).get('name'): host_uname = item['basic']['name']
+            pub_ts = int(author_info.get('pub_ts') or 0)
+        except Exception: pass
+        try: pinned = item.get('modules', {}).get('module_tag', {}).get('text') == "置顶"
+        except AttributeError: pinned = False
+        try: liked = item.get('modules', {}).get('module_stat', {}).get('like_info', {}).get('is_liked') == 1
+        except AttributeError: liked = False
+        extracted_list.append({"dynamic_id": dynamic_id, "needs_like": not liked, "uname": host_uname, "pub_ts": pub_ts, "pinned": pinned, "_item": item})
+    return extracted_list, host_uname, False
+
+
+def _synthetic_item(uid, dynamic_id, pub_ts, index):
+    """字段结构与真实 Polymer 响应一致 (作者装扮、统计、更多菜单等引擎用不到的字段也保留)"""
+    text = f"第 {index} 条合成动态，用于解析基准。" * 3
+    return {
+        "basic": {"comment_id_str": str(dynamic_id), "comment_type": 17, "like_icon": {"action_url": "https://i0.hdslb.com/bfs/garb/item/action.bin", "end_url": "", "id": 0, "start_url": ""}, "rid_str": str(dynamic_id)},
+        "id_str": str(dynamic_id), "type": "DYNAMIC_TYPE_AV" if index % 3 == 0 else "DYNAMIC_TYPE_WORD", "visible": True,
+        "modules": {
+            "module_author": {"avatar": {"container_size": {"height": 1.35, "width": 1.35}, "fallback_layers": {"is_critical_group": True, "layers": [{"general_spec": {"pos_spec": {"axis_x": 0.675, "axis_y": 0.675, "coordinate_pos": 2}, "render_spec": {"opacity": 1}, "size_spec": {"height": 1, "width": 1}}, "layer_config": {"is_critical": True, "tags": {"AVATAR_LAYER": {}, "GENERAL_CFG": {"config_type": 1, "general_config": {"web_css_style": {"borderRadius": "50%"}}}}}, "resource": {"res_image": {"image_src": {"placeholder": 6, "remote": {"bfs_style": "widget-layer-avatar", "url": f"https://i1.hdslb.com/bfs/face/{uid}.jpg"}, "src_type": 1}}, "res_type": 3}, "visible": True}]}, "mid": str(uid)},
+                              "decorate": {"card_url": "https://i0.hdslb.com/bfs/garb/item/card.png", "fan": {"color": "#ff7373", "is_fan": True, "num_str": "012345", "number": 12345}, "id": 1, "jump_url": "https://www.bilibili.com/h5/mall/equity-link/home", "name": "装扮", "type": 3},
+                              "face": f"https://i1.hdslb.com/bfs/face/{uid}.jpg", "face_nft": False, "following": True, "jump_url": f"//space.bilibili.com/{uid}/dynamic", "label": "", "mid": int(uid), "name": f"合成UP主{uid}",
+                              "official_verify": {"desc": "", "type": -1}, "pendant": {"expire": 0, "image": "", "image_enhance": "", "image_enhance_frame": "", "name": "", "pid": 0}, "pub_action": "投稿了视频" if index % 3 == 0 else "", "pub_location_text": "", "pub_time": "3小时前", "pub_ts": pub_ts, "type": "AUTHOR_TYPE_NORMAL",
+                              "vip": {"avatar_subscript": 1, "avatar_subscript_url": "", "due_date": 1767196800000, "label": {"bg_color": "#FB7299", "bg_style": 1, "border_color": "", "img_label_uri_hans": "", "img_label_uri_hans_static": "https://i0.hdslb.com/bfs/vip/label.png", "label_theme": "annual_vip", "path": "", "text": "年度大会员", "text_color": "#FFFFFF", "use_img_label": True}, "nickname_color": "#FB7299", "status": 1, "theme_type": 0, "type": 2}},
+            "module_dynamic": {"additional": None, "desc": {"rich_text_nodes": [{"orig_text": text, "text": text, "type": "RICH_TEXT_NODE_TYPE_TEXT"}], "text": text},
+                               "major": {"archive": {"aid": str(dynamic_id % 10 ** 9), "badge": {"bg_color": "#FB7299", "color": "#FFFFFF", "text": "投稿视频"}, "bvid": "BV1xx411c7mD", "cover": "https://i0.hdslb.com/bfs/archive/cover.jpg", "desc": text, "disable_preview": 0, "duration_text": "10:00", "jump_url": "//www.bilibili.com/video/BV1xx411c7mD/", "stat": {"danmaku": "123", "play": "4567"}, "title": f"合成视频 {index}", "type": 1}, "type": "MAJOR_TYPE_ARCHIVE"} if index % 3 == 0 else None, "topic": None},
+            "module_more": {"three_point_items": [{"label": "取消关注", "type": "THREE_POINT_FOLLOWING"}, {"label": "举报", "type": "THREE_POINT_REPORT"}]},
+            "module_stat": {"comment": {"count": index * 7, "forbidden": False}, "forward": {"count": index, "forbidden": False}, "like_info": {"count": index * 31, "forbidden": False, "status": index % 5 == 0}, "like": {"count": index * 31, "forbidden": False, "status": index % 5 == 0}},
+        },
+    }
+
+
+def synthetic_pages(count, page_size=12):
+    """生成 count 页合成的 feed/space 响应体 (bytes)，返回 [(uid, body)]"""
+    pages = []; dynamic_id = 900000000000000000; now = int(time.time())
+    for page_index in range(count):
+        uid = str(100000 + page_index % 50); items = []
+        for index in range(page_size):
+            dynamic_id += 1000 + index; items.append(_synthetic_item(uid, dynamic_id, now - (page_index * page_size + index) * 600, page_index * page_size + index))
+        body = {"code": 0, "message": "0", "ttl": 1, "data": {"has_more": True, "items": items, "offset": str(dynamic_id), "update_baseline": "", "update_num": 0}}
+        pages.append((uid, json.dumps(body, ensure_ascii=False).encode("utf-8")))
+    return pages
+
+
+def load_pages(paths):
+    """读取抓取保存的响应体；host_mid 取自第一条动态的作者"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path): files += sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith(".json"))
+        else: files.append(path)
+    pages = []
+    for path in files:
+        with open(path, "rb") as f: body = f.read()
+        items = (json.loads(body).get("data") or {}).get("items") or []
+        uid = str((((items[0].get("modules") or {}).get("module_author") or {}).get("mid")) or "0") if items else "0"
+        pages.append((uid, body))
+    return pages
+
+
+def _legacy(pages):
+    return [legacy_parse_feed_items((json.loads(body).get("data") or {}).get("items") or [], uid)[0] for uid, body in pages]
+
+
+def _projected(pages, decode=loads):
+    stop_event = threading.Event()
+    return [_parse_feed_items((decode(body).get("data") or {}).get("items") or [], uid, stop_event)[0] for uid, body in pages]
+
+
+def _time_per_item(func, pages, item_count, repeat):
+    best = None
+    for _ in range(repeat):
+        start_time = time.perf_counter(); func(pages); elapsed = time.perf_counter() - start_time
+        best = elapsed if best is None else min(best, elapsed)
+    return best / item_count * 1e6
+
+
+def _retained_bytes_per_item(func, pages, item_count):
+    """解析全部页面并保留结果时的常驻内存 (响应体本身不计入)"""
+    gc.collect(); tracemalloc.start(); baseline = tracemalloc.get_traced_memory()[0]
+    result = func(pages); gc.collect(); retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop(); del result
+    return retained / item_count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="对比动态列表解析的耗时与内存")
+    parser.add_argument("--pages", nargs="*", default=[], help="抓取保存的 feed/space 响应 JSON 文件或目录")
+    parser.add_argument("--synthetic", type=int, default=200, help="未提供 --pages 时生成的合成页面数 (每页 12 条)")
+    parser.add_argument("--repeat", type=int, default=5, help="计时重复次数，取最好成绩")
+    parser.add_argument("--output", help="结果 JSON 写入路径")
+    args = parser.parse_args(argv)
+
+    pages = load_pages(args.pages) if args.pages else synthetic_pages(args.synthetic)
+    item_count = sum(len(records) for records in _projected(pages))
+    if not item_count: print("页面中没有可解析的动态"); return 1
+    cases = [("旧实现 (json + dict/原始 item)", _legacy), ("投影解码 (json)", lambda pages: _projected(pages, json.loads))]
+    if JSON_BACKEND != "json": cases.append((f"投影解码 ({JSON_BACKEND})", _projected))
+    print(f"{len(pages)} 页，{item_count} 条动态，平均每页 {sum(len(body) for _, body in pages) / len(pages) / 1024:.1f} KB ({'抓取数据' if args.pages else '合成数据'}):")
+    results = {}
+    for name, func in cases:
+        us_per_item = _time_per_item(func, pages, item_count, max(1, args.repeat)); bytes_per_item = _retained_bytes_per_item(func, pages, item_count)
+        results[name] = {"us_per_item": round(us_per_item, 2), "retained_bytes_per_item": round(bytes_per_item)}
+        print(f"  {name:<32} {us_per_item:8.2f} 微秒/条   常驻 {bytes_per_item:9.0f} 字节/条")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f: json.dump({"pages": len(pages), "items": item_count, "json_backend": JSON_BACKEND, "results": results}, f, ensure_ascii=False, indent=1)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
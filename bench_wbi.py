@@ -0,0 +1,50 @@
+# bench_wbi.py
+# -*- coding: utf-8 -*-
+# Wbi 签名微基准：旧实现 (每次 reduce 计算 mixin key + filter 逐字符过滤) 与 WbiSigner 缓存 mixin key 的对比
+# 用法: python bench_wbi.py [次数]
+
+import sys
+import time
+import timeit
+from functools import reduce
+from hashlib import md5
+from urllib.parse import urlencode
+
+from bili_api import WbiSigner, _sign_with_mixin, getMixinKey, mixinKeyEncTab
+
+IMG_KEY = "7cd084941338484aae1ad9425b84077c"; SUB_KEY = "4932caff0ff746eab6f01bf08b70ac45"
+PARAMS = {"host_mid": 123456789, "offset": "912345678901234567", "timezone_offset": -480}
+
+
+def legacy_enc_wbi(params, img_key, sub_key):
+    """改动前的 encWbi"""
+    mixin_key = reduce(lambda s, i: s + (img_key + sub_key)[i], mixinKeyEncTab, '')[:32]; curr_time = round(time.time())
+    params['wts'] = curr_time; params = dict(sorted(params.items()))
+    params = { k: ''.join(filter(lambda chr: chr not in "!'()*", str(v))) for k, v in params.items() }
+    query = urlencode(params); wbi_sign = md5((query + mixin_key).encode()).hexdigest()
+    params['w_rid'] = wbi_sign; return params
+
+
+class _NoNetworkSession:
+    def get(self, *args, **kwargs): raise AssertionError("基准测试不应发出网络请求")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    number = int(argv[0]) if argv else 50000
+    signer = WbiSigner(); signer.update(IMG_KEY, SUB_KEY); session = _NoNetworkSession()
+    # 同一秒内两种实现的结果必须一致
+    assert legacy_enc_wbi(dict(PARAMS), IMG_KEY, SUB_KEY)['w_rid'] == _sign_with_mixin(dict(PARAMS), getMixinKey(IMG_KEY + SUB_KEY))['w_rid']
+    cases = [
+        ("旧 encWbi (每次计算 mixin key)", lambda: legacy_enc_wbi(dict(PARAMS), IMG_KEY, SUB_KEY)),
+        ("mixin key 计算 (旧, reduce)", lambda: reduce(lambda s, i: s + (IMG_KEY + SUB_KEY)[i], mixinKeyEncTab, '')[:32]),
+        ("WbiSigner.sign (缓存 Keys + mixin key)", lambda: signer.sign(PARAMS, session)),
+    ]
+    print(f"每项执行 {number} 次:")
+    for name, func in cases:
+        best = min(timeit.repeat(func, number=number, repeat=3))
+        print(f"  {name:<40} {best / number * 1e6:8.2f} 微秒/次")
+
+
+if __name__ == "__main__":
+    main()
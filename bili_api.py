@@ -0,0 +1,484 @@
+# bili_api.py
+# -*- coding: utf-8 -*-
+# Bilibili 接口调用 (动态列表 / 点赞 / 详情 / Wbi 签名 / Cookie)，不依赖任何 GUI 库
+
+# --- 基础模块导入 ---
+import requests
+import time
+import json
+import threading
+import traceback
+import os
+import http.cookiejar
+import importlib.util
+# --- Wbi 签名所需 ---
+from functools import lru_cache
+from hashlib import md5
+from urllib.parse import urlencode
+
+from rate_limit import STOP_POLL_INTERVAL, session_rate_limiter
+from clock import session_clock, session_rng
+from dynamic_record import decode_response, project_item
+from metrics import RATE_LIMIT_HITS, REQUEST_LATENCY, REQUEST_RETRIES, REQUESTS
+
+# --- Bilibili API 相关定义 ---
+DYNAMICS_FETCH_URL = "https://api.bilibili.com/x/polymer/web-dynamic/v1/feed/space"
+FOLLOWING_FEED_URL = "https://api.bilibili.com/x/polymer/web-dynamic/v1/feed/all"
+RELATIONS_URL = "https://api.bilibili.com/x/relation/relations"
+FOLLOWINGS_URL = "https://api.bilibili.com/x/relation/followings"
+LIKE_DYNAMIC_URL = "https://api.vc.bilibili.com/dynamic_like/v1/dynamic_like/thumb"
+GET_DYNAMIC_DETAIL_URL = "https://api.vc.bilibili.com/dynamic_svr/v1/dynamic_svr/get_dynamic_detail"
+NAV_URL = "https://api.bilibili.com/x/web-interface/nav"
+HEADERS = {
+    'Accept': 'application/json, text/plain, */*', 'Accept-Encoding': 'gzip, deflate, br',
+    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8', 'Origin': 'https://t.bilibili.com',
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/116.0.0.0 Safari/537.36'
+}
+# --- Brotli 库检查 (只查找不导入：br 响应由 urllib3 自行导入 brotli 解码) ---
+if importlib.util.find_spec("brotli") is None: print("警告：未找到 'brotli' 库，建议运行: pip install brotli")
+
+# --- 全局日志记录辅助函数 ---
+def _log_message(log_queue, message, target_uid=None):
+    if log_queue:
+        try: log_queue.put({'target': target_uid if target_uid else 'main', 'message': f"[{time.strftime('%H:%M:%S')}] {str(message)}"})
+        except Exception as e: print(f"[{time.strftime('%H:%M:%S')}] {str(message)}"); print(f"Queue Error: {e}")
+    else: prefix = f"[UID:{target_uid}] " if target_uid else "[Main] "; print(f"[{time.strftime('%H:%M:%S')}] {prefix}{str(message)}")
+
+# --- 限流器反馈 (见 rate_limit.py；每个请求使用其会话绑定的限流器) ---
+THROTTLE_CODES = (-799, -412, -509, 4128002)  # 限流/风控类 API code，其中 -412 / -799 会触发熔断
+
+def _is_throttled(api_code, api_message=""):
+    return api_code in THROTTLE_CODES or "频繁" in (api_message or "")
+
+def _report_success(session, endpoint, log_queue):
+    REQUESTS.inc(endpoint=endpoint, outcome="ok")
+    if session_rate_limiter(session).record_success(endpoint): _log_message(log_queue, "限流: 探测请求成功，熔断器已关闭，恢复正常请求。")
+
+def _report_limited(session, endpoint, code, log_queue, target_uid=None):
+    REQUESTS.inc(endpoint=endpoint, outcome="limited"); RATE_LIMIT_HITS.inc(endpoint=endpoint, code=code); limiter = session_rate_limiter(session)
+    if limiter.record_limited(endpoint, code): _log_message(log_queue, f"限流: 收到风控响应 ({endpoint}, {code})，所有请求暂停 {limiter.cooldown:.0f} 秒后探测恢复。", target_uid=target_uid)
+
+def _report_failure(session, endpoint):
+    REQUESTS.inc(endpoint=endpoint, outcome="error"); session_rate_limiter(session).record_failure(endpoint)
+
+# Wbi 签名实现
+mixinKeyEncTab = [ 46, 47, 18, 2, 53, 8, 23, 32, 15, 50, 10, 31, 58, 3, 45, 35, 27, 43, 5, 49, 33, 9, 42, 19, 29, 28, 14, 39, 12, 38, 41, 13, 37, 48, 7, 16, 24, 55, 40, 61, 26, 17, 0, 1, 60, 51, 30, 4, 22, 25, 54, 21, 56, 59, 6, 63, 57, 62, 11, 36, 20, 34, 44, 52 ]
+_WBI_STRIP_CHARS = str.maketrans('', '', "!'()*")
+@lru_cache(maxsize=8)
+def getMixinKey(orig: str): return ''.join(orig[i] for i in mixinKeyEncTab)[:32]
+def _sign_with_mixin(params: dict, mixin_key: str):
+    params['wts'] = round(time.time())
+    params = { k: str(v).translate(_WBI_STRIP_CHARS) for k, v in sorted(params.items()) }
+    params['w_rid'] = md5((urlencode(params) + mixin_key).encode()).hexdigest(); return params
+def encWbi(params: dict, img_key: str, sub_key: str): return _sign_with_mixin(params, getMixinKey(img_key + sub_key))
+def _wbi_keys_from_nav(json_content):
+    """从 nav 接口响应中取出 (img_key, sub_key)，缺失时返回 None"""
+    wbi_img = (json_content.get('data') or {}).get('wbi_img') or {}; img_url = wbi_img.get('img_url'); sub_url = wbi_img.get('sub_url')
+    if not img_url or not sub_url: return None
+    return img_url.split('/')[-1].split('.')[0], sub_url.split('/')[-1].split('.')[0]
+
+class WbiSigner:
+    """Wbi Keys 缓存 + 签名。mixin key 按 (img_key, sub_key) 预先算好；nav 请求在锁外进行，
+    Keys 过期 (超过 ttl) 后继续使用旧 Keys 并在后台刷新 (stale-while-revalidate)，只有没有可用 Keys 时调用方才等待。
+    同一时刻最多只有一个刷新请求在途，所有调用方共享它的结果。"""
+
+    def __init__(self, ttl=3600.0, retry_interval=60.0, clock=time.time):
+        self.ttl = ttl; self.retry_interval = retry_interval; self.clock = clock
+        self._lock = threading.Lock()  # 只保护下面的状态，从不在持有时发网络请求
+        self._keys = None  # (img_key, sub_key, mixin_key)
+        self._fetched_at = 0.0; self._next_refresh_at = 0.0; self.generation = 0
+        self._refresh_done = None  # 在途刷新的完成事件
+        self.refresh_count = 0
+
+    def _fetch(self, session, log_queue, stop_event):
+        if not session_rate_limiter(session).acquire("nav", stop_event): return None
+        _log_message(log_queue, "正在获取最新的 Wbi Keys...")
+        try:
+            with REQUEST_LATENCY.time(endpoint="nav"): response = session.get(NAV_URL, headers=HEADERS, timeout=10)
+            if response.status_code == 412: _report_limited(session, "nav", "HTTP 412", log_queue); _log_message(log_queue, "获取 Wbi Keys 失败: HTTP 412"); return None
+            response.raise_for_status(); json_content = response.json(); _report_success(session, "nav", log_queue)
+            keys = _wbi_keys_from_nav(json_content)
+            if not keys: _log_message(log_queue, "错误: 未能在 nav API 响应中找到 img_url 或 sub_url")
+            return keys
+        except requests.exceptions.RequestException as e:
+            if stop_event is not None and stop_event.is_set(): return None  # 停止时被中断的请求
+            _report_failure(session, "nav"); _log_message(log_queue, f"获取 Wbi Keys 时网络错误: {e}"); return None
+        except Exception as e: _report_failure(session, "nav"); _log_message(log_queue, f"获取 Wbi Keys 时发生错误: {e}"); traceback.print_exc(); return None
+
+    def update(self, img_key, sub_key):
+        """写入新的 Keys (刷新线程或其他已拿到 nav 响应的调用方使用)"""
+        with self._lock:
+            if not self._keys or self._keys[:2] != (img_key, sub_key): self.generation += 1
+            self._keys = (img_key, sub_key, getMixinKey(img_key + sub_key)); now = self.clock()
+            self._fetched_at = now; self._next_refresh_at = now + self.ttl
+
+    def _refresh(self, session, log_queue, stop_event, done):
+        try:
+            keys = self._fetch(session, log_queue, stop_event)
+            if keys: self.update(*keys); _log_message(log_queue, "成功获取并缓存 Wbi Keys")
+            else:
+                with self._lock: self._next_refresh_at = self.clock() + self.retry_interval  # 失败后不立即重试，旧 Keys 继续使用
+        finally:
+            with self._lock: self._refresh_done = None; self.refresh_count += 1
+            done.set()
+
+    def _start_refresh_locked(self, session, log_queue, background):
+        """调用方需持有 self._lock。返回 (完成事件, 是否需要调用方自己执行刷新)；已有在途刷新时直接复用"""
+        if self._refresh_done is not None: return self._refresh_done, False
+        self._refresh_done = done = threading.Event()
+        if not background: return done, True
+        # 后台刷新不受单个调用方的 stop_event 影响
+        threading.Thread(target=self._refresh, args=(session, log_queue, None, done), daemon=True, name="wbi-refresh").start()
+        return done, False
+
+    def keys(self, session, log_queue=None, stop_event=None):
+        """返回 (img_key, sub_key, mixin_key, generation)；无可用 Keys 且刷新失败或收到停止信号时返回 None"""
+        while True:
+            with self._lock:
+                keys = self._keys; now = self.clock()
+                if keys:
+                    if now >= self._next_refresh_at: self._start_refresh_locked(session, log_queue, background=True)
+                    return keys + (self.generation,)
+                done, run_here = self._start_refresh_locked(session, log_queue, background=False)
+            if run_here:  # 没有可用 Keys：由第一个调用方在本线程刷新，其余调用方等待同一次刷新
+                self._refresh(session, log_queue, stop_event, done)
+                with self._lock:
+                    if self._keys: return self._keys + (self.generation,)
+                return None
+            while not done.wait(STOP_POLL_INTERVAL):
+                if stop_event is not None and stop_event.is_set(): return None
+            with self._lock:
+                if self._keys: return self._keys + (self.generation,)
+            return None  # 等到的刷新失败了，不在这里重复请求
+
+    def invalidate(self, generation, hard=True):
+        """签名被拒 (-352) 时调用。只有 generation 仍是当前 Keys 时才生效，多个调用方同时报告只触发一次刷新。
+        hard=True 丢弃当前 Keys (调用方等待新 Keys)；hard=False 只标记过期，在后台刷新。"""
+        with self._lock:
+            if generation != self.generation or not self._keys: return False
+            if hard: self._keys = None; self.generation += 1
+            else: self._next_refresh_at = 0.0
+            return True
+
+    def sign(self, params, session, log_queue=None, stop_event=None):
+        """返回 (签名后的参数, generation)；无法获取 Keys 时返回 (None, None)"""
+        keys = self.keys(session, log_queue, stop_event)
+        if not keys: return None, None
+        return _sign_with_mixin(dict(params), keys[2]), keys[3]
+
+# 进程内共享的签名器
+wbi_signer = WbiSigner()
+
+def get_wbi_keys_cached(session, log_queue, stop_event=None):
+    """兼容旧接口：返回 (img_key, sub_key)，失败时返回 (None, None)"""
+    keys = wbi_signer.keys(session, log_queue, stop_event)
+    return (keys[0], keys[1]) if keys else (None, None)
+# --- Wbi 签名结束 ---
+
+
+# --- 后台网络请求与逻辑函数 ---
+def _parse_timeline_items(items, stop_event):
+    """解析 feed/all (关注动态时间线) 的 items 为 DynamicRecord 列表 (uid 为作者)；收到停止信号时返回 None"""
+    extracted_list = []
+    for item in items:
+        if stop_event.is_set(): return None
+        record = project_item(item)
+        if record is not None: extracted_list.append(record)
+    return extracted_list
+
+def _parse_feed_items(items, host_mid, stop_event, since_id=None, watch_ids=None):
+    """解析 feed/space 的 items，返回 (DynamicRecord 列表, 昵称, 是否已到达水位线)；收到停止信号时列表为 None。
+    since_id 不为 None 时为增量模式：遇到 ID <= since_id 的非置顶动态即停止解析。
+    watch_ids (待确认点赞的动态 ID 集合) 非空时，到达水位线后继续查找这些 ID，找齐即停止。"""
+    extracted_list = []; host_uname = f"UID_{host_mid}"; reached_seen = False; watch_left = set(watch_ids or ())
+    for item in items:
+        if stop_event.is_set(): return None, host_uname, False
+        record = project_item(item, host_mid)
+        if record is None: continue
+        if record.uname != f"UID_{host_mid}": host_uname = record.uname
+        if reached_seen and record.dynamic_id not in watch_left: continue
+        if since_id is not None and not reached_seen:
+            if record.id <= since_id and not record.pinned:  # 置顶动态可能很旧，不能作为停止依据
+                reached_seen = True
+                if not watch_left: break
+                if record.dynamic_id not in watch_left: continue
+            elif record.id <= since_id and record.dynamic_id not in watch_left: continue
+        watch_left.discard(record.dynamic_id)
+        extracted_list.append(record)
+        if reached_seen and not watch_left: break
+    return extracted_list, host_uname, reached_seen
+
+def describe_dynamic(record):
+    """生成动态的简短描述 (最多 60 字)，见 DynamicRecord.describe"""
+    return record.describe()
+
+def get_up_dynamics(session, host_mid, offset, log_queue, stop_event, since_id=None, watch_ids=None):
+    """获取指定UP主的动态列表 (使用 Polymer API + Wbi 签名)。
+    since_id (整数水位线) 不为 None 时只返回比它新的动态，解析到已见过的动态即停止；
+    watch_ids 中的旧动态也会返回 (用于批量确认点赞状态)。
+    每次请求前经过共享限流器，限流/风控响应由限流器统一退避，这里只负责重试计数。"""
+    params = {"host_mid": host_mid, "offset": offset, "timezone_offset": -480 }
+    dynamic_headers = HEADERS.copy(); dynamic_headers['Referer'] = f'https://t.bilibili.com/?tab=all'
+    max_retries=3; initial_retry_delay=6; retries = 0; retry_delay = initial_retry_delay
+    attempt = 0
+    while retries <= max_retries:
+        if stop_event.is_set(): return None, None, None, None
+        if attempt: REQUEST_RETRIES.inc(endpoint="fetch")
+        attempt += 1
+        signed_params, key_generation = wbi_signer.sign(params, session, log_queue, stop_event)  # 每次重试重新签名 (Keys 可能刚被刷新)
+        if signed_params is None:
+            if not stop_event.is_set(): _log_message(log_queue, f"错误: 无法获取 Wbi Keys (UID:{host_mid})", target_uid=host_mid)
+            return None, None, None, None
+        if not session_rate_limiter(session).acquire("fetch", stop_event): return None, None, None, None
+        response = None
+        try:
+            with REQUEST_LATENCY.time(endpoint="fetch"): response = session.get(DYNAMICS_FETCH_URL, params=signed_params, headers=dynamic_headers, timeout=25)
+            response.raise_for_status()
+            if stop_event.is_set(): return None, None, None, None
+            try: data = decode_response(response)
+            except json.JSONDecodeError:
+                _report_failure(session, "fetch")
+                _log_message(log_queue, f"错误: JSON解析失败 (UID:{host_mid}, Offset:'{offset}')", target_uid=host_mid)
+                if response.headers.get('Content-Encoding') == 'br': _log_message(log_queue, "提示：检查 'brotli' 库。", target_uid=host_mid)
+                if retries < 1: _log_message(log_queue, f"将在 {retry_delay:.1f} 秒后重试(JSON)...", target_uid=host_mid); session_clock(session).wait(stop_event, retry_delay); retries += 1; retry_delay *= 1.5; continue
+                else: _log_message(log_queue, f"JSON错误达到最大重试次数。", target_uid=host_mid); return None, None, None, None
+            api_code = data.get("code"); api_message = data.get("message", "")
+            if _is_throttled(api_code, api_message):
+                _report_limited(session, "fetch", api_code, log_queue, host_mid)
+                if retries < max_retries: _log_message(log_queue, f"API限制 (code={api_code})，由限流器退避后重试...", target_uid=host_mid); retries += 1; continue
+                _log_message(log_queue, f"获取动态失败: code={api_code}, msg='{api_message}'，已达最大重试次数({max_retries})。", target_uid=host_mid); return None, None, None, None
+            _report_success(session, "fetch", log_queue)  # 服务器正常应答 (含非限流类错误码)
+            if api_code == 0:
+                dynamics_data = data.get("data", {}); items = dynamics_data.get("items", [])
+                has_more = dynamics_data.get("has_more", False); next_offset = dynamics_data.get("offset", "")
+                extracted_list, host_uname, reached_seen = _parse_feed_items(items, host_mid, stop_event, since_id, watch_ids)
+                if extracted_list is None: return None, None, None, None
+                if reached_seen: has_more = False  # 增量模式：已到达水位线，无需继续翻页
+                next_request_offset = next_offset # Use API's offset
+                if next_offset == offset and offset != "": has_more = False # Check if offset is stuck
+                return extracted_list, next_request_offset, has_more, host_uname
+            if api_code == -352:
+                _log_message(log_queue, f"错误: 请求校验失败 (Wbi sign error?) (UID:{host_mid}, code={api_code})", target_uid=host_mid)
+                if retries == 0:
+                    _log_message(log_queue, "尝试刷新 Wbi Keys 并重试...", target_uid=host_mid)
+                    wbi_signer.invalidate(key_generation)  # 多个请求同时被拒时只刷新一次
+                    retries += 1; continue
+                else: _log_message(log_queue, "刷新 Wbi Keys 后重试仍然失败。", target_uid=host_mid); return None, None, None, None
+            if api_code == -404 and retries < max_retries: _log_message(log_queue, f"API错误 (code={api_code})，稍后重试...", target_uid=host_mid); session_clock(session).wait(stop_event, retry_delay); retries += 1; retry_delay *= 1.5; continue
+            _log_message(log_queue, f"获取动态失败: code={api_code}, msg='{api_message}'", target_uid=host_mid);
+            if api_code == -101: _log_message(log_queue, "错误: 登录状态失效。", target_uid=host_mid); raise RuntimeError("登录失效(fetch)")
+            return None, None, None, None
+        except requests.exceptions.HTTPError as e:
+             if response is not None and response.status_code == 412:
+                 _log_message(log_queue, f"失败: HTTP 412 (风控/签名/频率?)", target_uid=host_mid); _report_limited(session, "fetch", "HTTP 412", log_queue, host_mid)
+                 if retries < max_retries:
+                     if retries % 2 == 0:
+                         _log_message(log_queue, "尝试后台刷新 Wbi Keys...", target_uid=host_mid)
+                         wbi_signer.invalidate(key_generation, hard=False)
+                     retries += 1; continue
+                 else: _log_message(log_queue, f"遇412错误达到最大重试次数。", target_uid=host_mid); return None, None, None, None
+             _report_failure(session, "fetch"); _log_message(log_queue, f"HTTP错误: {e}", target_uid=host_mid)
+        except requests.exceptions.RequestException as e:
+            if stop_event.is_set(): return None, None, None, None  # 停止时被中断的请求
+            _report_failure(session, "fetch"); _log_message(log_queue, "超时" if isinstance(e, requests.exceptions.Timeout) else f"网络错误: {e}", target_uid=host_mid)
+        except RuntimeError as e: raise e
+        except Exception as e: _report_failure(session, "fetch"); _log_message(log_queue, f"未知错误: {e}", target_uid=host_mid); traceback.print_exc(); return None, None, None, None
+        # 非限流类错误 (网络/服务器)：本地退避后重试
+        if retries < max_retries: _log_message(log_queue, f"出错，{retry_delay:.1f}秒后重试...", target_uid=host_mid); session_clock(session).wait(stop_event, retry_delay); retries += 1; retry_delay *= 1.5; continue
+        else: _log_message(log_queue, f"达到最大重试次数。", target_uid=host_mid); return None, None, None, None
+    return None, None, None, None
+
+def get_following_feed(session, offset, log_queue, stop_event, page=1):
+    """拉取登录账号的关注动态时间线 (feed/all) 一页，按发布时间倒序包含所有已关注 UP 主的动态。
+    返回 (动态列表[每条带 author_mid], 下一页 offset, has_more)；请求失败返回 (None, None, None)，收到停止信号返回 (None, None, False)"""
+    params = {"type": "all", "offset": offset or "", "page": page, "timezone_offset": -480}
+    feed_headers = HEADERS.copy(); feed_headers['Referer'] = 'https://t.bilibili.com/'
+    if not session_rate_limiter(session).acquire("feed_all", stop_event): return None, None, False
+    response = None
+    try:
+        with REQUEST_LATENCY.time(endpoint="feed_all"): response = session.get(FOLLOWING_FEED_URL, params=params, headers=feed_headers, timeout=15)
+        response.raise_for_status(); data = decode_response(response); api_code = data.get("code")
+        if _is_throttled(api_code, data.get("message")): _report_limited(session, "feed_all", api_code, log_queue); return None, None, None
+        _report_success(session, "feed_all", log_queue)
+        if api_code != 0: _log_message(log_queue, f"获取关注动态时间线失败: Code={api_code}, Msg={data.get('message')}"); return None, None, None
+        feed_data = data.get("data") or {}
+        items = _parse_timeline_items(feed_data.get("items") or [], stop_event)
+        if items is None: return None, None, False
+        return items, str(feed_data.get("offset") or ""), bool(feed_data.get("has_more"))
+    except (requests.exceptions.RequestException, json.JSONDecodeError, Exception) as e:
+        if stop_event.is_set(): return None, None, False
+        if response is not None and response.status_code == 412: _report_limited(session, "feed_all", "HTTP 412", log_queue)
+        else: _report_failure(session, "feed_all")
+        _log_message(log_queue, f"获取关注动态时间线异常: {e}"); return None, None, None
+
+def get_relations(session, uids, log_queue, stop_event=None):
+    """批量查询当前账号与一组 UID 的关系 (每次最多 50 个)，返回 {uid: attribute}；
+    attribute 为 2 (已关注) 或 6 (互相关注) 表示已关注。任一批失败返回 None"""
+    uids = [str(uid) for uid in uids]; relations = {}
+    for start in range(0, len(uids), 50):
+        chunk = uids[start:start + 50]
+        if not session_rate_limiter(session).acquire("relation", stop_event): return None
+        response = None
+        try:
+            with REQUEST_LATENCY.time(endpoint="relation"): response = session.get(RELATIONS_URL, params={"fids": ",".join(chunk)}, headers=HEADERS, timeout=10)
+            response.raise_for_status(); data = response.json()
+            if _is_throttled(data.get("code"), data.get("message")): _report_limited(session, "relation", data.get("code"), log_queue); return None
+            _report_success(session, "relation", log_queue)
+            if data.get("code") != 0: _log_message(log_queue, f"查询关注关系失败: Code={data.get('code')}, Msg={data.get('message')}"); return None
+            result = data.get("data") or {}
+            for uid in chunk: relations[uid] = int((result.get(uid) or {}).get("attribute") or 0)
+        except (requests.exceptions.RequestException, json.JSONDecodeError, Exception) as e:
+            if response is not None and response.status_code == 412: _report_limited(session, "relation", "HTTP 412", log_queue)
+            else: _report_failure(session, "relation")
+            _log_message(log_queue, f"查询关注关系异常: {e}"); return None
+    return relations
+
+def get_followings(session, mid, log_queue, stop_event=None, page_size=50, max_pages=None):
+    """分页拉取 mid 的关注列表 (查询自己的账号时不受 5 页限制)，返回 [(uid, 昵称)]，按关注时间从新到旧；请求失败或中断返回 None"""
+    followings = []; page = 1
+    while max_pages is None or page <= max_pages:
+        if not session_rate_limiter(session).acquire("relation", stop_event): return None
+        response = None
+        try:
+            with REQUEST_LATENCY.time(endpoint="relation"): response = session.get(FOLLOWINGS_URL, params={"vmid": mid, "pn": page, "ps": page_size, "order": "desc"}, headers=HEADERS, timeout=10)
+            response.raise_for_status(); data = response.json()
+            if _is_throttled(data.get("code"), data.get("message")): _report_limited(session, "relation", data.get("code"), log_queue); return None
+            _report_success(session, "relation", log_queue)
+            if data.get("code") != 0: _log_message(log_queue, f"获取关注列表失败: Code={data.get('code')}, Msg={data.get('message')}"); return None
+            result = data.get("data") or {}; entries = result.get("list") or []
+            followings.extend((str(entry.get("mid")), entry.get("uname")) for entry in entries if entry.get("mid"))
+            if len(entries) < page_size or len(followings) >= int(result.get("total") or 0): return followings
+        except (requests.exceptions.RequestException, json.JSONDecodeError, Exception) as e:
+            if response is not None and response.status_code == 412: _report_limited(session, "relation", "HTTP 412", log_queue)
+            else: _report_failure(session, "relation")
+            _log_message(log_queue, f"获取关注列表异常: {e}"); return None
+        page += 1
+        if stop_event is not None and session_clock(session).wait(stop_event, session_rng(session).uniform(0.3, 0.8)): return None
+    return followings
+
+def get_single_dynamic_detail(session, dynamic_id, log_queue, target_uid=None, stop_event=None):
+    params = {"dynamic_id": dynamic_id}
+    detail_headers = HEADERS.copy(); detail_headers['Referer'] = f'https://t.bilibili.com/{dynamic_id}'
+    if not session_rate_limiter(session).acquire("detail", stop_event): return None
+    response = None
+    try:
+        with REQUEST_LATENCY.time(endpoint="detail"): response = session.get(GET_DYNAMIC_DETAIL_URL, params=params, headers=detail_headers, timeout=10)
+        response.raise_for_status(); data = response.json()
+        if _is_throttled(data.get("code"), data.get("message")): _report_limited(session, "detail", data.get("code"), log_queue, target_uid)
+        else: _report_success(session, "detail", log_queue)
+        if data.get("code") == 0: return data.get("data", {}).get("card")
+        else: _log_message(log_queue, f"获取动态详情失败: ID={dynamic_id}, Code={data.get('code')}, Msg={data.get('message')}", target_uid=target_uid); return None
+    except (requests.exceptions.RequestException, json.JSONDecodeError, Exception) as e:
+        if stop_event is not None and stop_event.is_set(): return None
+        if response is not None and response.status_code == 412: _report_limited(session, "detail", "HTTP 412", log_queue, target_uid)
+        else: _report_failure(session, "detail")
+        _log_message(log_queue, f"获取动态详情异常: ID={dynamic_id}, Error={e}", target_uid=target_uid); return None
+
+def detail_like_status(detail_card):
+    """从 get_dynamic_detail 的 card 中读取点赞状态：1 已赞，0 未赞，无法判断时返回 None"""
+    desc = detail_card.get('desc') if detail_card else None
+    if not desc: return None
+    like_state = desc.get('like_state'); is_liked_field = desc.get('is_liked')
+    if isinstance(like_state, int): return like_state
+    if isinstance(is_liked_field, int): return is_liked_field
+    return 0
+
+def like_dynamic(session, dynamic_id, csrf_token, log_queue, stop_event, target_uid=None, verify=True):
+    """点赞动态。verify=False 时点赞请求成功即返回 True，不再逐条请求详情确认 (由调用方批量确认)。
+    限流/风控响应交给共享限流器退避，只有网络类错误才在本地按指数间隔重试。"""
+    payload = { "dynamic_id": dynamic_id, "up": 1, "csrf": csrf_token }
+    dynamic_headers = HEADERS.copy(); dynamic_headers['Referer'] = f'https://t.bilibili.com/{dynamic_id}'; dynamic_headers['Origin'] = 'https://t.bilibili.com'
+    max_like_attempts=3; current_attempt=0; base_like_delay=1.5; backoff = False
+    while current_attempt < max_like_attempts:
+        if stop_event.is_set(): return False
+        current_attempt += 1
+        if current_attempt > 1: REQUEST_RETRIES.inc(endpoint="like")
+        if backoff: retry_like_delay = (2**(current_attempt-2)) * base_like_delay + session_rng(session).uniform(0.1, 0.3); session_clock(session).wait(stop_event, retry_like_delay)
+        backoff = True
+        if not session_rate_limiter(session).acquire("like", stop_event): return False
+        response = None
+        try:
+            with REQUEST_LATENCY.time(endpoint="like"): response = session.post(LIKE_DYNAMIC_URL, data=payload, headers=dynamic_headers, timeout=15)
+            if stop_event.is_set(): return False
+            response.raise_for_status()
+            try:
+                data = response.json()
+                api_code = data.get("code"); api_message = data.get("message","")
+                if _is_throttled(api_code, api_message):
+                    _report_limited(session, "like", api_code, log_queue, target_uid); backoff = False
+                    _log_message(log_queue, f"点赞速率限制: ID={dynamic_id}, code={api_code}", target_uid=target_uid); continue
+                _report_success(session, "like", log_queue)
+                like_request_success = False
+                if api_code == 0: _log_message(log_queue, f"点赞请求成功: ID={dynamic_id}", target_uid=target_uid); like_request_success = True
+                elif api_code == 71000: _log_message(log_queue, f"已点赞过: ID={dynamic_id}", target_uid=target_uid); return True
+                if like_request_success and not verify: return True
+                if like_request_success:
+                    if session_clock(session).wait(stop_event, session_rng(session).uniform(1.0, 2.0)): return False
+                    detail_card = get_single_dynamic_detail(session, dynamic_id, log_queue, target_uid, stop_event)
+                    if stop_event.is_set(): return False
+                    if detail_card:
+                        final_like_status = detail_like_status(detail_card)
+                        if final_like_status is not None:
+                             if final_like_status == 1: _log_message(log_queue, f"  确认点赞成功: ID={dynamic_id}", target_uid=target_uid); return True
+                             else: _log_message(log_queue, f"  警告: 点赞请求成功但状态确认失败: ID={dynamic_id}", target_uid=target_uid); return False
+                        else: _log_message(log_queue, f"  警告: 无法从详情确认点赞状态(no desc): ID={dynamic_id}", target_uid=target_uid); return False
+                    else: _log_message(log_queue, f"  警告: 无法获取详情确认点赞状态: ID={dynamic_id}", target_uid=target_uid); return False
+                elif api_code == -111: _log_message(log_queue, f"错误: CSRF校验失败: ID={dynamic_id}", target_uid=target_uid); raise RuntimeError("CSRF失效(like)")
+                elif api_code == -101: _log_message(log_queue, f"错误: 账号未登录: ID={dynamic_id}", target_uid=target_uid); raise RuntimeError("登录失效(like)")
+                elif api_code == -400: _log_message(log_queue, f"错误: 无效请求 (ID={dynamic_id})。", target_uid=target_uid); return False
+                else: _log_message(log_queue, f"点赞未知API错误: ID={dynamic_id}, code={api_code}", target_uid=target_uid); continue
+            except json.JSONDecodeError:
+                _report_failure(session, "like")
+                _log_message(log_queue, f"错误: 点赞响应JSON解析失败: ID={dynamic_id}", target_uid=target_uid)
+                if response.headers.get('Content-Encoding') == 'br': _log_message(log_queue, "提示: 检查 'brotli' 库。", target_uid=target_uid)
+                continue
+        except requests.exceptions.HTTPError as e:
+             status_code = e.response.status_code if e.response is not None else "N/A"; _log_message(log_queue, f"点赞HTTP失败: ID={dynamic_id}, Status={status_code}, Error: {e}", target_uid=target_uid)
+             if status_code == 412: _log_message(log_queue, f"点赞HTTP 412错误(可能风控): ID={dynamic_id}", target_uid=target_uid); _report_limited(session, "like", "HTTP 412", log_queue, target_uid); backoff = False; continue
+             _report_failure(session, "like")
+             if status_code in [401, 403]: raise RuntimeError(f"HTTP {status_code}(like)")
+             continue
+        except requests.exceptions.RequestException as e:
+            if stop_event.is_set(): return False  # 停止时被中断的请求
+            _report_failure(session, "like"); _log_message(log_queue, f"点赞超时: ID={dynamic_id}" if isinstance(e, requests.exceptions.Timeout) else f"点赞网络失败: ID={dynamic_id}, Err:{e}", target_uid=target_uid); continue
+        except RuntimeError as e: raise e
+        except Exception as e: _report_failure(session, "like"); _log_message(log_queue, f"点赞意外错误: ID={dynamic_id}, Err:{e}", target_uid=target_uid); traceback.print_exc(); return False
+    _log_message(log_queue, f"点赞 ID {dynamic_id} 重试多次后失败。", target_uid=target_uid)
+    return False
+
+# --- Cookie 持久化 (Mozilla 格式，GUI 与无界面守护进程共用同一文件) ---
+DEFAULT_COOKIE_FILE = "bilibili_cookies.txt"
+
+def load_cookies(session, cookie_file_path, log_queue=None):
+    """从本地 Cookie 文件加载到 session，文件不存在返回 False，加载失败抛出异常"""
+    if not os.path.exists(cookie_file_path): return False
+    cookie_jar = http.cookiejar.MozillaCookieJar(cookie_file_path)
+    cookie_jar.load(ignore_discard=True, ignore_expires=True); session.cookies.update(cookie_jar)
+    _log_message(log_queue, f"成功加载本地 Cookie 文件: {cookie_file_path}"); return True
+
+def save_cookies(session, cookie_file_path, log_queue=None):
+    """将 session 中的 Cookie 保存到本地文件"""
+    if not session: _log_message(log_queue, "错误: 无法保存 Cookie，Session 未初始化。"); return
+    cookie_jar = http.cookiejar.MozillaCookieJar(cookie_file_path)
+    for cookie in session.cookies: cookie_jar.set_cookie(cookie)
+    try: cookie_jar.save(ignore_discard=True, ignore_expires=True); _log_message(log_queue, f"Cookie 已成功保存到: {cookie_file_path}")
+    except Exception as e: _log_message(log_queue, f"错误: 保存 Cookie 到文件失败: {e}"); traceback.print_exc()
+
+def check_cookie_valid(session, log_queue=None, stop_event=None):
+    """请求 nav 接口验证当前 Cookie 是否处于登录状态；stop_event 被设置时 (例如关闭窗口) 不再等待限流器，返回 False"""
+    if not session or not session.cookies: return False
+    _log_message(log_queue, "正在验证 Cookie 有效性...")
+    if not session_rate_limiter(session).acquire("nav", stop_event): return False
+    try:
+        with REQUEST_LATENCY.time(endpoint="nav"): response = session.get(NAV_URL, headers={'User-Agent': HEADERS['User-Agent'], 'Referer': 'https://www.bilibili.com/'}, timeout=10)
+        if response.status_code == 412: _report_limited(session, "nav", "HTTP 412", log_queue); _log_message(log_queue, "Cookie 验证请求失败: HTTP 412 (风控)"); return False
+        response.raise_for_status(); data = response.json(); _report_success(session, "nav", log_queue)
+        wbi_keys = _wbi_keys_from_nav(data)  # 未登录时 nav 同样返回 Wbi Keys，顺便预热签名器，首次抓取动态无需再请求 nav
+        if wbi_keys: wbi_signer.update(*wbi_keys)
+        is_login = data.get('data', {}).get('isLogin', False); uname = data.get('data', {}).get('uname', '未知用户')
+        if data.get('code') == 0 and is_login: _log_message(log_queue, f"Cookie 验证成功，当前用户: {uname}"); return True
+        else: _log_message(log_queue, f"Cookie 验证失败: Code={data.get('code')}, isLogin={is_login}"); return False
+    except requests.exceptions.RequestException as e:
+        if stop_event is not None and stop_event.is_set(): return False  # 停止时被中断的请求
+        _report_failure(session, "nav"); _log_message(log_queue, f"Cookie 验证请求失败: {e}"); return False
+    except Exception as e: _log_message(log_queue, f"Cookie 验证时发生未知错误: {e}"); traceback.print_exc(); return False
@@ -0,0 +1,170 @@
+# clock.py
+# -*- coding: utf-8 -*-
+# 可注入的时钟：引擎、点赞队列、限流器与 bili_api 的所有等待和计时都经过时钟对象。
+# SystemClock 为真实时钟 (默认)；VirtualClock 供 simulate.py 在虚拟时间上运行真实的 LikerEngine，几秒内跑完数周。
+
+import heapq
+import math
+import random
+import threading
+import time
+from collections import deque
+
+from rate_limit import STOP_POLL_INTERVAL
+
+
+class SystemClock:
+    """真实时钟。可调用 (返回 monotonic 时间)，因此也能直接作为 RateLimiter / TokenBucket 的 clock 参数"""
+    poll_interval = STOP_POLL_INTERVAL  # 阻塞等待中检查停止/变更的间隔
+
+    def __call__(self): return time.monotonic()
+    def time(self): return time.time()
+    def monotonic(self): return time.monotonic()
+
+    def wait(self, event, timeout=None):
+        """等同 event.wait(timeout)：event 被设置时提前返回 True"""
+        return event.wait(timeout)
+
+    def condition(self): return threading.Condition()
+
+    def start_thread(self, target, name, args=()):
+        thread = threading.Thread(target=target, args=args, name=name, daemon=True); thread.start(); return thread
+
+    def join(self, thread, timeout=None): thread.join(timeout)
+
+
+system_clock = SystemClock()
+
+
+def bind_clock(session, clock=None, rng=None):
+    """把时钟与随机源绑定到会话：经该会话发出的 bili_api 请求的重试退避、点赞确认等待都使用它们"""
+    if clock is not None: session.clock = clock
+    if rng is not None: session.rng = rng
+    return session
+
+
+def session_clock(session):
+    return getattr(session, "clock", None) or system_clock
+
+
+def session_rng(session):
+    """会话绑定的随机源，未绑定时为 random 模块 (全局随机数)"""
+    return getattr(session, "rng", None) or random
+
+
+class _Waiter:
+    __slots__ = ("woken", "notified")
+
+    def __init__(self): self.woken = False; self.notified = False
+
+
+class _VirtualCondition:
+    """VirtualClock.condition() 返回的条件变量：wait() 在虚拟时间上等待，notify() 唤醒的等待者排在下一个运行"""
+
+    def __init__(self, clock):
+        self._clock = clock; self._lock = threading.Lock(); self._waiters = []
+
+    def __enter__(self): self._lock.acquire(); return self
+    def __exit__(self, *exc_info): self._lock.release()
+
+    def wait(self, timeout=None):
+        waiter = _Waiter(); self._waiters.append(waiter); self._lock.release()
+        try: self._clock._block(waiter, timeout)
+        finally: self._lock.acquire()
+        if waiter in self._waiters: self._waiters.remove(waiter)  # 超时或停止唤醒
+        return waiter.notified
+
+    def notify(self, n=1):
+        waiters = self._waiters[:n]; del self._waiters[:n]
+        for waiter in waiters: self._clock._wake(waiter, notified=True)
+
+    def notify_all(self): self.notify(len(self._waiters))
+
+
+class VirtualClock:
+    """虚拟时钟。参与者线程 (由 start_thread 启动) 同一时刻只有一个在运行：运行中的线程进入 wait() / condition().wait() / join() 时
+    让出运行权，被 notify 唤醒的线程先运行，其次时间直接跳到最早的到期时间，因此同一随机种子的结果可复现。
+    时间到达 end 或所有参与者都在无限期等待时设置 stop_event 并唤醒全部等待者。
+    参与者之间只能通过本时钟的等待原语同步 (真实的锁不能跨 wait() 持有)；wait(event) 只会被超时或停止提前唤醒。"""
+    poll_interval = math.inf  # 停止时时钟会唤醒所有等待者，不需要轮询
+
+    def __init__(self, start=0.0, end=math.inf, stop_event=None):
+        self.now = float(start); self.end = end; self.stop_event = stop_event if stop_event is not None else threading.Event()
+        self._lock = threading.Condition(); self._timers = []; self._seq = 0
+        self._blocked = {}; self._ready = deque(); self._running = None; self._threads = {}  # 线程 -> 等待其结束的 _Waiter 列表
+        self.switches = 0
+
+    def __call__(self): return self.now
+    def time(self): return self.now
+    def monotonic(self): return self.now
+
+    # --- 调度 (调用方持有 self._lock) ---
+    def _wake(self, waiter, notified=False):
+        with self._lock:
+            if waiter.woken: return
+            waiter.woken = True; waiter.notified = notified; self._blocked.pop(waiter, None); self._ready.append(waiter)
+
+    def _wake_all_locked(self):
+        for waiter in list(self._blocked): waiter.woken = True; self._ready.append(waiter)
+        self._blocked.clear()
+
+    def _run_next_locked(self):
+        """选出下一个运行的参与者：先运行已唤醒的，否则把时间推进到最早的到期时间"""
+        while not self._ready and self._blocked:
+            while self._timers and self._timers[0][2].woken: heapq.heappop(self._timers)
+            stopped = self.stop_event.is_set()
+            if self._timers and (stopped or self._timers[0][0] <= self.end):
+                deadline, _, waiter = heapq.heappop(self._timers); self.now = max(self.now, deadline)
+                waiter.woken = True; self._blocked.pop(waiter, None); self._ready.append(waiter)
+            else:
+                if not stopped: self.now = max(self.now, self.end if self.end != math.inf else self.now); self.stop_event.set()  # 下一个到期时间已超过 end，或再无定时等待
+                self._wake_all_locked()
+        self._running = self._ready.popleft() if self._ready else None; self.switches += 1
+        self._lock.notify_all()
+
+    def _block(self, waiter, timeout):
+        """当前参与者等待到 waiter 被唤醒 (notify、超时或停止)"""
+        with self._lock:
+            if not waiter.woken:
+                self._blocked[waiter] = None
+                if timeout is not None and timeout != math.inf: self._seq += 1; heapq.heappush(self._timers, (self.now + max(0.0, timeout), self._seq, waiter))
+            else: self._ready.append(waiter)
+            self._run_next_locked()
+            while self._running is not waiter: self._lock.wait()
+
+    # --- 等待原语 ---
+    def wait(self, event, timeout=None):
+        if event is not None and event.is_set(): return True
+        self._block(_Waiter(), timeout)
+        return event is not None and event.is_set()
+
+    def condition(self): return _VirtualCondition(self)
+
+    def start_thread(self, target, name, args=()):
+        """启动参与者线程：在当前参与者让出运行权后开始运行"""
+        start = _Waiter(); start.woken = True
+
+        def body():
+            with self._lock:
+                while self._running is not start: self._lock.wait()
+            try: target(*args)
+            finally:
+                with self._lock:
+                    for waiter in self._threads.pop(thread, ()):
+                        if not waiter.woken: waiter.woken = True; self._blocked.pop(waiter, None); self._ready.append(waiter)
+                    self._run_next_locked()
+
+        thread = threading.Thread(target=body, name=name, daemon=True)
+        with self._lock:
+            self._threads[thread] = []; self._ready.append(start)
+            if self._running is None: self._run_next_locked()
+        thread.start(); return thread
+
+    def join(self, thread, timeout=None):
+        """参与者等待另一个参与者结束 (让出运行权)；非参与者线程直接 thread.join"""
+        with self._lock:
+            joiners = self._threads.get(thread)
+            if joiners is None or threading.current_thread() not in self._threads: joiners = None
+            else: waiter = _Waiter(); joiners.append(waiter)
+        if joiners is None: thread.join(timeout); return
+        self._block(waiter, timeout)
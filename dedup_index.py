@@ -0,0 +1,60 @@
+# dedup_index.py
+# -*- coding: utf-8 -*-
+# 按 UID 划分的动态去重索引：整数水位线 + 定长的最近已处理 ID 窗口，长时间运行内存恒定
+
+from array import array
+from bisect import bisect_left, insort
+
+
+def parse_dynamic_id(dynamic_id):
+    """动态 ID 字符串转整数 (按数值比较，避免字符串长度不同时字典序出错)，无效返回 0"""
+    try: return int(dynamic_id)
+    except (TypeError, ValueError): return 0
+
+
+class UidDedupIndex:
+    """每个 UID 保存一个水位线 (已见过的最大动态 ID) 和一个升序 array('Q')，最多 window 个最近处理过的 ID。"""
+
+    def __init__(self, window=256):
+        self.window = max(1, int(window))
+        self._watermarks = {}; self._recent = {}
+
+    def watermark(self, uid):
+        return self._watermarks.get(uid, 0)
+
+    def has_watermark(self, uid):
+        return uid in self._watermarks
+
+    def set_watermark(self, uid, dynamic_id):
+        """水位线只前进不后退，返回是否发生了变化"""
+        dynamic_id = parse_dynamic_id(dynamic_id)
+        if dynamic_id <= self._watermarks.get(uid, -1): return False
+        self._watermarks[uid] = dynamic_id; return True
+
+    def seen(self, uid, dynamic_id):
+        recent = self._recent.get(uid)
+        if not recent: return False
+        pos = bisect_left(recent, dynamic_id)
+        return pos < len(recent) and recent[pos] == dynamic_id
+
+    def is_new(self, uid, dynamic_id):
+        """高于水位线且不在最近窗口内"""
+        return dynamic_id > self._watermarks.get(uid, 0) and not self.seen(uid, dynamic_id)
+
+    def add(self, uid, dynamic_id):
+        """记录已处理的 ID，超出窗口时丢弃最旧 (最小) 的 ID，返回是否为首次记录"""
+        recent = self._recent.get(uid)
+        if recent is None: recent = self._recent[uid] = array('Q')
+        elif self.seen(uid, dynamic_id): return False
+        insort(recent, dynamic_id)
+        if len(recent) > self.window: del recent[:len(recent) - self.window]
+        return True
+
+    def forget(self, uid):
+        self._watermarks.pop(uid, None); self._recent.pop(uid, None)
+
+    def uids(self):
+        return list(self._watermarks)
+
+    def __len__(self):
+        return sum(len(recent) for recent in self._recent.values())
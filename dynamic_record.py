@@ -0,0 +1,68 @@
+# dynamic_record.py
+# -*- coding: utf-8 -*-
+# 动态列表的紧凑表示：解析 feed/space、feed/all 响应时只投影出引擎用到的字段 (整数 ID、作者、点赞状态、发布时间、类型、置顶)，
+# 每条动态一个带 __slots__ 的 DynamicRecord，原始 item 随即释放 (只保留生成描述所需的 module_dynamic)。
+# 响应体优先用 orjson 解码 (可选依赖，未安装时使用标准库 json)。
+
+import json
+import sys
+
+try: import orjson
+except ImportError: orjson = None
+
+JSON_BACKEND = "orjson" if orjson else "json"
+
+
+def loads(content):
+    """解码 JSON 响应体 (bytes 或 str)；解析失败抛出 json.JSONDecodeError (orjson 的异常是其子类)"""
+    return orjson.loads(content) if orjson else json.loads(content)
+
+
+def decode_response(response):
+    """代替 response.json()：直接解码原始字节，跳过 requests 的编码探测"""
+    return loads(response.content)
+
+
+class DynamicRecord:
+    """一条动态。id 为整数 ID，uid 为作者 UID (字符串)，needs_like 为当前账号尚未点赞"""
+    __slots__ = ("id", "uid", "uname", "needs_like", "pub_ts", "type", "pinned", "_dynamic", "_desc")
+
+    def __init__(self, id, uid, uname, needs_like, pub_ts=0, type=None, pinned=False, dynamic_module=None):
+        self.id = id; self.uid = uid; self.uname = uname; self.needs_like = needs_like
+        self.pub_ts = pub_ts; self.type = type; self.pinned = pinned; self._dynamic = dynamic_module; self._desc = None
+
+    @property
+    def dynamic_id(self):
+        """字符串形式的 ID (点赞、详情接口与状态库使用)"""
+        return str(self.id)
+
+    def describe(self):
+        """动态的简短描述 (最多 60 字)，首次调用时生成并释放 module_dynamic"""
+        if self._desc is None:
+            desc_text = f"动态 ID: {self.id}"; dyn_module = self._dynamic or {}; major = dyn_module.get('major') or {}
+            if (dyn_module.get('desc') or {}).get('text'): desc_text = dyn_module['desc']['text']
+            elif (major.get('draw') or {}).get('items'): desc_text = f"[图片] {len(major['draw']['items'])} 图"
+            elif (major.get('archive') or {}).get('title'): desc_text = f"[视频] {major['archive']['title']}"
+            elif (major.get('article') or {}).get('title'): desc_text = f"[专栏] {major['article']['title']}"
+            self._desc = desc_text[:60] + ('...' if len(desc_text) > 60 else ''); self._dynamic = None
+        return self._desc
+
+    def __repr__(self):
+        return f"DynamicRecord(id={self.id}, uid={self.uid!r}, needs_like={self.needs_like}, pub_ts={self.pub_ts}, type={self.type!r}{', pinned=True' if self.pinned else ''})"
+
+
+def project_item(item, uid=None):
+    """把 Polymer API 的一条 item 投影为 DynamicRecord；uid 为 None 时取 module_author.mid (关注时间线)。ID 无效时返回 None"""
+    id_str = item.get("id_str")
+    try: dynamic_id = int(id_str)
+    except (TypeError, ValueError): return None
+    if dynamic_id <= 0: return None
+    modules = item.get('modules') or {}; author = modules.get('module_author') or {}
+    like_info = (modules.get('module_stat') or {}).get('like_info') or {}
+    try: pub_ts = int(author.get('pub_ts') or 0)
+    except (TypeError, ValueError): pub_ts = 0
+    if uid is None: uid = str(author.get('mid') or "")
+    uname = author.get('name') or (item.get('basic') or {}).get('name')
+    dynamic_type = item.get('type')
+    return DynamicRecord(dynamic_id, uid, sys.intern(uname) if uname else f"UID_{uid}", like_info.get('is_liked') != 1, pub_ts,
+                         sys.intern(dynamic_type) if dynamic_type else None, (modules.get('module_tag') or {}).get('text') == "置顶", modules.get('module_dynamic'))
@@ -0,0 +1,544 @@
+# engine.py
+# -*- coding: utf-8 -*-
+# 无界面扫描/点赞引擎 + 命令行守护进程入口 (python -m engine)，不导入 tkinter / PIL
+
+# --- 基础模块导入 ---
+import argparse
+import sys
+import threading
+import time
+import traceback
+
+import requests
+
+# --- 自定义模块导入 ---
+from bili_api import (
+    DEFAULT_COOKIE_FILE, _log_message, check_cookie_valid, describe_dynamic, get_up_dynamics, like_dynamic, load_cookies, save_cookies,
+)
+from state_store import DEFAULT_STATE_DB, StateStore, account_state_path
+from dedup_index import UidDedupIndex
+from backfill import Backfiller
+from like_verifier import PendingLikeVerifier
+from scheduler import AdaptivePollScheduler, adaptive_interval_bounds
+from like_queue import LikeQueue, LikeWorker
+from uid_import import following_uids, read_uid_file
+from fanin import FollowingFeedMonitor
+from rate_limit import bind_rate_limiter, session_rate_limiter
+from clock import bind_clock, session_clock, session_rng
+from http_session import StopCanceller, create_session, format_session_stats
+from metrics import DEFAULT_METRICS_INTERVAL, POLL_ROUND_SECONDS, QUEUE_DEPTH, STOP_SECONDS, MetricsExporter, freshness_summary, record_detected, record_like
+
+# 扫描与点赞的节奏 (simulate.py 在虚拟时钟上运行本引擎，评估调整后的效果)
+POLL_JITTER = (0.8, 1.2)        # 固定间隔监控：每轮等待 = 监控间隔 × 该范围内的随机系数
+INITIAL_UID_DELAY = (0.8, 2.0)  # 首页扫描时相邻 UID 之间的等待秒数 (逐个扫描模式)
+MONITOR_UID_DELAY = (1.5, 3.5)  # 监控轮次中相邻 UID 之间的等待秒数 (逐个扫描模式)
+LIKE_DELAY = (4.0, 8.0)         # 相邻两次点赞之间的等待秒数
+
+
+def _format_quantiles(stats):
+    """{"count", "p50", "p95", "p99"} -> 可读文本 (秒)"""
+    if not stats or not stats.get("count"): return "暂无数据"
+    return f"p50 {stats['p50']:.0f} 秒 / p95 {stats['p95']:.0f} 秒 / p99 {stats['p99']:.0f} 秒 ({stats['count']} 条)"
+
+
+class LikerEngine:
+    """扫描 + 点赞核心逻辑。日志写入 log_queue (为 None 时直接打印)，UP 主昵称变化通过 on_uname(uid, uname) 回调通知前端；
+    每个 UID 检查完成或点赞成功时调用 on_progress(uid, latest_id=..., checked_at=..., liked=...) (只传有变化的字段，可能来自扫描线程或点赞线程)；
+    首页扫描与每个监控轮次结束时 (扫描线程) 调用 on_round(轮次, 耗时秒数, 入队的待点赞数)，轮次 0 为首页扫描。
+    clock / rng / rate_limiter 不为 None 时绑定到 session (见 clock.py 与 rate_limit.py)：所有计时、等待、随机间隔与请求放行都经过它们，
+    simulate.py 借此在虚拟时钟上运行本引擎。"""
+
+    def __init__(self, session, csrf_token, log_queue=None, stop_event=None, on_uname=None, fetch_concurrency=1, fetch_rps=2.0, state_store=None, dedup_window=256, backfill=False, backfill_since_ts=None, backfill_max_per_uid=None, verify_mode="detail", adaptive_poll=False, poll_min_interval=None, poll_max_interval=None, monitor_mode="per_uid", like_sink=None, on_progress=None, on_round=None, rate_limiter=None, clock=None, rng=None):
+        self.session = session; self.csrf_token = csrf_token; self.log_queue = log_queue
+        bind_clock(session, clock, rng); self.clock = session_clock(session); self.rng = session_rng(session)
+        self.stop_event = stop_event if stop_event is not None else threading.Event(); self.on_uname = on_uname; self.on_progress = on_progress; self.on_round = on_round
+        self.dedup = UidDedupIndex(window=dedup_window); self.uid_to_uname = {}  # dedup: 每个 UID 的整数水位线 + 有界已处理窗口
+        self.state_store = state_store  # 可选的 StateStore，提供水位线 / 已处理动态 / 昵称的持久化
+        if state_store is not None: state_store.keep_processed(self.dedup.window)  # 已处理动态只需保留去重窗口内的部分
+        # backfill: 首页点赞后仍未达到初始点赞数时继续翻页回溯，可按发布时间 (backfill_since_ts) 与单 UID 条数限制
+        self.backfill = backfill; self.backfill_since_ts = backfill_since_ts; self.backfill_max_per_uid = backfill_max_per_uid
+        # verify_mode: "detail" 每次点赞后请求详情确认；"deferred" 先记为待确认，由后续动态列表抓取批量确认，长期未确认的再查详情
+        self.verifier = PendingLikeVerifier(session, log_queue, self.stop_event, on_confirmed=self._mark_liked) if verify_mode == "deferred" else None
+        # adaptive_poll: 监控阶段按各 UID 发帖频率分别安排检查时间 (间隔限制在 poll_min_interval ~ poll_max_interval)
+        self.adaptive_poll = adaptive_poll; self.poll_min_interval = poll_min_interval; self.poll_max_interval = poll_max_interval; self.scheduler = None
+        # monitor_mode: "per_uid" 每个 UID 单独请求 feed/space；"feed" 已关注的 UID 改由每轮一次的关注时间线 (feed/all) 统一检查
+        self.fanin = FollowingFeedMonitor(session, log_queue, self.stop_event) if monitor_mode == "feed" else None; self.target_uids = []
+        # fetch_concurrency > 1 时整轮 UID 并发抓取 (受 fetch_rps 限速)，否则沿用逐个请求 + 随机间隔；asyncio 只在并发模式下导入
+        if fetch_concurrency > 1: from async_fetch import AsyncFetcher
+        self.fetch_rps = fetch_rps; self.fetcher = AsyncFetcher(session, log_queue, self.stop_event, max_in_flight=fetch_concurrency, max_rps=fetch_rps) if fetch_concurrency > 1 else None
+        # 所有请求经会话绑定的限流器放行 (rate_limiter 为 None 时沿用会话已绑定的或共享的 rate_limiter)；并发抓取时抓取类令牌桶的上限与 fetch_rps 保持一致
+        if rate_limiter is not None: bind_rate_limiter(session, rate_limiter)
+        self.rate_limiter = session_rate_limiter(session)
+        if self.fetcher and fetch_rps and fetch_rps > 0: self.rate_limiter.configure("fetch", fetch_rps, capacity=max(1, int(fetch_concurrency)))
+        self._rate_limit_summary = self.rate_limiter.summary()
+        # 扫描线程把待点赞动态放入 like_queue (持久化在状态库中)，run() 期间由 like_worker 线程按 like_delay 的随机间隔逐条点赞；
+        # like_sink(dynamic_id, uid, fresh): 设置后待点赞动态交给它 (分片模式下由协调进程统一点赞)，本引擎只负责扫描
+        self.like_sink = like_sink; self.like_delay = LIKE_DELAY; self._freshness_logged = None  # 上次输出时效日志时的样本数
+        self.poll_jitter = POLL_JITTER; self.monitor_uid_delay = MONITOR_UID_DELAY; self.initial_uid_delay = INITIAL_UID_DELAY  # 扫描节奏 (simulate.py / bench_e2e.py 可覆盖)
+        self._fetch_seconds = [0.0, 0]  # 逐个扫描时动态列表请求的累计耗时与次数 (含重试等待)，用于估计固定间隔模式的一轮耗时
+        self.like_queue = LikeQueue(state_store, clock=self.clock) if like_sink is None else None; self.like_worker = None; self._backfill_thread = None
+        # add_targets / remove_targets 可在其他线程调用：变更先记入 _target_edits，由扫描线程在监控轮次之间应用
+        self._target_lock = threading.Lock(); self._target_edits = []; self._targets_changed = threading.Event(); self._target_set = set()
+
+    def _learn_uname(self, uid, host_uname):
+        """记录新获取的昵称，返回用于显示的名称"""
+        if host_uname and host_uname != f"UID_{uid}":
+            if self.state_store and self.uid_to_uname.get(uid) != host_uname: self.state_store.set_uname(uid, host_uname)
+            self.uid_to_uname[uid] = host_uname
+            if self.on_uname:
+                try: self.on_uname(uid, host_uname)
+                except Exception as e: print(f"on_uname 回调出错: {e}")
+        return self.uid_to_uname.get(uid, f"UID {uid}")
+
+    def _report_progress(self, uid, **fields):
+        if self.on_progress:
+            try: self.on_progress(uid, **fields)
+            except Exception as e: print(f"on_progress 回调出错: {e}")
+
+    def _report_round(self, round_index, seconds, queued):
+        if self.on_round:
+            try: self.on_round(round_index, seconds, queued)
+            except Exception as e: print(f"on_round 回调出错: {e}")
+
+    def _restore_state(self, target_uids_list):
+        """从状态库恢复水位线、昵称与最近已处理动态，返回仍需首页扫描的 UID 列表"""
+        if not self.state_store: return list(target_uids_list)
+        stored_watermarks = self.state_store.load_watermarks(); stored_unames = self.state_store.load_unames()
+        recent_processed = self.state_store.load_recent_processed(target_uids_list, self.dedup.window)
+        uids_to_scan = []
+        for uid in target_uids_list:
+            if uid in stored_unames: self._learn_uname(uid, stored_unames[uid])
+            for dynamic_id in recent_processed.get(uid, ()): self.dedup.add(uid, dynamic_id)
+            if uid in stored_watermarks: self.dedup.set_watermark(uid, stored_watermarks[uid]); self._report_progress(uid, latest_id=self.dedup.watermark(uid))
+            else: uids_to_scan.append(uid)
+        resumed_count = len(target_uids_list) - len(uids_to_scan)
+        if resumed_count: _log_message(self.log_queue, f"从状态库恢复 {resumed_count} 个 UID 的水位线 ({len(self.dedup)} 条最近已处理动态)，跳过其首页扫描。", target_uid='main')
+        return uids_to_scan
+
+    def _set_watermark(self, uid, latest_id):
+        """latest_id 为整数，水位线只前进，返回是否更新"""
+        if not self.dedup.set_watermark(uid, latest_id): return False
+        if self.state_store: self.state_store.set_watermark(uid, str(latest_id))
+        return True
+
+    def _mark_processed(self, dynamic_id, uid):
+        """记录已处理的动态 (整数 ID)，返回是否为首次处理"""
+        if not self.dedup.add(uid, dynamic_id): return False
+        if self.state_store: self.state_store.mark_processed(str(dynamic_id), uid)
+        return True
+
+    def _mark_liked(self, dynamic_id, uid):
+        if self.state_store: self.state_store.mark_liked(dynamic_id, uid)
+
+    def _like(self, dynamic_id, owner_uid):
+        """点赞并记录结果，返回是否成功 (点赞线程调用)"""
+        like_success = like_dynamic(self.session, dynamic_id, self.csrf_token, self.log_queue, self.stop_event, target_uid=owner_uid, verify=self.verifier is None)
+        if not self.stop_event.is_set(): record_like(like_success)
+        if not like_success: return False
+        if self.verifier: self.verifier.add(dynamic_id, owner_uid)  # 待后续抓取批量确认
+        else: self._mark_liked(dynamic_id, owner_uid)
+        self._report_progress(owner_uid, liked=1)
+        return True
+
+    def _enqueue_like(self, dynamic_id, owner_uid, fresh, pub_ts=0, detected_at=None):
+        """把待点赞动态交给点赞队列 (或 like_sink)；fresh=True 的监控新动态排在初始积压之前，并记录其检测时效。返回是否为新条目"""
+        if self.like_sink: self.like_sink(dynamic_id, owner_uid, fresh, pub_ts, detected_at); return True  # 检测时效由拥有点赞队列的一方记录
+        if fresh: record_detected(owner_uid, pub_ts, detected_at)
+        return self.like_queue.put(dynamic_id, owner_uid, fresh, pub_ts)
+
+    def _log_freshness(self, final=False):
+        """输出新动态时效 (发布→检测、发布→点赞) 的整体 p50/p95/p99；样本数无变化时不重复输出。
+        final=True 时另外在各 UID 的日志中输出该 UID 的分位数，并在主日志列出点赞最慢的 UID"""
+        summary = freshness_summary(); detect = summary["detect"]["overall"]; like = summary["like"]["overall"]
+        sample_count = (detect or {}).get("count", 0) + (like or {}).get("count", 0)
+        if not sample_count: return
+        if sample_count != self._freshness_logged: _log_message(self.log_queue, f"新动态时效: 发布→检测 {_format_quantiles(detect)}；发布→点赞 {_format_quantiles(like)}", target_uid='main')
+        self._freshness_logged = sample_count
+        if not final: return
+        uids = set(summary["detect"]["samples"]) | set(summary["like"]["samples"])
+        for uid in sorted(uids): _log_message(self.log_queue, f"时效: 发布→检测 {_format_quantiles(summary['detect']['samples'].get(uid))}；发布→点赞 {_format_quantiles(summary['like']['samples'].get(uid))}", target_uid=uid)
+        slowest = sorted(summary["like"]["samples"].items(), key=lambda item: item[1]["p95"], reverse=True)[:5]
+        if len(slowest) > 1: _log_message(self.log_queue, "点赞最慢的 UID (p95): " + ", ".join(f"{self.uid_to_uname.get(uid, f'UID {uid}')} {stats['p95']:.0f} 秒" for uid, stats in slowest), target_uid='main')
+
+    def _scan_first_pages(self, uids, log_wait=True):
+        """首页扫描 (Phase 1 与运行中新增的 UID)：记录水位线与已处理动态，需点赞的作为积压入队。
+        返回 (入队条数, {uid: 第二页 offset}, {uid: 首页发布时间列表})"""
+        log_queue = self.log_queue; stop_event = self.stop_event
+        like_count = 0; first_page_offsets = {}; first_page_pub_ts = {}
+        announce_initial = lambda uid: _log_message(log_queue, f"--- 开始检查首页动态 ---", target_uid=uid)
+        for current_target_uid, (dynamics_batch, first_next_offset, first_has_more, host_uname) in self._iter_first_pages(uids, *self.initial_uid_delay, announce_initial, log_wait=log_wait):
+            self._learn_uname(current_target_uid, host_uname)
+            if stop_event.is_set(): break
+            if dynamics_batch is None: _log_message(log_queue, f"获取首页动态失败，跳过。", target_uid=current_target_uid); continue
+            if first_has_more and first_next_offset: first_page_offsets[current_target_uid] = first_next_offset
+            first_page_pub_ts[current_target_uid] = [record.pub_ts for record in dynamics_batch]
+            if not dynamics_batch: _log_message(log_queue,f"首页未找到任何动态。", target_uid=current_target_uid)
+            else:
+                _log_message(log_queue, f"获取到 {len(dynamics_batch)} 条首页动态，快速检查中...", target_uid=current_target_uid)
+                self._set_watermark(current_target_uid, max(record.id for record in dynamics_batch))
+                for record in dynamics_batch:
+                    if stop_event.is_set(): break
+                    if not self._mark_processed(record.id, current_target_uid): continue
+                    if record.needs_like and self._enqueue_like(record.dynamic_id, current_target_uid, False, record.pub_ts): like_count += 1
+            _log_message(log_queue, f"检查完毕 (最新ID: {self.dedup.watermark(current_target_uid) or 'N/A'})", target_uid=current_target_uid)
+            self._report_progress(current_target_uid, latest_id=self.dedup.watermark(current_target_uid) or None, checked_at=self.clock.time())
+        return like_count, first_page_offsets, first_page_pub_ts
+
+    def add_targets(self, uids):
+        """运行中添加目标 UID (线程安全)：在下一次检查前对新 UID 执行首页扫描 (状态库中有水位线的直接恢复)，已有 UID 不受影响"""
+        uids = [str(uid) for uid in uids]
+        if uids:
+            with self._target_lock: self._target_edits.append(("add", uids))
+            self._targets_changed.set()
+
+    def remove_targets(self, uids):
+        """运行中移除目标 UID (线程安全)，下一次检查起不再请求；水位线保留在状态库中，重新添加时从原位置继续"""
+        uids = [str(uid) for uid in uids]
+        if uids:
+            with self._target_lock: self._target_edits.append(("remove", uids))
+            self._targets_changed.set()
+
+    def _apply_target_edits(self):
+        """扫描线程调用：按提交顺序应用目标 UID 的增删，返回是否有变化"""
+        with self._target_lock: edits = self._target_edits; self._target_edits = []; self._targets_changed.clear()
+        added = {}; removed = set()  # added 用 dict 保持提交顺序
+        for action, uids in edits:
+            for uid in uids:
+                if action == "add" and uid not in self._target_set:
+                    self._target_set.add(uid)
+                    if uid in removed: removed.discard(uid)  # 同一批内先删后加：保持原状，不重新扫描
+                    else: added[uid] = None
+                elif action == "remove" and uid in self._target_set:
+                    self._target_set.discard(uid)
+                    if uid in added: del added[uid]
+                    else: removed.add(uid)
+        if not added and not removed: return False
+        added = list(added)
+        self.target_uids = [uid for uid in self.target_uids if uid not in removed] + added
+        if self.scheduler: self.scheduler.set_budget(*self._scheduler_budget(self._polling_interval, len(self.target_uids)))
+        for uid in removed:
+            self.dedup.forget(uid)
+            if self.scheduler: self.scheduler.remove(uid)
+        if removed: _log_message(self.log_queue, f"目标变更: 移除 {len(removed)} 个 UID，当前共 {len(self.target_uids)} 个。", target_uid='main')
+        if added:
+            _log_message(self.log_queue, f"目标变更: 新增 {len(added)} 个 UID，对其执行首页扫描 (其余 UID 不重新扫描)...", target_uid='main')
+            uids_to_scan = self._restore_state(added)
+            like_count, _, first_page_pub_ts = self._scan_first_pages(uids_to_scan, log_wait=False)
+            self._flush_state()
+            if self.scheduler:
+                for uid in added: self.scheduler.add(uid); self.scheduler.observe(uid, first_page_pub_ts.get(uid, ()))
+            _log_message(self.log_queue, f"目标变更: 新增 UID 首页扫描完成，{like_count} 条待点赞动态已加入队列，当前共 {len(self.target_uids)} 个 UID。", target_uid='main')
+        return True
+
+    def _wait_between_rounds(self, timeout):
+        """监控轮次之间的等待，期间有目标变更时立即应用；被停止时返回 False"""
+        deadline = self.clock.monotonic() + timeout
+        while not self.stop_event.is_set():
+            if self._targets_changed.is_set(): self._apply_target_edits()
+            remaining = deadline - self.clock.monotonic()
+            if remaining <= 0: return True
+            self.clock.wait(self.stop_event, min(remaining, self.clock.poll_interval * 5))
+        return False
+
+    def _run_backfill(self, target_uids_list, first_page_offsets):
+        """回溯线程：对各 UID 翻页，需要点赞的动态作为积压加入点赞队列 (持久化，崩溃后继续)；
+        点赞线程统计积压的成功点赞数并控制初始额度，额度用完或停止时结束。监控不等待回溯"""
+        log_queue = self.log_queue; queued_total = 0; start_time = self.clock.time()
+        enqueue = lambda record, uid: self._enqueue_like(record.dynamic_id, uid, False, record.pub_ts)
+        backfiller = Backfiller(self.session, enqueue, log_queue, self.stop_event, self.state_store, wait_capacity=self.like_worker.wait_backlog_capacity)
+        _log_message(log_queue, f"--- 回溯: 后台翻页回溯开始 (剩余初始点赞额度: {self.like_worker.backlog_budget_left()}) ---", target_uid='main')
+        try:
+            for uid in target_uids_list:
+                if self.stop_event.is_set() or backfiller.exhausted: break
+                start_offset = backfiller.resume_offset(uid, first_page_offsets.get(uid))
+                if start_offset is None: continue
+                queued_total += backfiller.run_uid(uid, start_offset, self.backfill_max_per_uid, self.backfill_since_ts)
+        except Exception as e: _log_message(log_queue, f"回溯线程出错: {e}", target_uid='main'); traceback.print_exc()
+        self._flush_state()
+        _log_message(log_queue, f"--- 回溯{'中断' if self.stop_event.is_set() else '完成'}，共加入点赞队列 {queued_total} 条，耗时 {self.clock.time() - start_time:.2f} 秒 ---", target_uid='main')
+
+    def _fixed_round_seconds(self, polling_interval_seconds, uid_count):
+        """固定间隔模式下平均每隔多久把全部 UID 各检查一次：轮间等待 + 逐个扫描时 UID 之间的等待与已测得的平均请求耗时 (并发扫描时按 fetch_rps 估计)"""
+        round_wait = polling_interval_seconds * sum(self.poll_jitter) / 2
+        if self.fetcher: return round_wait + uid_count / self.fetch_rps if self.fetch_rps and self.fetch_rps > 0 else round_wait
+        fetch_total, fetch_count = self._fetch_seconds
+        return round_wait + max(0, uid_count - 1) * sum(self.monitor_uid_delay) / 2 + (uid_count * fetch_total / fetch_count if fetch_count else 0)
+
+    def _scheduler_budget(self, polling_interval_seconds, uid_count):
+        """自适应轮询的 (预算周期, 最短间隔, 最长间隔)：总请求量与相同参数的固定间隔模式一致"""
+        base_interval = self._fixed_round_seconds(polling_interval_seconds, uid_count)
+        return (base_interval,) + adaptive_interval_bounds(base_interval, self.poll_min_interval, self.poll_max_interval)
+
+    def _create_scheduler(self, target_uids_list, polling_interval_seconds, first_page_pub_ts):
+        """以 Phase 1 看到的发布时间初始化自适应调度器"""
+        base_interval, min_interval, max_interval = self._scheduler_budget(polling_interval_seconds, len(target_uids_list))
+        scheduler = AdaptivePollScheduler(base_interval, min_interval, max_interval, clock=self.clock.time, rng=self.rng)
+        for uid in target_uids_list: scheduler.add(uid)
+        for uid in target_uids_list: scheduler.observe(uid, first_page_pub_ts.get(uid, ()))
+        _log_message(self.log_queue, f"自适应轮询: 请求预算与固定间隔模式相同 (平均每 {base_interval:.0f} 秒检查全部 {len(target_uids_list)} 个 UID 各一次)，各 UID 检查间隔限制在 {min_interval:.0f} ~ {max_interval:.0f} 秒。", target_uid='main')
+        return scheduler
+
+    def _wait_for_due_uids(self):
+        """阻塞直到至少一个 UID 到期，返回到期的 UID 列表"""
+        wait_time = self.scheduler.time_until_next()
+        if wait_time: _log_message(self.log_queue, f"监控: 下一次检查在 {wait_time:.1f} 秒后...", target_uid='main')
+        while not self.stop_event.is_set():
+            if self._targets_changed.is_set(): self._apply_target_edits()
+            due_uids = self.scheduler.pop_due()
+            if due_uids: return due_uids
+            wait_time = self.scheduler.time_until_next()
+            self.clock.wait(self.stop_event, self.clock.poll_interval * 5 if wait_time is None else min(wait_time, self.clock.poll_interval * 5))
+        return []
+
+    def _register_queue_gauges(self, register=True):
+        """导出待确认点赞、日志队列的积压数量 (register=False 时取消)"""
+        QUEUE_DEPTH.set_function(self.verifier.pending_count if register and self.verifier else None, queue="pending_verifications")
+        log_qsize = getattr(self.log_queue, "qsize", None)
+        QUEUE_DEPTH.set_function(log_qsize if register else None, queue="log")
+        QUEUE_DEPTH.set_function(self.like_queue.qsize if register and self.like_queue else None, queue="pending_likes")
+
+    def _log_rate_limit_state(self):
+        """限流/熔断状态有变化时输出一行摘要"""
+        summary = self.rate_limiter.summary()
+        if summary != self._rate_limit_summary: self._rate_limit_summary = summary; _log_message(self.log_queue, f"限流状态: {summary}", target_uid='main')
+
+    def _flush_state(self):
+        if self.state_store:
+            try: self.state_store.flush()
+            except Exception as e: _log_message(self.log_queue, f"写入状态库失败: {e}", target_uid='main')
+
+    def _iter_first_pages(self, uids, delay_min, delay_max, announce, log_wait=False, incremental=False):
+        """逐个产出 (uid, get_up_dynamics 结果)；并发模式下先整轮并发抓取再依次产出。
+        incremental=True 时对已有水位线的 UID 只解析比水位线新的动态。"""
+        stop_event = self.stop_event
+        since_ids = {uid: self.dedup.watermark(uid) for uid in uids if self.dedup.has_watermark(uid)} if incremental else {}
+        watch_ids = {uid: self.verifier.watch_ids(uid) for uid in uids} if self.verifier else {}
+        if self.fetcher:
+            for uid in uids: announce(uid)
+            results = self.fetcher.scan_uids_blocking(uids, since_ids=since_ids, watch_ids=watch_ids)
+            for uid in uids:
+                if stop_event.is_set(): return
+                result = results.get(uid, (None, None, None, None))
+                if self.verifier and result[0] is not None: self.verifier.observe(uid, result[0])
+                yield uid, result
+            return
+        for index, uid in enumerate(uids):
+            if stop_event.is_set(): return
+            announce(uid); fetch_start = self.clock.monotonic()
+            result = get_up_dynamics(self.session, uid, "", self.log_queue, stop_event, since_ids.get(uid), watch_ids.get(uid))
+            self._fetch_seconds[0] += self.clock.monotonic() - fetch_start; self._fetch_seconds[1] += 1
+            if self.verifier and result[0] is not None: self.verifier.observe(uid, result[0])
+            yield uid, result
+            if stop_event.is_set(): return
+            if len(uids) > 1 and index < len(uids) - 1:
+                uid_wait = self.rng.uniform(delay_min, delay_max)
+                if log_wait: _log_message(self.log_queue, f"等待 {uid_wait:.1f} 秒...", target_uid='main')
+                self.clock.wait(stop_event, uid_wait)
+
+    def _iter_monitor_pages(self, uids, delay_min, delay_max, announce):
+        """监控轮次的抓取：汇聚模式下已关注的目标 UID 每轮都由一次 feed/all 轮询覆盖 (结果以 get_up_dynamics 的格式产出)，
+        未关注、需要补缺口或时间线请求失败时才逐个抓取 uids 中的 UID"""
+        direct_uids = list(uids)
+        if self.fanin:
+            followed = self.fanin.refresh_following(self.target_uids)
+            since_ids = {uid: self.dedup.watermark(uid) for uid in self.target_uids if uid in followed}
+            watch_ids = {uid: self.verifier.watch_ids(uid) for uid in since_ids} if self.verifier else {}
+            poll_result = self.fanin.poll(since_ids, watch_ids) if since_ids and not self.stop_event.is_set() else None
+            if poll_result is not None:
+                routed, unames, repair_uids = poll_result
+                for uid, items in routed.items():
+                    if self.stop_event.is_set(): return
+                    if uid in repair_uids: continue
+                    if self.verifier: self.verifier.observe(uid, items)
+                    yield uid, (items, "", False, unames.get(uid))
+                direct_uids = [uid for uid in uids if uid not in since_ids] + [uid for uid in self.target_uids if uid in repair_uids]
+            elif since_ids and not self.stop_event.is_set(): _log_message(self.log_queue, "汇聚监控: 关注时间线请求失败，本轮改为逐个检查。", target_uid='main')
+        for uid, result in self._iter_first_pages(direct_uids, delay_min, delay_max, announce, incremental=True):
+            if self.fanin and result[0] is not None: self.fanin.mark_repaired(uid)
+            yield uid, result
+
+    def run(self, target_uids_list, max_initial_likes, polling_interval_seconds):
+        """阻塞运行：Phase 1 首页扫描 + 初始点赞，Phase 2 循环监控；结束时向 log_queue 发送 BACKEND_STOPPED_* 信号"""
+        log_queue = self.log_queue; stop_event = self.stop_event
+        dedup = self.dedup; uid_to_uname = self.uid_to_uname; error_occurred = False
+        self._register_queue_gauges(); self.target_uids = list(dict.fromkeys(target_uids_list)); self._target_set = set(self.target_uids)
+        canceller = StopCanceller(self.session, stop_event).start()  # 停止信号到达时立即中断在途请求，不等待超时
+        if self.like_queue is not None:
+            self.like_worker = LikeWorker(self.like_queue, self._like, log_queue, stop_event, self.like_delay, initial_budget=max_initial_likes, uname_of=lambda uid: uid_to_uname.get(uid, f"UID {uid}"), rng=self.rng).start()
+            if len(self.like_queue): _log_message(log_queue, f"从状态库恢复 {len(self.like_queue)} 条未完成的点赞。", target_uid='main')
+        try:
+            phase1_uids = self._restore_state(self.target_uids)
+            if not phase1_uids: _log_message(log_queue, "--- 所有 UID 均已从状态库恢复，直接进入监控模式 ---", target_uid='main')
+            phase1_start_time = self.clock.time()
+            if phase1_uids: _log_message(log_queue, f"--- Phase 1: 开始高速扫描 UIDs: {','.join(phase1_uids)} (检查首页) ---", target_uid='main')
+            initial_like_count, first_page_offsets, first_page_pub_ts = self._scan_first_pages(phase1_uids)
+            if stop_event.is_set(): _log_message(log_queue, f"初始扫描中断。", target_uid='main')
+            self._flush_state()
+            scan_duration = self.clock.time() - phase1_start_time
+            if phase1_uids: _log_message(log_queue, f"--- 初始扫描: 高速检查完成，共收集 {initial_like_count} 条待点赞动态，耗时 {scan_duration:.2f} 秒。---", target_uid='main'); self._report_round(0, scan_duration, initial_like_count)
+            if not stop_event.is_set() and initial_like_count: _log_message(log_queue, f"--- 初始动态已加入点赞队列，点赞线程按 {self.like_delay[0]:g}~{self.like_delay[1]:g} 秒间隔处理 (初始点赞上限: {max_initial_likes})，同时开始监控 ---", target_uid='main')
+            elif not stop_event.is_set() and phase1_uids: _log_message(log_queue, "--- 初始扫描: 未收集到需要点赞的动态。 ---", target_uid='main')
+            if self.backfill and self.like_worker and not stop_event.is_set():
+                # 回溯在后台线程翻页入队，与监控同时进行；入队速度受剩余初始额度 (初始上限 - 积压中成功点赞数) 限制
+                self._backfill_thread = self.clock.start_thread(self._run_backfill, "backfill", args=(list(self.target_uids), first_page_offsets))
+            phase1_duration = self.clock.time() - phase1_start_time
+            if not stop_event.is_set(): _log_message(log_queue, f"--- 初始扫描阶段彻底完成 (总耗时: {phase1_duration:.2f} 秒) ---", target_uid='main')
+            else: return
+            _log_message(log_queue, f"--- Phase 2: 进入监控模式 ({'自适应, 平均' if self.adaptive_poll else ''}间隔: {polling_interval_seconds:.1f} 秒) ---", target_uid='main')
+            self._polling_interval = polling_interval_seconds
+            if self.adaptive_poll: self.scheduler = self._create_scheduler(self.target_uids, polling_interval_seconds, first_page_pub_ts)
+            self._apply_target_edits()  # Phase 1 期间提交的增删
+            round_index = 0
+            while not stop_event.is_set():
+                if self.scheduler: due_uids = self._wait_for_due_uids()
+                else:
+                    wait_time = polling_interval_seconds * self.rng.uniform(*self.poll_jitter); _log_message(log_queue, f"监控: 等待 {wait_time:.1f} 秒...", target_uid='main'); self._wait_between_rounds(wait_time); due_uids = list(self.target_uids)
+                if stop_event.is_set(): break
+                new_like_count = 0; _log_message(log_queue, f"监控: 开始检查 {len(due_uids)} 个UP主...", target_uid='main')
+                uid_check_delay_min, uid_check_delay_max = self.monitor_uid_delay; check_start_time = self.clock.time()
+                announce_monitor = lambda uid: _log_message(log_queue, f"检查 {uid_to_uname.get(uid, f'UID {uid}')} (上次ID: {dedup.watermark(uid)})", target_uid=uid)
+                for current_target_uid, (dynamics_latest_batch, _, _, host_uname_latest) in self._iter_monitor_pages(due_uids, uid_check_delay_min, uid_check_delay_max, announce_monitor):
+                    last_seen_id = dedup.watermark(current_target_uid)
+                    self._learn_uname(current_target_uid, host_uname_latest)
+                    if stop_event.is_set(): break
+                    if self.scheduler: self.scheduler.observe(current_target_uid, [record.pub_ts for record in dynamics_latest_batch or ()])
+                    if dynamics_latest_batch is None: _log_message(log_queue, f"获取最新动态失败。", target_uid=current_target_uid); continue
+                    current_check_latest_id = 0; new_records = []; detected_at = self.clock.time()
+                    for record in dynamics_latest_batch:
+                        if record.id > current_check_latest_id: current_check_latest_id = record.id
+                        if dedup.is_new(current_target_uid, record.id): new_records.append(record)
+                    # 发现即入队 (较早的动态先)，且先于标记已处理与前移水位线：三者在同一次落盘中写入，中途停止或崩溃不会丢失已记为处理过的动态
+                    for record in reversed(new_records):
+                        if record.needs_like:
+                            _log_message(log_queue, f"发现新动态 -> {describe_dynamic(record)}", target_uid=current_target_uid)
+                            self._enqueue_like(record.dynamic_id, current_target_uid, True, record.pub_ts, detected_at); new_like_count += 1
+                        self._mark_processed(record.id, current_target_uid)
+                    if current_check_latest_id > last_seen_id: _log_message(log_queue, f"更新最新动态 ID 为 {current_check_latest_id}", target_uid=current_target_uid); self._set_watermark(current_target_uid, current_check_latest_id)
+                    self._report_progress(current_target_uid, latest_id=dedup.watermark(current_target_uid) or None, checked_at=self.clock.time())
+                if self.verifier and not stop_event.is_set(): self.verifier.resolve_stragglers()
+                self._flush_state()
+                check_duration = self.clock.time() - check_start_time; _log_message(log_queue, f"监控: 本轮检查完毕，耗时 {check_duration:.2f} 秒。", target_uid='main')
+                POLL_ROUND_SECONDS.observe(check_duration); round_index += 1; self._report_round(round_index, check_duration, new_like_count)
+                self._log_rate_limit_state()
+                if self.fanin: _log_message(log_queue, f"汇聚监控: 时间线累计轮询 {self.fanin.polls} 次 / {self.fanin.pages_fetched} 页，缺口 {self.fanin.gap_count} 次。", target_uid='main')
+                if stop_event.is_set(): break
+                if new_like_count: _log_message(log_queue, f"监控: 本轮共发现 {new_like_count} 条新动态，已加入点赞队列" + (f" (排队中 {self.like_queue.qsize()} 条)。" if self.like_queue else "。"), target_uid='main')
+                else: _log_message(log_queue, "监控: 本轮未发现需点赞的新动态。", target_uid='main')
+                self._log_freshness()
+        except RuntimeError as e: _log_message(log_queue, f"严重运行时错误: {e}。线程终止。", target_uid='main'); error_occurred = True; traceback.print_exc()
+        except Exception as e: _log_message(log_queue, f"后台线程发生意外错误: {e}", target_uid='main'); _log_message(log_queue, traceback.format_exc(), target_uid='main'); error_occurred = True
+        finally:
+            self._register_queue_gauges(False)
+            if self.like_worker:
+                self.like_worker.stop(); self.like_worker.join(timeout=2)
+                _log_message(log_queue, f"点赞线程: 新动态 {self.like_worker.liked_fresh} 条、积压 {self.like_worker.liked_backlog} 条点赞成功，失败 {self.like_worker.failed} 条，队列中剩余 {len(self.like_queue)} 条{' (下次启动继续)' if self.state_store else ''}。", target_uid='main')
+            if self._backfill_thread: self.clock.join(self._backfill_thread, 2)
+            if self.fetcher: self.fetcher.close()
+            _log_message(log_queue, f"连接复用统计: {format_session_stats(self.session)}", target_uid='main')
+            if self.verifier and self.verifier.pending_count(): _log_message(log_queue, f"仍有 {self.verifier.pending_count()} 条点赞待确认 (已确认 {self.verifier.confirmed_count} 条，详情请求 {self.verifier.detail_requests} 次)。", target_uid='main')
+            if not self.like_sink: self._log_freshness(final=True)
+            self._flush_state(); canceller.close()
+            if canceller.stopped_at is not None:
+                stop_duration = time.monotonic() - canceller.stopped_at; STOP_SECONDS.observe(stop_duration)
+                _log_message(log_queue, f"已停止: 耗时 {stop_duration * 1000:.0f} 毫秒 (中断在途请求 {canceller.cancelled} 个)，状态已保存。", target_uid='main')
+            stop_msg = "BACKEND_STOPPED_ERROR" if error_occurred and not stop_event.is_set() else "BACKEND_STOPPED_MANUAL"
+            if log_queue: log_queue.put({'target':'main', 'message': stop_msg})
+
+
+# --- 无界面守护进程 ---
+def create_logged_in_session(cookie_file_path, log_queue=None, allow_qr_login=False, pool_sizes=None):
+    """从 Cookie 文件恢复登录会话，返回 (session, csrf_token)；Cookie 无效且不允许扫码时返回 (None, None)"""
+    session = create_session(pool_sizes)
+    try:
+        if load_cookies(session, cookie_file_path, log_queue) and check_cookie_valid(session, log_queue): return session, session.cookies.get('bili_jct')
+        _log_message(log_queue, f"本地 Cookie 不存在或已失效: {cookie_file_path}")
+    except Exception as e: _log_message(log_queue, f"加载 Cookie 文件失败: {e}")
+    if not allow_qr_login: return None, None
+    from login import login_via_qrcode  # 仅扫码登录时才需要 qrcode 库
+    login_cookies_dict = login_via_qrcode(log_queue, session=session)
+    if not login_cookies_dict: return None, None
+    session.cookies.clear(); requests.utils.add_dict_to_cookiejar(session.cookies, login_cookies_dict)
+    save_cookies(session, cookie_file_path, log_queue)
+    return session, login_cookies_dict.get('bili_jct')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m engine", description="动态守护姬 无界面守护进程 (复用 GUI 登录保存的 Cookie 文件)")
+    parser.add_argument("uids", nargs="*", help="目标 UP 主 UID")
+    parser.add_argument("--uid-file", help="从文件读取目标 UID (空白或逗号分隔，# 开头为注释)")
+    parser.add_argument("--following", action="store_true", help="把登录账号关注的全部 UP 主加入目标 UID")
+    parser.add_argument("--max-likes", type=int, default=30, help="初始点赞数 (默认 30)")
+    parser.add_argument("--interval", type=float, default=60.0, help="监控间隔秒数 (默认 60)")
+    parser.add_argument("--cookie-file", default=DEFAULT_COOKIE_FILE, help=f"Cookie 文件路径 (默认 {DEFAULT_COOKIE_FILE})")
+    parser.add_argument("--login", action="store_true", help="Cookie 无效时在终端输出扫码登录链接")
+    parser.add_argument("--state-db", default=DEFAULT_STATE_DB, help=f"状态库路径，重启后从水位线继续监控；按登录账号分别保存为 <名称>_<账号>.db (默认 {DEFAULT_STATE_DB})")
+    parser.add_argument("--no-state", action="store_true", help="不使用状态库，每次启动重新执行首页扫描")
+    parser.add_argument("--backfill", action="store_true", help="首页点赞未达初始点赞数时继续翻页回溯 (断点保存在状态库中)")
+    parser.add_argument("--backfill-since", help="回溯的发布日期下限，格式 YYYY-MM-DD")
+    parser.add_argument("--backfill-per-uid", type=int, default=None, help="回溯时每个 UID 最多加入点赞队列的条数")
+    parser.add_argument("--verify", choices=["detail", "deferred"], default="detail", help="点赞确认方式：detail 每次点赞后查详情；deferred 由下一轮动态列表批量确认 (默认 detail)")
+    parser.add_argument("--adaptive", action="store_true", help="按各 UID 发帖频率自适应安排检查时间 (总请求量与相同参数的固定间隔模式相同，按其一轮的实际时长、含 UID 之间的等待计算)")
+    parser.add_argument("--min-interval", type=float, default=None, help="自适应模式下单个 UID 的最短检查间隔秒数")
+    parser.add_argument("--max-interval", type=float, default=None, help="自适应模式下单个 UID 的最长检查间隔秒数")
+    parser.add_argument("--monitor", choices=["per_uid", "feed"], default="per_uid", help="监控方式：per_uid 逐个请求各 UID 的动态列表；feed 已关注的 UID 由每轮一次的关注时间线统一检查 (默认 per_uid)")
+    parser.add_argument("--shards", type=int, default=1, help="工作进程数，>1 时把 UID 分片到多个进程扫描，点赞与限流仍由主进程统一执行 (默认 1)")
+    parser.add_argument("--concurrency", type=int, default=1, help="同时在途的动态请求数，>1 时并发扫描各 UID (默认 1，逐个扫描)")
+    parser.add_argument("--rps", type=float, default=2.0, help="并发扫描时每秒最多发出的动态请求数 (默认 2.0)")
+    parser.add_argument("--metrics-port", type=int, default=None, help="在 127.0.0.1 的该端口提供 /metrics (Prometheus 文本格式) 与 /metrics.json")
+    parser.add_argument("--metrics-file", default=None, help="定期把指标快照写入该 JSON 文件")
+    parser.add_argument("--metrics-interval", type=float, default=DEFAULT_METRICS_INTERVAL, help=f"指标快照写入间隔秒数 (默认 {DEFAULT_METRICS_INTERVAL:g})")
+    args = parser.parse_args(argv)
+
+    target_uids_list = list(args.uids)
+    if args.uid_file: target_uids_list += read_uid_file(args.uid_file)
+    target_uids_list = list(dict.fromkeys(target_uids_list))
+    if not all(uid.isdigit() for uid in target_uids_list) or not (target_uids_list or args.following): parser.error("请提供至少一个纯数字的有效 UID")
+    if args.max_likes <= 0: parser.error("初始点赞数必须是正整数")
+    if args.interval <= 0: parser.error("监控间隔秒数必须是正数")
+    if args.concurrency <= 0 or args.rps <= 0: parser.error("并发数与每秒请求数必须是正数")
+    if args.shards <= 0: parser.error("--shards 必须是正整数")
+    if args.shards > 1 and (args.backfill or args.verify == "deferred" or args.monitor == "feed"): parser.error("--shards 不能与 --backfill、--verify deferred、--monitor feed 同时使用")
+    backfill_since_ts = None
+    if args.backfill_since:
+        try: backfill_since_ts = time.mktime(time.strptime(args.backfill_since, "%Y-%m-%d"))
+        except ValueError: parser.error("--backfill-since 格式应为 YYYY-MM-DD")
+
+    session, csrf_token = create_logged_in_session(args.cookie_file, allow_qr_login=args.login, pool_sizes={"api.bilibili.com": max(8, args.concurrency)})
+    if not session or not csrf_token: _log_message(None, "未登录：请先在 GUI 中扫码登录，或使用 --login 参数。"); return 2
+    if args.following:
+        followings = following_uids(session)
+        if followings is None: _log_message(None, "获取关注列表失败。"); return 2
+        target_uids_list = list(dict.fromkeys(target_uids_list + [uid for uid, _ in followings]))
+        _log_message(None, f"从关注列表导入 {len(followings)} 个 UID，共 {len(target_uids_list)} 个目标。")
+        if not target_uids_list: _log_message(None, "关注列表为空，没有目标 UID。"); return 2
+
+    exporter = None
+    if args.metrics_port is not None or args.metrics_file:
+        try: exporter = MetricsExporter(port=args.metrics_port, snapshot_path=args.metrics_file, interval=args.metrics_interval).start()
+        except OSError as e: parser.error(f"无法启动指标端点: {e}")
+        if exporter.port is not None: _log_message(None, f"指标端点: http://127.0.0.1:{exporter.port}/metrics")
+    state_store = None
+    if not args.no_state:
+        state_path = account_state_path(args.state_db, session.cookies.get('DedeUserID'))
+        if state_path: state_store = StateStore(state_path); _log_message(None, f"状态库: {state_path}")
+        else: _log_message(None, "警告: Cookie 中没有 DedeUserID，无法区分账号，本次不使用状态库。")
+    if args.shards > 1:
+        from sharded import ShardedEngine
+        engine = ShardedEngine(session, csrf_token, workers=args.shards, fetch_concurrency=args.concurrency, fetch_rps=args.rps, state_store=state_store,
+                               adaptive_poll=args.adaptive, poll_min_interval=args.min_interval, poll_max_interval=args.max_interval)
+    else:
+        engine = LikerEngine(session, csrf_token, fetch_concurrency=args.concurrency, fetch_rps=args.rps, state_store=state_store,
+                             backfill=args.backfill, backfill_since_ts=backfill_since_ts, backfill_max_per_uid=args.backfill_per_uid, verify_mode=args.verify,
+                             adaptive_poll=args.adaptive, poll_min_interval=args.min_interval, poll_max_interval=args.max_interval, monitor_mode=args.monitor)
+    _log_message(None, f"启动任务: UIDs={','.join(target_uids_list)}, 初始上限={args.max_likes}, 间隔={args.interval:.1f}秒")
+    worker = threading.Thread(target=engine.run, args=(target_uids_list, args.max_likes, args.interval), daemon=True); worker.start()
+    try:
+        while worker.is_alive(): worker.join(timeout=0.5)
+    except KeyboardInterrupt:
+        _log_message(None, "收到中断信号，正在停止..."); engine.stop_event.set(); worker.join(timeout=5)
+    finally:
+        if state_store: state_store.close()
+        if exporter: exporter.stop()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+# fanin.py
+# -*- coding: utf-8 -*-
+# 汇聚监控：每轮只请求一次登录账号的关注动态时间线 (feed/all)，按作者 mid 把新动态分发给各目标 UID。
+# 只有未关注的目标 UID，以及时间线翻页上限内没能衔接上水位线的 UID (缺口) 才回退到逐个 get_up_dynamics。
+
+import random
+import time
+
+from bili_api import _log_message, get_following_feed, get_relations
+
+FOLLOWED_ATTRIBUTES = (2, 6)  # relation attribute: 2 已关注，6 互相关注
+
+
+class FollowingFeedMonitor:
+    """feed/all 轮询器。每次 poll 从时间线顶部向下翻页，直到遇到上一次轮询看到的最新 ID (首次为各 UID 水位线的最小值)，
+    最多 max_pages 页；翻页上限内未衔接上的 UID 记为缺口，由调用方逐个抓取后调用 mark_repaired。"""
+
+    def __init__(self, session, log_queue=None, stop_event=None, max_pages=5, page_delay=(0.5, 1.5), recheck_interval=3600.0, clock=time.monotonic):
+        self.session = session; self.log_queue = log_queue; self.stop_event = stop_event
+        self.max_pages = max_pages; self.page_delay = page_delay; self.recheck_interval = recheck_interval; self.clock = clock
+        self.followed = set(); self._checked_uids = frozenset(); self._checked_at = None
+        self.top_id = 0; self.repair_uids = set()
+        self.polls = 0; self.pages_fetched = 0; self.gap_count = 0
+
+    def refresh_following(self, uids):
+        """返回目标 UID 中已关注的集合；目标列表变化或超过 recheck_interval 时重新查询关注关系，查询失败时沿用上次结果"""
+        uids = frozenset(str(uid) for uid in uids); now = self.clock()
+        if uids == self._checked_uids and self._checked_at is not None and now - self._checked_at < self.recheck_interval: return self.followed & uids
+        relations = get_relations(self.session, sorted(uids), self.log_queue, self.stop_event)
+        if relations is None: return self.followed & uids
+        followed = {uid for uid, attribute in relations.items() if attribute in FOLLOWED_ATTRIBUTES}
+        if followed != self.followed & uids:
+            _log_message(self.log_queue, f"汇聚监控: {len(followed)}/{len(uids)} 个目标 UP 主已关注，由关注时间线统一检查；其余 {len(uids) - len(followed)} 个逐个检查。", target_uid='main')
+        newly_followed = followed - self.followed
+        self.followed = followed; self._checked_uids = uids; self._checked_at = now
+        # 新加入汇聚的 UID 与时间线之间没有衔接点，先逐个抓取一次
+        self.repair_uids = (self.repair_uids & followed) | (newly_followed if self.top_id else set())
+        return set(followed)
+
+    def poll(self, since_ids, watch_ids=None):
+        """since_ids: {已关注 UID: 水位线 (0 为无)}。返回 ({uid: [新动态]}, {uid: 昵称}, 需要逐个抓取的 UID 集合)；请求失败或中断返回 None"""
+        watch_ids = watch_ids or {}; stop_event = self.stop_event
+        known_since = [since for since in since_ids.values() if since]
+        boundary = self.top_id or (min(known_since) if known_since else 0)
+        routed = {uid: [] for uid in since_ids}; unames = {}
+        offset = ""; reached = False; newest_id = 0; oldest_id = None; page = 1
+        while page <= self.max_pages:
+            items, next_offset, has_more = get_following_feed(self.session, offset, self.log_queue, stop_event, page=page)
+            if items is None: return None
+            self.pages_fetched += 1
+            for record in items:
+                dynamic_id = record.id
+                newest_id = max(newest_id, dynamic_id); oldest_id = dynamic_id if oldest_id is None else min(oldest_id, dynamic_id)
+                if boundary and dynamic_id <= boundary: reached = True
+                uid = record.uid
+                if uid not in routed: continue
+                unames[uid] = record.uname
+                if dynamic_id > since_ids[uid] or record.dynamic_id in watch_ids.get(uid, ()): routed[uid].append(record)
+            if reached or not has_more or not next_offset: reached = reached or not has_more; break
+            if stop_event is not None and stop_event.is_set(): return None
+            page += 1; offset = next_offset
+            if stop_event is not None: stop_event.wait(timeout=random.uniform(*self.page_delay))
+        self.polls += 1
+        if newest_id: self.top_id = max(self.top_id, newest_id)
+        if not reached:
+            # 翻到上限仍未衔接：水位线早于本次看到的最早一条的 UID 可能漏掉了中间的动态
+            gap_uids = {uid for uid, since in since_ids.items() if oldest_id is None or since < oldest_id}
+            if gap_uids: self.gap_count += 1; _log_message(self.log_queue, f"汇聚监控: 关注时间线翻页 {self.max_pages} 页仍未衔接上次位置，{len(gap_uids)} 个 UP 主改为逐个检查。", target_uid='main')
+            self.repair_uids |= gap_uids
+        return routed, unames, set(self.repair_uids)
+
+    def mark_repaired(self, uid):
+        self.repair_uids.discard(uid)
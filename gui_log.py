@@ -0,0 +1,134 @@
+# gui_log.py
+# -*- coding: utf-8 -*-
+# GUI 日志管道：有界日志队列 (满时丢弃普通日志并计数，控制消息不丢) + 按标签合并的批量取出，
+# 以及界面侧的日志存储 (全部日志 + 按 UID 索引，供单一日志视图过滤) 与各 UID 概览 (只刷新有变化的行)。
+
+import queue
+import threading
+from collections import deque
+from itertools import islice
+
+# 后台线程发给 GUI 的控制消息，队列满时也必须送达
+CONTROL_MESSAGES = frozenset({"LOGIN_SUCCESS", "LOGIN_FAILED", "LOGIN_PROCESS_FINISHED", "BACKEND_STARTED", "BACKEND_STOPPED_MANUAL", "BACKEND_STOPPED_ERROR"})
+LOG_QUEUE_MAXSIZE = 10000  # 队列中最多积压的普通日志条数
+LOG_BATCH_PER_TICK = 1000  # GUI 每次轮询最多处理的条数，剩余的留到下一次 (避免一次突发卡住 Tk 主循环)
+LOG_MAX_LINES = 2000       # 日志视图中最多显示的行数，超出后删除最早的行
+LOG_STORE_LINES = 20000    # 日志存储保留的总行数 (“全部”视图从这里取)
+LOG_STORE_LINES_PER_TARGET = 300  # 每个 UID 额外保留的最近行数，刷屏的 UID 不会挤掉其他 UID 的日志
+
+
+def normalize_log_entry(entry):
+    """统一为 (target, message)；login.py 等模块直接放入字符串时视为主日志"""
+    if isinstance(entry, dict): return entry.get('target') or 'main', entry.get('message', '')
+    return 'main', entry
+
+
+class BoundedLogQueue:
+    """与 queue.Queue 的 put / get_nowait / empty 接口兼容的有界日志队列。
+    普通日志在队列满时直接丢弃 (put 不阻塞后台线程)，按标签页累计丢弃条数，由 GUI 取出后提示。"""
+
+    def __init__(self, maxsize=LOG_QUEUE_MAXSIZE):
+        self.maxsize = maxsize; self._items = deque(); self._lock = threading.Lock()
+        self._dropped = {}; self.dropped_total = 0
+
+    def put(self, entry, block=True, timeout=None):
+        with self._lock:
+            if len(self._items) >= self.maxsize:
+                target, message = normalize_log_entry(entry)
+                if message not in CONTROL_MESSAGES:
+                    self._dropped[target] = self._dropped.get(target, 0) + 1; self.dropped_total += 1; return False
+            self._items.append(entry); return True
+
+    def put_nowait(self, entry): return self.put(entry, block=False)
+
+    def get_nowait(self):
+        with self._lock:
+            if not self._items: raise queue.Empty
+            return self._items.popleft()
+
+    def empty(self):
+        with self._lock: return not self._items
+
+    def qsize(self):
+        with self._lock: return len(self._items)
+
+    def drain(self, max_items=LOG_BATCH_PER_TICK):
+        """一次取出最多 max_items 条"""
+        with self._lock:
+            count = min(max_items, len(self._items))
+            return [self._items.popleft() for _ in range(count)]
+
+    def take_dropped(self):
+        """返回并清零 {target: 自上次调用以来丢弃的条数}"""
+        with self._lock:
+            dropped = self._dropped; self._dropped = {}; return dropped
+
+
+def group_log_entries(entries):
+    """把一批日志按顺序拆成控制消息列表与 {target: [行, ...]}，每个标签每次只需处理一次"""
+    controls = []; lines_by_target = {}
+    for entry in entries:
+        target, message = normalize_log_entry(entry)
+        if message in CONTROL_MESSAGES: controls.append(message)
+        else: lines_by_target.setdefault(target, []).append(str(message))
+    return controls, lines_by_target
+
+
+class LogStore:
+    """界面侧的日志存储：全部日志按到达顺序存在一个有界 deque 中，同时按 target 建索引 (每个 target 一个有界 deque，引用同一行字符串)。
+    日志视图只渲染当前过滤条件下的最后 LOG_MAX_LINES 行，切换过滤时从这里取，不需要为每个 UID 保留一个 Text 控件"""
+
+    def __init__(self, max_lines=LOG_STORE_LINES, per_target=LOG_STORE_LINES_PER_TARGET):
+        self.per_target = per_target; self._all = deque(maxlen=max_lines); self._by_target = {}
+
+    def append(self, target, lines):
+        by_target = self._by_target.get(target)
+        if by_target is None: by_target = self._by_target[target] = deque(maxlen=self.per_target)
+        for line in lines: self._all.append((target, line)); by_target.append(line)
+
+    def lines(self, target=None, limit=LOG_MAX_LINES):
+        """target 为 None 时返回 [(target, 行)] (全部)，否则返回该 target 的 [行]；均为最后 limit 条"""
+        source = self._all if target is None else self._by_target.get(target, ())
+        if len(source) <= limit: return list(source)
+        recent = list(islice(reversed(source), limit)); recent.reverse(); return recent
+
+    def forget(self, target):
+        """UID 被移除时丢弃它的索引 (全部日志中的行随 deque 滚动自然淘汰)"""
+        self._by_target.pop(target, None)
+
+    def clear(self):
+        self._all.clear(); self._by_target.clear()
+
+
+class UidSummary:
+    """各 UID 的概览：昵称、最新动态 ID、上次检查时间、本次任务点赞数。
+    update 可在任意线程调用，只记录有变化的 UID；GUI 轮询时 take_dirty 取出这些行刷新表格，代价与 UID 总数无关"""
+    _EMPTY = {"uname": None, "latest_id": None, "checked_at": None, "liked": 0}
+
+    def __init__(self):
+        self._rows = {}; self._dirty = set(); self._lock = threading.Lock()
+
+    def update(self, uid, uname=None, latest_id=None, checked_at=None, liked=0):
+        with self._lock:
+            row = self._rows.get(uid)
+            if row is None: row = self._rows[uid] = dict(self._EMPTY)
+            if uname: row["uname"] = uname
+            if latest_id: row["latest_id"] = latest_id
+            if checked_at: row["checked_at"] = checked_at
+            row["liked"] += liked; self._dirty.add(uid)
+
+    def reset(self, uids):
+        """新任务开始：保留昵称，清空其余字段；返回后所有 uids 都视为有变化"""
+        with self._lock:
+            self._rows = {uid: dict(self._EMPTY, uname=(self._rows.get(uid) or {}).get("uname")) for uid in uids}; self._dirty = set(uids)
+
+    def remove(self, uid):
+        with self._lock: self._rows.pop(uid, None); self._dirty.discard(uid)
+
+    def uname(self, uid):
+        with self._lock: return (self._rows.get(uid) or {}).get("uname")
+
+    def take_dirty(self):
+        """返回并清空 {uid: 行字段副本}"""
+        with self._lock:
+            dirty = {uid: dict(self._rows[uid]) for uid in self._dirty if uid in self._rows}; self._dirty = set(); return dirty
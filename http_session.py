@@ -0,0 +1,180 @@
+# http_session.py
+# -*- coding: utf-8 -*-
+# requests 会话工厂：按主机分别配置长连接池，Cookie Jar 线程安全，统计连接复用情况 (新建连接数 ≈ TLS 握手次数)；
+# 在途请求可被取消 (关闭借出连接的套接字)，停止任务时不必等待请求超时
+
+import socket
+import threading
+import time
+import weakref
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.cookies import RequestsCookieJar
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from metrics import metrics
+
+# 各主机的连接池大小 (同时在途请求数上限)；动态列表接口可能被并发抓取，点赞/详情与扫码登录请求是串行的
+HOST_POOL_SIZES = {
+    "api.bilibili.com": 8,        # feed/space、nav
+    "api.vc.bilibili.com": 4,     # dynamic_like/thumb、get_dynamic_detail
+    "passport.bilibili.com": 2,   # 扫码登录
+}
+DEFAULT_POOL_SIZE = 4  # 其他主机
+
+HTTP_CONNECTIONS = metrics.gauge("bili_http_connections", "各主机当前会话累计新建的 HTTP 连接数 (约等于 TLS 握手次数，新建会话时重新计数)", ("host",))
+HTTP_POOL_REQUESTS = metrics.gauge("bili_http_pool_requests", "各主机当前会话通过连接池发出的请求数", ("host",))
+
+
+class ThreadSafeCookieJar(RequestsCookieJar):
+    """GUI 线程与后台线程共用的 Cookie Jar。http.cookiejar 只在部分方法内加锁，
+    requests 的字典式读写 (get / set / get_dict / 迭代) 则完全不加锁，这里统一用 CookieJar 自带的 RLock 保护。"""
+
+    def __iter__(self):
+        with self._cookies_lock: return iter(list(super().__iter__()))
+
+    def get(self, name, default=None, domain=None, path=None):
+        with self._cookies_lock: return super().get(name, default, domain, path)
+
+    def set(self, name, value, **kwargs):
+        with self._cookies_lock: return super().set(name, value, **kwargs)
+
+    def set_cookie(self, cookie, *args, **kwargs):
+        with self._cookies_lock: return super().set_cookie(cookie, *args, **kwargs)
+
+    def update(self, other):
+        with self._cookies_lock: return super().update(other)
+
+    def get_dict(self, domain=None, path=None):
+        with self._cookies_lock: return super().get_dict(domain, path)
+
+    def clear(self, domain=None, path=None, name=None):
+        with self._cookies_lock: return super().clear(domain, path, name)
+
+    def copy(self):
+        with self._cookies_lock:
+            new_jar = ThreadSafeCookieJar(); new_jar.set_policy(self.get_policy()); new_jar.update(self); return new_jar
+
+    def __len__(self):
+        with self._cookies_lock: return super().__len__()
+
+
+class _CancellableMixin:
+    """记录从连接池借出 (请求进行中) 的连接；cancel_inflight() 关闭它们的套接字，阻塞在 recv 上的请求随即抛出 ConnectionError"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs); self._inflight = weakref.WeakSet(); self._inflight_lock = threading.Lock()
+
+    def _get_conn(self, timeout=None):
+        conn = super()._get_conn(timeout)
+        with self._inflight_lock: self._inflight.add(conn)
+        return conn
+
+    def _put_conn(self, conn):
+        if conn is not None:
+            with self._inflight_lock: self._inflight.discard(conn)
+        super()._put_conn(conn)
+
+    def cancel_inflight(self):
+        """返回被中断的连接数 (尚在建立 TCP 连接的请求只能等待连接超时)"""
+        with self._inflight_lock: conns = list(self._inflight)
+        cancelled = 0
+        for conn in conns:
+            sock = getattr(conn, "sock", None)
+            if sock is None: continue
+            try: socket.socket.shutdown(sock, socket.SHUT_RDWR); cancelled += 1  # 绕过 SSLSocket.shutdown，直接关闭底层套接字
+            except OSError: pass
+        return cancelled
+
+
+class _CancellableHTTPConnectionPool(_CancellableMixin, HTTPConnectionPool): pass
+class _CancellableHTTPSConnectionPool(_CancellableMixin, HTTPSConnectionPool): pass
+
+
+class _PooledAdapter(HTTPAdapter):
+    """单一主机的适配器：连接池保留 pool_maxsize 条长连接，不在 urllib3 层重试 (重试由 bili_api 与限流器负责)"""
+
+    def __init__(self, host, pool_maxsize):
+        self.host = host
+        super().__init__(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=0)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _CancellableHTTPConnectionPool, "https": _CancellableHTTPSConnectionPool}
+
+    def cancel_inflight(self):
+        pools = self.poolmanager.pools; cancelled = 0
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if isinstance(pool, _CancellableMixin): cancelled += pool.cancel_inflight()
+        return cancelled
+
+    def pool_stats(self):
+        """返回 (请求数, 新建连接数)；只统计仍在 PoolManager 中的连接池"""
+        requests_count = connections = 0; pools = self.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None: continue
+            requests_count += pool.num_requests; connections += pool.num_connections
+        return requests_count, connections
+
+
+def create_session(pool_sizes=None, cookie_jar=None):
+    """创建会话：HOST_POOL_SIZES 中的每个主机各用一个独立连接池 (pool_sizes 可覆盖大小)，Cookie Jar 线程安全。
+    连接复用情况通过 session_stats() 或 bili_http_* 指标查看。"""
+    sizes = dict(HOST_POOL_SIZES); sizes.update(pool_sizes or {})
+    session = requests.Session(); session.cookies = cookie_jar if cookie_jar is not None else ThreadSafeCookieJar()
+    default_adapter = _PooledAdapter("*", DEFAULT_POOL_SIZE); session.mount("https://", default_adapter); session.mount("http://", default_adapter)
+    for host, size in sizes.items():
+        adapter = _PooledAdapter(host, size); session.mount(f"https://{host}/", adapter)
+        HTTP_CONNECTIONS.set_function(lambda adapter=adapter: adapter.pool_stats()[1], host=host)
+        HTTP_POOL_REQUESTS.set_function(lambda adapter=adapter: adapter.pool_stats()[0], host=host)
+    return session
+
+
+def cancel_inflight(session):
+    """中断 session 上所有进行中的请求，返回被中断的连接数。空闲的长连接不受影响"""
+    return sum(adapter.cancel_inflight() for adapter in set(session.adapters.values()) if isinstance(adapter, _PooledAdapter))
+
+
+class StopCanceller:
+    """后台线程监视 stop_event：被设置时立即中断 session 的在途请求，并记录检测到停止的时间 (stopped_at，monotonic)；
+    此后直到 close() 前持续中断新借出的连接 (停止信号前刚通过限流器的请求)。用法: with StopCanceller(session, stop_event) as canceller: ..."""
+
+    def __init__(self, session, stop_event, poll_interval=0.05):
+        self.session = session; self.stop_event = stop_event; self.poll_interval = poll_interval
+        self.stopped_at = None; self.cancelled = 0; self._closed = threading.Event(); self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="stop-canceller", daemon=True); self._thread.start(); return self
+
+    def _run(self):
+        while not self._closed.is_set():
+            if self.stop_event.wait(self.poll_interval):
+                if self.stopped_at is None: self.stopped_at = time.monotonic()
+                self.cancelled += cancel_inflight(self.session); self._closed.wait(self.poll_interval)
+
+    def close(self):
+        self._closed.set()
+        if self._thread and self._thread is not threading.current_thread(): self._thread.join(1.0)
+
+    def __enter__(self): return self.start()
+    def __exit__(self, *exc_info): self.close()
+
+
+def session_stats(session):
+    """{host: {"requests": 请求数, "connections": 新建连接数, "reused": 复用连接的请求数}}"""
+    stats = {}
+    for adapter in set(session.adapters.values()):
+        if not isinstance(adapter, _PooledAdapter): continue
+        requests_count, connections = adapter.pool_stats()
+        if requests_count: stats[adapter.host] = {"requests": requests_count, "connections": connections, "reused": max(0, requests_count - connections)}
+    return stats
+
+
+def format_session_stats(session):
+    """单行描述，用于日志"""
+    stats = session_stats(session)
+    if not stats: return "暂无请求"
+    return "；".join(f"{host}: {info['requests']} 次请求 / {info['connections']} 条新连接" for host, info in sorted(stats.items()))
@@ -0,0 +1,62 @@
+# importtime_check.py
+# -*- coding: utf-8 -*-
+# 冷启动导入耗时检查：用 python -X importtime 在全新子进程中导入入口模块，取多次运行的中位数与预算比较，
+# 并确认只在特定操作中才需要的重量级模块没有在启动时被导入。超出预算或出现禁止模块时退出码为 1。
+# 用法: python importtime_check.py [--module main_gui] [--budget-ms 300] [--runs 5] [--top 10]
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+# 入口模块 -> (导入耗时预算毫秒, 启动时不应导入的模块)
+# 预算按开发机上的源码运行设定；PyInstaller 打包后解压 (sys._MEIPASS) 还会额外增加耗时，但导入部分与此相同
+BUDGETS = {
+    "main_gui": (300, ("PIL", "qrcode", "webbrowser", "asyncio", "sqlite3", "engine", "state_store")),
+    "engine": (250, ("tkinter", "PIL", "qrcode", "asyncio")),
+}
+
+
+def measure(module):
+    """在子进程中导入 module，返回 {模块名: (自身微秒, 累计微秒, 层级)}，按导入顺序排列"""
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], capture_output=True, text=True)
+    if completed.returncode != 0: raise RuntimeError(f"导入 {module} 失败:\n{completed.stderr[-2000:]}")
+    timings = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line: continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        if not self_us.strip().isdigit(): continue  # 表头
+        timings[name.strip()] = (int(self_us), int(cumulative_us), (len(name) - len(name.lstrip()) - 1) // 2)
+    return timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="检查入口模块的冷启动导入耗时")
+    parser.add_argument("--module", default="main_gui", help="入口模块 (默认 main_gui)")
+    parser.add_argument("--budget-ms", type=float, default=None, help="导入耗时预算毫秒数 (默认见 BUDGETS)")
+    parser.add_argument("--runs", type=int, default=5, help="运行次数，取中位数 (默认 5)")
+    parser.add_argument("--top", type=int, default=10, help="列出耗时最多的直接依赖个数")
+    args = parser.parse_args(argv)
+
+    default_budget, forbidden = BUDGETS.get(args.module, (300, ()))
+    budget_ms = args.budget_ms if args.budget_ms is not None else default_budget
+    runs = [measure(args.module) for _ in range(max(1, args.runs))]
+    totals_ms = [timings[args.module][1] / 1000 for timings in runs if args.module in timings]
+    if not totals_ms: print(f"未找到 {args.module} 的导入记录 (可能已被 site 预先导入)"); return 1
+    median_ms = statistics.median(totals_ms)
+
+    # 最后一次运行中入口模块的直接依赖，按累计耗时排序
+    last = runs[-1]; direct = sorted(((cumulative, name) for name, (_, cumulative, level) in last.items() if level == 1), reverse=True)
+    print(f"{args.module}: 导入耗时中位数 {median_ms:.1f} ms (共 {len(totals_ms)} 次: {', '.join(f'{value:.0f}' for value in totals_ms)})，预算 {budget_ms:.0f} ms")
+    for cumulative, name in direct[:args.top]: print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    loaded_forbidden = [name for name in forbidden if any(loaded == name or loaded.startswith(name + ".") for loaded in last)]
+    failed = False
+    if loaded_forbidden: print(f"失败: 启动时导入了应延迟导入的模块: {', '.join(loaded_forbidden)}"); failed = True
+    if median_ms > budget_ms: print(f"失败: 导入耗时超出预算 {median_ms - budget_ms:.1f} ms"); failed = True
+    if not failed: print("通过")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
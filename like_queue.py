@@ -0,0 +1,147 @@
+# like_queue.py
+# -*- coding: utf-8 -*-
+# 扫描与点赞解耦：扫描线程把待点赞动态放入去重的优先队列 (监控阶段的新动态排在初始/回溯积压之前)，
+# 点赞线程按设定节奏逐条取出。队列内容写入状态库，进程崩溃或重启后未完成的点赞会继续执行。
+# 条目带有动态的发布时间 (pub_ts)，新动态点赞成功时记录发布到点赞的时效 (TIME_TO_LIKE)。
+
+import heapq
+import itertools
+import random
+import threading
+
+from bili_api import _log_message
+from clock import system_clock
+from metrics import record_time_to_like
+from rate_limit import STOP_POLL_INTERVAL
+
+FRESH, BACKLOG = 0, 1  # 优先级：数值小的先点赞
+
+
+class LikeQueue:
+    """去重优先队列。同一优先级内按入队顺序；state_store 不为 None 时入队/完成都会持久化，构造时恢复上次未完成的条目。
+    clock 为 clock.py 的时钟对象 (入队时间与等待，默认真实时钟)"""
+
+    def __init__(self, state_store=None, clock=None):
+        self.state_store = state_store; self.clock = clock or system_clock; self._cond = self.clock.condition()
+        self._heap = []; self._queued = {}; self._in_flight = set(); self._seq = itertools.count()
+        if state_store:
+            for dynamic_id, uid, priority, enqueued_at, pub_ts in state_store.load_like_queue(): self._push(dynamic_id, uid, priority, enqueued_at, pub_ts)
+
+    def _push(self, dynamic_id, uid, priority, enqueued_at, pub_ts=0):
+        entry = (priority, next(self._seq), dynamic_id, uid, enqueued_at, pub_ts)
+        heapq.heappush(self._heap, entry); self._queued[dynamic_id] = entry
+
+    def put(self, dynamic_id, uid, fresh=True, pub_ts=0):
+        """入队，返回是否为新条目。已在队列中的积压条目再次以新动态入队时提升优先级；pub_ts 为动态发布时间 (未知时为 0)"""
+        dynamic_id = str(dynamic_id); priority = FRESH if fresh else BACKLOG
+        with self._cond:
+            if dynamic_id in self._in_flight: return False
+            existing = self._queued.get(dynamic_id)
+            if existing is not None:
+                if existing[0] <= priority: return False
+                self._queued.pop(dynamic_id)  # 旧堆条目在 get() 时跳过
+            enqueued_at = self.clock.time() if existing is None else existing[4]; pub_ts = pub_ts or (existing[5] if existing is not None else 0)
+            self._push(dynamic_id, uid, priority, enqueued_at, pub_ts)
+            if self.state_store: self.state_store.enqueue_like(dynamic_id, uid, priority, enqueued_at, pub_ts)
+            self._cond.notify()
+            return existing is None
+
+    def get(self, stop_event=None, timeout=None):
+        """取出优先级最高的条目 (dynamic_id, uid, fresh, enqueued_at, pub_ts)，等待超时或 stop_event 被设置时返回 None。
+        取出后须调用 done()"""
+        deadline = None if timeout is None else self.clock.monotonic() + timeout; poll_interval = self.clock.poll_interval
+        with self._cond:
+            while True:
+                while self._heap:
+                    entry = heapq.heappop(self._heap); priority, _, dynamic_id, uid, enqueued_at, pub_ts = entry
+                    if self._queued.get(dynamic_id) is not entry: continue  # 已被提升优先级的旧条目
+                    del self._queued[dynamic_id]; self._in_flight.add(dynamic_id)
+                    return dynamic_id, uid, priority == FRESH, enqueued_at, pub_ts
+                if stop_event is not None and stop_event.is_set(): return None
+                remaining = None if deadline is None else deadline - self.clock.monotonic()
+                if remaining is not None and remaining <= 0: return None
+                self._cond.wait(poll_interval if remaining is None else min(remaining, poll_interval))
+
+    def done(self, dynamic_id, requeue=False):
+        """完成 (点赞成功、失败或放弃) 后从持久化队列中删除；requeue=True 时 (例如被停止打断) 保留，下次启动继续"""
+        with self._cond:
+            self._in_flight.discard(dynamic_id)
+            if not requeue and self.state_store: self.state_store.dequeue_like(dynamic_id)
+
+    def counts(self):
+        """{"fresh": 新动态条数, "backlog": 积压条数}"""
+        with self._cond:
+            fresh = sum(1 for entry in self._queued.values() if entry[0] == FRESH)
+            return {"fresh": fresh, "backlog": len(self._queued) - fresh}
+
+    def qsize(self):
+        with self._cond: return len(self._queued)
+
+    def unfinished(self):
+        """排队中 + 正在点赞的条数"""
+        with self._cond: return len(self._queued) + len(self._in_flight)
+
+    def __len__(self): return self.qsize()
+
+
+class LikeWorker:
+    """点赞线程：按 like_delay 的随机间隔从 LikeQueue 取出并调用 like_func(dynamic_id, uid)。
+    initial_budget 限制积压 (初始扫描/恢复/回溯) 条目的成功点赞数，超出后积压条目直接丢弃；新动态不受限制。
+    clock / rng 为时钟对象与随机源 (点赞间隔)，默认与 like_queue 相同的时钟和 random 模块。"""
+
+    def __init__(self, like_queue, like_func, log_queue=None, stop_event=None, like_delay=(4.0, 8.0), initial_budget=None, uname_of=None, clock=None, rng=None):
+        self.like_queue = like_queue; self.like_func = like_func; self.log_queue = log_queue
+        self.stop_event = stop_event if stop_event is not None else threading.Event(); self.like_delay = like_delay
+        self.initial_budget = initial_budget; self.uname_of = uname_of or (lambda uid: f"UID {uid}"); self.clock = clock or like_queue.clock; self.rng = rng or random
+        self.liked_backlog = 0; self.liked_fresh = 0; self.failed = 0; self.dropped = 0; self._thread = None; self._closed = threading.Event()
+        self._backlog_in_flight = 0  # 只由点赞线程写入
+
+    def backlog_budget_left(self):
+        return None if self.initial_budget is None else max(0, self.initial_budget - self.liked_backlog)
+
+    def start(self):
+        self._thread = self.clock.start_thread(self._run, "like-worker"); return self
+
+    def stop(self):
+        """不设置共享的 stop_event，只让点赞线程在当前条目结束后退出 (引擎出错退出时使用)"""
+        self._closed.set()
+
+    def join(self, timeout=None):
+        if self._thread: self.clock.join(self._thread, timeout)
+
+    def wait_backlog_capacity(self):
+        """回溯入队前调用 (回溯线程)：积压 (排队中 + 正在点赞) 少于剩余初始额度时返回 True，否则等待点赞线程消化；
+        额度已用完或被停止时返回 False"""
+        while not (self.stop_event.is_set() or self._closed.is_set()):
+            budget_left = self.backlog_budget_left()
+            if budget_left is None: return True
+            if budget_left == 0: return False
+            if self.like_queue.counts()["backlog"] + self._backlog_in_flight < budget_left: return True
+            self.clock.wait(self.stop_event, STOP_POLL_INTERVAL)  # 轮询点赞线程的进度 (没有通知)
+        return False
+
+    def _run(self):
+        stop_event = self.stop_event
+        while not stop_event.is_set() and not self._closed.is_set():
+            item = self.like_queue.get(stop_event, timeout=self.clock.poll_interval * 5)
+            if item is None: continue
+            dynamic_id, uid, fresh, enqueued_at, pub_ts = item
+            if not fresh and self.backlog_budget_left() == 0:
+                self.like_queue.done(dynamic_id); self.dropped += 1
+                if self.dropped == 1: _log_message(self.log_queue, f"初始点赞已达到上限 ({self.initial_budget})，其余积压动态不再点赞。", target_uid='main')
+                continue
+            kind = "新动态" if fresh else "积压动态"; self._backlog_in_flight = 0 if fresh else 1
+            _log_message(self.log_queue, f"点赞{kind}: {self.uname_of(uid)} 的动态 ID {dynamic_id} (排队 {self.clock.time() - enqueued_at:.0f} 秒，队列剩余 {self.like_queue.qsize()} 条)", target_uid=uid)
+            try: liked = self.like_func(dynamic_id, uid)
+            except Exception as e: liked = False; _log_message(self.log_queue, f"点赞线程出错: {e}", target_uid=uid)
+            if (stop_event.is_set() or self._closed.is_set()) and not liked: self.like_queue.done(dynamic_id, requeue=True); self._backlog_in_flight = 0; break  # 被停止打断，保留到下次启动
+            self.like_queue.done(dynamic_id)
+            if liked:
+                if fresh:
+                    self.liked_fresh += 1; latency = record_time_to_like(uid, pub_ts, self.clock.time())  # 只统计监控发现的新动态 (积压动态的发布时间可能在很久以前)
+                    if latency is not None: _log_message(self.log_queue, f"发布后 {latency:.0f} 秒完成点赞 (动态 ID {dynamic_id})。", target_uid=uid)
+                else: self.liked_backlog += 1
+            else: self.failed += 1
+            self._backlog_in_flight = 0  # 计数更新后再清零，回溯线程不会在两者之间多算出一个额度
+            like_wait = self.rng.uniform(*self.like_delay)
+            if like_wait > 0 and not self._closed.is_set(): self.clock.wait(stop_event, like_wait)
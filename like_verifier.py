@@ -0,0 +1,69 @@
+# like_verifier.py
+# -*- coding: utf-8 -*-
+# 延迟批量确认点赞：点赞后只记为“待确认”，在下一次 feed/space 抓取结果中按 is_liked 批量确认，
+# 多轮仍未出现在列表中的动态才回退到逐条请求详情接口
+
+import threading
+
+from bili_api import _log_message, detail_like_status, get_single_dynamic_detail
+from clock import session_clock
+
+
+class PendingLikeVerifier:
+    """on_confirmed(dynamic_id, uid) / on_failed(dynamic_id, uid) 在确认结果出来时回调。"""
+
+    def __init__(self, session, log_queue=None, stop_event=None, on_confirmed=None, on_failed=None, max_misses=2):
+        self.session = session; self.log_queue = log_queue; self.stop_event = stop_event if stop_event is not None else threading.Event()
+        self.on_confirmed = on_confirmed; self.on_failed = on_failed; self.max_misses = max_misses
+        self._lock = threading.Lock(); self._pending = {}  # uid -> {dynamic_id: [点赞时间, 未出现的抓取次数]}
+        self.confirmed_count = 0; self.failed_count = 0; self.detail_requests = 0
+
+    def add(self, dynamic_id, uid):
+        with self._lock: self._pending.setdefault(uid, {})[str(dynamic_id)] = [session_clock(self.session).time(), 0]
+
+    def watch_ids(self, uid):
+        """返回该 UID 待确认的动态 ID，供抓取时一并返回"""
+        with self._lock: return set(self._pending.get(uid, ()))
+
+    def pending_count(self):
+        with self._lock: return sum(len(ids) for ids in self._pending.values())
+
+    def _resolve(self, dynamic_id, uid, liked, source):
+        if liked:
+            self.confirmed_count += 1; _log_message(self.log_queue, f"  确认点赞成功 ({source}): ID={dynamic_id}", target_uid=uid)
+            if self.on_confirmed: self.on_confirmed(dynamic_id, uid)
+        else:
+            self.failed_count += 1; _log_message(self.log_queue, f"  警告: 点赞请求成功但状态确认失败 ({source}): ID={dynamic_id}", target_uid=uid)
+            if self.on_failed: self.on_failed(dynamic_id, uid)
+
+    def observe(self, uid, dynamics_batch):
+        """用一次动态列表抓取结果批量确认该 UID 的待确认点赞"""
+        if not dynamics_batch: dynamics_batch = []
+        resolved = []
+        with self._lock:
+            pending = self._pending.get(uid)
+            if not pending: return 0
+            seen = {record.dynamic_id: not record.needs_like for record in dynamics_batch if record.dynamic_id in pending}
+            for dynamic_id in list(pending):
+                if dynamic_id in seen and seen[dynamic_id]: resolved.append(dynamic_id); del pending[dynamic_id]
+                else: pending[dynamic_id][1] += 1  # 未出现或暂未显示已赞，交给后续抓取/详情接口确认
+            if not pending: del self._pending[uid]
+        for dynamic_id in resolved: self._resolve(dynamic_id, uid, True, "列表")
+        return len(resolved)
+
+    def resolve_stragglers(self, force=False):
+        """对多次抓取仍未确认的动态逐条请求详情接口 (force=True 时处理全部待确认项)"""
+        with self._lock:
+            stragglers = [(uid, dynamic_id) for uid, pending in self._pending.items() for dynamic_id, (_, misses) in pending.items() if force or misses >= self.max_misses]
+        for uid, dynamic_id in stragglers:
+            if self.stop_event.is_set(): break
+            self.detail_requests += 1
+            liked = detail_like_status(get_single_dynamic_detail(self.session, dynamic_id, self.log_queue, uid, self.stop_event))
+            with self._lock:
+                pending = self._pending.get(uid, {}); entry = pending.get(dynamic_id)
+                if entry is None: continue
+                if liked is None and entry[1] < self.max_misses + 3: entry[1] += 1; continue  # 详情也无法判断，下次再试
+                pending.pop(dynamic_id, None)
+                if not pending: self._pending.pop(uid, None)
+            self._resolve(dynamic_id, uid, liked == 1, "详情")
+        return len(stragglers)
@@ -1,11 +1,12 @@
 # login.py
 import requests
 import time
-import qrcode
 import os
-from PIL import Image, ImageTk  # Import ImageTk for Tkinter
 import threading
+import traceback
 import queue # For communication with GUI
+from metrics import REQUEST_LATENCY, REQUESTS
+from http_session import create_session
 
 # --- Constants ---
 QR_GENERATE_URL = "https://passport.bilibili.com/x/passport-login/web/qrcode/generate"
@@ -25,7 +26,12 @@ def _log_message(log_queue, message):
         print(message) # Fallback if no queue provided
 
 # --- Modified Login Function ---
-def login_via_qrcode(log_queue=None, qr_display_callback=None, stop_event=None):
+def _sleep(stop_event, seconds):
+    """可被 stop_event 打断的等待"""
+    if stop_event: stop_event.wait(seconds)
+    else: time.sleep(seconds)
+
+def login_via_qrcode(log_queue=None, qr_display_callback=None, stop_event=None, session=None):
     """
     Handles Bilibili QR Code login.
 
@@ -34,20 +40,21 @@ def login_via_qrcode(log_queue=None, qr_display_callback=None, stop_event=None):
         qr_display_callback: A function(image) called by this thread to display the QR code.
                              The function should handle displaying the PIL Image.
         stop_event: A threading.Event() object to signal early termination.
+        session: Optional shared requests.Session (see http_session.create_session).
+                 Headers are passed per request so the shared session is not modified.
 
     Returns:
         A dictionary containing cookies ('SESSDATA', 'bili_jct', 'DedeUserID') on success,
         None on failure or cancellation.
     """
-    session = requests.Session()
-    session.headers.update(HEADERS)
+    if session is None: session = create_session()
     qrcode_key = None
     qr_image = None
 
     try:
         # 1. Get QR Code Info
         _log_message(log_queue, "正在获取登录二维码...")
-        response_gen = session.get(QR_GENERATE_URL, timeout=10)
+        response_gen = session.get(QR_GENERATE_URL, headers=HEADERS, timeout=10)
         response_gen.raise_for_status()
         data_gen = response_gen.json()
 
@@ -60,6 +67,7 @@ def login_via_qrcode(log_queue=None, qr_display_callback=None, stop_event=None):
 
         # 2. Generate QR Code Image (but don't show it directly)
         _log_message(log_queue, "正在生成二维码...")
+        import qrcode  # 只有扫码登录才需要 qrcode / Pillow，延迟导入以缩短启动时间
         qr = qrcode.QRCode(version=1, error_correction=qrcode.constants.ERROR_CORRECT_L, box_size=10, border=4)
         qr.add_data(qrcode_url)
         qr.make(fit=True)
@@ -85,16 +93,17 @@ def login_via_qrcode(log_queue=None, qr_display_callback=None, stop_event=None):
                 _log_message(log_queue, "登录过程被用户取消。")
                 return None
 
-            time.sleep(poll_interval)
+            _sleep(stop_event, poll_interval)
             try:
                 params = {"qrcode_key": qrcode_key}
-                response_poll = session.get(QR_POLL_URL, params=params, timeout=10)
+                with REQUEST_LATENCY.time(endpoint="qrcode_poll"): response_poll = session.get(QR_POLL_URL, params=params, headers=HEADERS, timeout=10)
                 response_poll.raise_for_status()
                 data_poll = response_poll.json()
+                REQUESTS.inc(endpoint="qrcode_poll", outcome="ok")
 
                 if "data" not in data_poll or "code" not in data_poll["data"]:
                     _log_message(log_queue, f"轮询响应格式异常: {data_poll}")
-                    time.sleep(poll_interval * 2); continue
+                    _sleep(stop_event, poll_interval * 2); continue
 
                 code = data_poll["data"]["code"]
                 message = data_poll["data"].get("message", "")
@@ -125,10 +134,10 @@ def login_via_qrcode(log_queue=None, qr_display_callback=None, stop_event=None):
                 else: # Other codes
                     current_msg = f"轮询状态: code={code}, message={message}"
                     if current_msg != last_msg: _log_message(log_queue, current_msg); last_msg = current_msg
-                    time.sleep(poll_interval)
+                    _sleep(stop_event, poll_interval)
 
-            except requests.exceptions.Timeout: _log_message(log_queue, "轮询请求超时，稍后重试..."); time.sleep(poll_interval * 2)
-            except requests.exceptions.RequestException as e: _log_message(log_queue, f"轮询请求异常: {e}"); time.sleep(poll_interval * 2)
+            except requests.exceptions.Timeout: REQUESTS.inc(endpoint="qrcode_poll", outcome="error"); _log_message(log_queue, "轮询请求超时，稍后重试..."); _sleep(stop_event, poll_interval * 2)
+            except requests.exceptions.RequestException as e: REQUESTS.inc(endpoint="qrcode_poll", outcome="error"); _log_message(log_queue, f"轮询请求异常: {e}"); _sleep(stop_event, poll_interval * 2)
             except Exception as e: _log_message(log_queue, f"处理轮询响应时出错: {e}"); return None
 
         _log_message(log_queue, "登录超时，请重试。")
@@ -2,29 +2,26 @@
 # -*- coding: utf-8 -*-
 
 # --- 基础模块导入 ---
+import time
+_PROCESS_START = time.perf_counter()  # 启动耗时 (STARTUP_SECONDS) 的起点，尽量早于其他导入
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
 from tkinter import font as tkFont
 from tkinter import PhotoImage
 import requests
-import time
-import random
-import json
 import threading
-import queue
-from PIL import Image, ImageTk
 import traceback
-import webbrowser
 import sys
 import os
-import http.cookiejar
-# --- 新增: Wbi 签名所需 ---
-from functools import reduce
-from hashlib import md5
-from urllib.parse import urlencode
 
 # --- 自定义模块导入 ---
+# PIL / qrcode (扫码登录)、webbrowser (关于窗口)、engine / state_store (启动任务) 在用到时才导入，见 importtime_check.py
 from login import login_via_qrcode
+from bili_api import _log_message, DEFAULT_COOKIE_FILE, load_cookies, save_cookies, check_cookie_valid
+from http_session import StopCanceller, create_session
+from uid_import import following_uids, parse_uids, read_uid_file
+from gui_log import LOG_BATCH_PER_TICK, LOG_MAX_LINES, BoundedLogQueue, LogStore, UidSummary, group_log_entries
+from metrics import STARTUP_SECONDS
 
 # --- 界面颜色主题定义 (浅色清爽主题) ---
 BG_LIGHT_PRIMARY = "#F5F5F5"; BG_WIDGET_ALT = "#FFFFFF"; FG_TEXT_DARK = "#212121"
@@ -32,27 +29,8 @@ FG_TEXT_MUTED = "#616161"; ACCENT_BRIGHT_BLUE = "#2979FF"; BORDER_LIGHT = "#E0E0
 BUTTON_FG = "#FFFFFF"; BUTTON_ACTIVE_BLUE = "#0D47A1"; STATUS_BG = "#EEEEEE"
 STATUS_FG = FG_TEXT_DARK; ERROR_FG = "#D32F2F"; SUCCESS_FG = "#388E3C"
 
+LOG_FILTER_ALL = "全部"; LOG_FILTER_MAIN = "主日志"  # 日志视图的过滤选项 (其余为各 UID)
 
-# --- Bilibili API 相关定义 ---
-DYNAMICS_FETCH_URL = "https://api.bilibili.com/x/polymer/web-dynamic/v1/feed/space"
-LIKE_DYNAMIC_URL = "https://api.vc.bilibili.com/dynamic_like/v1/dynamic_like/thumb"
-GET_DYNAMIC_DETAIL_URL = "https://api.vc.bilibili.com/dynamic_svr/v1/dynamic_svr/get_dynamic_detail"
-NAV_URL = "https://api.bilibili.com/x/web-interface/nav"
-HEADERS = {
-    'Accept': 'application/json, text/plain, */*', 'Accept-Encoding': 'gzip, deflate, br',
-    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8', 'Origin': 'https://t.bilibili.com',
-    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/116.0.0.0 Safari/537.36'
-}
-# --- Brotli 库检查 ---
-try: import brotli
-except ImportError: print("警告：未找到 'brotli' 库，建议运行: pip install brotli")
-
-# --- 全局日志记录辅助函数 ---
-def _log_message(log_queue, message, target_uid=None):
-    if log_queue:
-        try: log_queue.put({'target': target_uid if target_uid else 'main', 'message': f"[{time.strftime('%H:%M:%S')}] {str(message)}"})
-        except Exception as e: print(f"[{time.strftime('%H:%M:%S')}] {str(message)}"); print(f"Queue Error: {e}")
-    else: prefix = f"[UID:{target_uid}] " if target_uid else "[Main] "; print(f"[{time.strftime('%H:%M:%S')}] {prefix}{str(message)}")
 
 # --- 资源路径辅助函数 ---
 def resource_path(relative_path):
@@ -60,192 +38,9 @@ def resource_path(relative_path):
     except Exception: base_path = os.path.abspath(".")
     return os.path.join(base_path, relative_path)
 
-# Wbi 签名实现
-mixinKeyEncTab = [ 46, 47, 18, 2, 53, 8, 23, 32, 15, 50, 10, 31, 58, 3, 45, 35, 27, 43, 5, 49, 33, 9, 42, 19, 29, 28, 14, 39, 12, 38, 41, 13, 37, 48, 7, 16, 24, 55, 40, 61, 26, 17, 0, 1, 60, 51, 30, 4, 22, 25, 54, 21, 56, 59, 6, 63, 57, 62, 11, 36, 20, 34, 44, 52 ]
-def getMixinKey(orig: str): return reduce(lambda s, i: s + orig[i], mixinKeyEncTab, '')[:32]
-def encWbi(params: dict, img_key: str, sub_key: str):
-    mixin_key = getMixinKey(img_key + sub_key); curr_time = round(time.time())
-    params['wts'] = curr_time; params = dict(sorted(params.items()))
-    params = { k: ''.join(filter(lambda chr: chr not in "!'()*", str(v))) for k, v in params.items() }
-    query = urlencode(params); wbi_sign = md5((query + mixin_key).encode()).hexdigest()
-    params['w_rid'] = wbi_sign; return params
-wbi_keys = {"img_key": None, "sub_key": None, "timestamp": 0}; wbi_keys_lock = threading.Lock()
-def get_wbi_keys_cached(session, log_queue):
-    with wbi_keys_lock:
-        current_time = time.time()
-        if wbi_keys["img_key"] and wbi_keys["sub_key"] and (current_time - wbi_keys["timestamp"] < 3600): return wbi_keys["img_key"], wbi_keys["sub_key"]
-        _log_message(log_queue, "正在获取最新的 Wbi Keys...")
-        try:
-            response = session.get(NAV_URL, headers=HEADERS, timeout=10); response.raise_for_status(); json_content = response.json()
-            wbi_img = json_content.get('data', {}).get('wbi_img', {}); img_url = wbi_img.get('img_url'); sub_url = wbi_img.get('sub_url')
-            if not img_url or not sub_url: _log_message(log_queue, "错误: 未能在 nav API 响应中找到 img_url 或 sub_url"); return None, None
-            img_key = img_url.split('/')[-1].split('.')[0]; sub_key = sub_url.split('/')[-1].split('.')[0]
-            wbi_keys["img_key"] = img_key; wbi_keys["sub_key"] = sub_key; wbi_keys["timestamp"] = current_time
-            _log_message(log_queue, "成功获取并缓存 Wbi Keys"); return img_key, sub_key
-        except requests.exceptions.RequestException as e: _log_message(log_queue, f"获取 Wbi Keys 时网络错误: {e}"); return None, None
-        except Exception as e: _log_message(log_queue, f"获取 Wbi Keys 时发生错误: {e}"); traceback.print_exc(); return None, None
-# --- Wbi 签名结束 ---
-
-
-# --- 后台网络请求与逻辑函数 ---
-def get_up_dynamics(session, host_mid, offset, log_queue, stop_event):
-    """获取指定UP主的动态列表 (使用 Polymer API + Wbi 签名)。"""
-    img_key, sub_key = get_wbi_keys_cached(session, log_queue)
-    if not img_key or not sub_key: _log_message(log_queue, f"错误: 无法获取 Wbi Keys (UID:{host_mid})", target_uid=host_mid); return None, None, None, None
-    params = {"host_mid": host_mid, "offset": offset, "timezone_offset": -480 }
-    signed_params = encWbi(params.copy(), img_key, sub_key)
-    dynamic_headers = HEADERS.copy(); dynamic_headers['Referer'] = f'https://t.bilibili.com/?tab=all'
-    max_retries=3; initial_retry_delay=6; retries = 0; retry_delay = initial_retry_delay
-    while retries <= max_retries:
-        if stop_event.is_set(): return None, None, None, None
-        response = None
-        try:
-            response = session.get(DYNAMICS_FETCH_URL, params=signed_params, headers=dynamic_headers, timeout=25)
-            response.raise_for_status()
-            if stop_event.is_set(): return None, None, None, None
-            try: data = response.json()
-            except json.JSONDecodeError:
-                _log_message(log_queue, f"错误: JSON解析失败 (UID:{host_mid}, Offset:'{offset}')", target_uid=host_mid)
-                if response.headers.get('Content-Encoding') == 'br': _log_message(log_queue, "提示：检查 'brotli' 库。", target_uid=host_mid)
-                if retries < 1: _log_message(log_queue, f"将在 {retry_delay:.1f} 秒后重试(JSON)...", target_uid=host_mid); time.sleep(retry_delay); retries += 1; retry_delay *= 1.5; continue
-                else: _log_message(log_queue, f"JSON错误达到最大重试次数。", target_uid=host_mid); return None, None, None, None
-            api_code = data.get("code"); api_message = data.get("message", "")
-            if api_code == 0:
-                dynamics_data = data.get("data", {}); items = dynamics_data.get("items", [])
-                has_more = dynamics_data.get("has_more", False); next_offset = dynamics_data.get("offset", "")
-                extracted_list = []; host_uname = f"UID_{host_mid}"
-                for item in items:
-                    if stop_event.is_set(): return None, None, None, None
-                    dynamic_id = item.get("id_str")
-                    if not dynamic_id or dynamic_id == "0": continue
-                    try:
-                        author_info = item.get('modules', {}).get('module_author', {})
-                        if author_info.get('name'): host_uname = author_info['name']
-                        elif item.get('basic', {}).get('name'): host_uname = item['basic']['name']
-                    except Exception: pass
-                    effective_like_status = 0
-                    try:
-                        like_info = item.get('modules', {}).get('module_stat', {}).get('like_info', {})
-                        if like_info.get('is_liked') == 1: effective_like_status = 1
-                    except AttributeError: pass
-                    desc_text = f"动态 ID: {dynamic_id}"
-                    try:
-                         dyn_module = item.get('modules', {}).get('module_dynamic', {})
-                         if dyn_module.get('desc') and dyn_module['desc'].get('text'): desc_text = dyn_module['desc']['text']
-                         elif dyn_module.get('major',{}).get('draw',{}).get('items'): desc_text = f"[图片] {len(dyn_module['major']['draw']['items'])} 图"
-                         elif dyn_module.get('major',{}).get('archive',{}).get('title'): desc_text = f"[视频] {dyn_module['major']['archive']['title']}"
-                         elif dyn_module.get('major',{}).get('article',{}).get('title'): desc_text = f"[专栏] {dyn_module['major']['article']['title']}"
-                    except Exception: pass
-                    item_data = { "dynamic_id": dynamic_id, "needs_like": (effective_like_status == 0), "desc_text": desc_text[:60] + ('...' if len(desc_text) > 60 else ''), "uname": host_uname}
-                    extracted_list.append(item_data)
-                last_processed_dynamic_id = extracted_list[-1]['dynamic_id'] if extracted_list else None # Get last ID if list not empty
-                next_request_offset = next_offset # Use API's offset
-                if next_offset == offset and offset != "": has_more = False # Check if offset is stuck
-                return extracted_list, next_request_offset, has_more, host_uname
-            if api_code == -352:
-                _log_message(log_queue, f"错误: 请求校验失败 (Wbi sign error?) (UID:{host_mid}, code={api_code})", target_uid=host_mid)
-                if retries == 0:
-                    _log_message(log_queue, "尝试刷新 Wbi Keys 并重试...", target_uid=host_mid)
-                    with wbi_keys_lock: # Correct indentation
-                         wbi_keys["timestamp"] = 0
-                    retries += 1; time.sleep(1); continue
-                else: _log_message(log_queue, "刷新 Wbi Keys 后重试仍然失败。", target_uid=host_mid); return None, None, None, None
-            is_rate_limited = ("频繁" in api_message or api_code in [-799, -412, -509, 4128002, -404])
-            if is_rate_limited and retries < max_retries: _log_message(log_queue, f"API限制/错误 (code={api_code})，稍后重试...", target_uid=host_mid); time.sleep(retry_delay); retries += 1; retry_delay *= 1.8; continue
-            else:
-                _log_message(log_queue, f"获取动态失败: code={api_code}, msg='{api_message}'", target_uid=host_mid);
-                if is_rate_limited: _log_message(log_queue, f"已达最大重试次数({max_retries})。", target_uid=host_mid)
-                if api_code == -101: _log_message(log_queue, "错误: 登录状态失效。", target_uid=host_mid); raise RuntimeError("登录失效(fetch)")
-                return None, None, None, None
-        except requests.exceptions.HTTPError as e:
-             if response is not None and response.status_code == 412:
-                 _log_message(log_queue, f"失败: HTTP 412 (风控/签名/频率?)", target_uid=host_mid)
-                 if retries < max_retries:
-                     http_412_delay = retry_delay * 1.5 + random.uniform(1,3); _log_message(log_queue, f"将在 {http_412_delay:.1f} 秒后重试(412)...", target_uid=host_mid)
-                     if retries % 2 == 0: _log_message(log_queue, "尝试强制刷新 Wbi Keys...", target_uid=host_mid);
-                     with wbi_keys_lock: wbi_keys["timestamp"] = 0
-                     time.sleep(http_412_delay); retries += 1; retry_delay *= 2; continue
-                 else: _log_message(log_queue, f"遇412错误达到最大重试次数。", target_uid=host_mid); return None, None, None, None
-             else:
-                 _log_message(log_queue, f"HTTP错误: {e}", target_uid=host_mid)
-                 if retries < max_retries: _log_message(log_queue, f"将在 {retry_delay:.1f} 秒后重试(HTTP)...", target_uid=host_mid); time.sleep(retry_delay); retries += 1; retry_delay *= 1.5; continue
-                 else: _log_message(log_queue, "HTTP错误达到最大重试次数。", target_uid=host_mid); return None, None, None, None
-        except requests.exceptions.Timeout: _log_message(log_queue, f"超时", target_uid=host_mid);
-        except requests.exceptions.RequestException as e: _log_message(log_queue, f"网络错误: {e}", target_uid=host_mid);
-        except RuntimeError as e: raise e
-        except Exception as e: _log_message(log_queue, f"未知错误: {e}", target_uid=host_mid); traceback.print_exc(); return None, None, None, None
-        if retries < max_retries: _log_message(log_queue, f"出错，{retry_delay:.1f}秒后重试...", target_uid=host_mid); time.sleep(retry_delay); retries += 1; retry_delay *= 1.5; continue
-        else: _log_message(log_queue, f"达到最大重试次数。", target_uid=host_mid); return None, None, None, None
-    return None, None, None, None
-
-
-def get_single_dynamic_detail(session, dynamic_id, log_queue, target_uid=None):
-    params = {"dynamic_id": dynamic_id}
-    detail_headers = HEADERS.copy(); detail_headers['Referer'] = f'https://t.bilibili.com/{dynamic_id}'
-    try:
-        response = session.get(GET_DYNAMIC_DETAIL_URL, params=params, headers=detail_headers, timeout=10)
-        response.raise_for_status(); data = response.json()
-        if data.get("code") == 0: return data.get("data", {}).get("card")
-        else: _log_message(log_queue, f"获取动态详情失败: ID={dynamic_id}, Code={data.get('code')}, Msg={data.get('message')}", target_uid=target_uid); return None
-    except (requests.exceptions.RequestException, json.JSONDecodeError, Exception) as e: _log_message(log_queue, f"获取动态详情异常: ID={dynamic_id}, Error={e}", target_uid=target_uid); return None
-
-def like_dynamic(session, dynamic_id, csrf_token, log_queue, stop_event, target_uid=None):
-    payload = { "dynamic_id": dynamic_id, "up": 1, "csrf": csrf_token }
-    dynamic_headers = HEADERS.copy(); dynamic_headers['Referer'] = f'https://t.bilibili.com/{dynamic_id}'; dynamic_headers['Origin'] = 'https://t.bilibili.com'
-    max_like_attempts=3; current_attempt=0; base_like_delay=1.5
-    while current_attempt < max_like_attempts:
-        if stop_event.is_set(): return False
-        current_attempt += 1
-        if current_attempt > 1:
-            if stop_event.is_set(): return False
-            retry_like_delay = (2**(current_attempt-2)) * base_like_delay + random.uniform(0.1, 0.3); time.sleep(retry_like_delay)
-        if stop_event.is_set(): return False
-        response = None
-        try:
-            response = session.post(LIKE_DYNAMIC_URL, data=payload, headers=dynamic_headers, timeout=15)
-            if stop_event.is_set(): return False
-            response.raise_for_status()
-            try:
-                data = response.json()
-                api_code = data.get("code"); api_message = data.get("message","")
-                like_request_success = False
-                if api_code == 0: _log_message(log_queue, f"点赞请求成功: ID={dynamic_id}", target_uid=target_uid); like_request_success = True
-                elif api_code == 71000: _log_message(log_queue, f"已点赞过: ID={dynamic_id}", target_uid=target_uid); return True
-                if like_request_success:
-                    verify_delay = random.uniform(1.0, 2.0); time.sleep(verify_delay)
-                    if stop_event.is_set(): return False
-                    detail_card = get_single_dynamic_detail(session, dynamic_id, log_queue, target_uid)
-                    if stop_event.is_set(): return False
-                    if detail_card:
-                        desc = detail_card.get('desc')
-                        if desc:
-                             like_state = desc.get('like_state'); is_liked_field = desc.get('is_liked'); final_like_status = 0
-                             if isinstance(like_state, int): final_like_status = like_state
-                             elif isinstance(is_liked_field, int): final_like_status = is_liked_field
-                             if final_like_status == 1: _log_message(log_queue, f"  确认点赞成功: ID={dynamic_id}", target_uid=target_uid); return True
-                             else: _log_message(log_queue, f"  警告: 点赞请求成功但状态确认失败: ID={dynamic_id}", target_uid=target_uid); return False
-                        else: _log_message(log_queue, f"  警告: 无法从详情确认点赞状态(no desc): ID={dynamic_id}", target_uid=target_uid); return False
-                    else: _log_message(log_queue, f"  警告: 无法获取详情确认点赞状态: ID={dynamic_id}", target_uid=target_uid); return False
-                elif api_code in [-412, -509, 4128002] or "频繁" in api_message: _log_message(log_queue, f"点赞速率限制: ID={dynamic_id}, code={api_code}", target_uid=target_uid); continue
-                elif api_code == -111: _log_message(log_queue, f"错误: CSRF校验失败: ID={dynamic_id}", target_uid=target_uid); raise RuntimeError("CSRF失效(like)")
-                elif api_code == -101: _log_message(log_queue, f"错误: 账号未登录: ID={dynamic_id}", target_uid=target_uid); raise RuntimeError("登录失效(like)")
-                elif api_code == -400: _log_message(log_queue, f"错误: 无效请求 (ID={dynamic_id})。", target_uid=target_uid); return False
-                else: _log_message(log_queue, f"点赞未知API错误: ID={dynamic_id}, code={api_code}", target_uid=target_uid); continue
-            except json.JSONDecodeError:
-                _log_message(log_queue, f"错误: 点赞响应JSON解析失败: ID={dynamic_id}", target_uid=target_uid)
-                if response.headers.get('Content-Encoding') == 'br': _log_message(log_queue, "提示: 检查 'brotli' 库。", target_uid=target_uid)
-                continue
-        except requests.exceptions.HTTPError as e:
-             status_code = response.status_code if response else "N/A"; _log_message(log_queue, f"点赞HTTP失败: ID={dynamic_id}, Status={status_code}, Error: {e}", target_uid=target_uid)
-             if status_code in [401, 403]: raise RuntimeError(f"HTTP {status_code}(like)")
-             elif status_code == 412: _log_message(log_queue, f"点赞HTTP 412错误(可能风控): ID={dynamic_id}", target_uid=target_uid)
-             continue
-        except requests.exceptions.Timeout: _log_message(log_queue, f"点赞超时: ID={dynamic_id}", target_uid=target_uid); continue
-        except requests.exceptions.RequestException as e: _log_message(log_queue, f"点赞网络失败: ID={dynamic_id}, Err:{e}", target_uid=target_uid); continue
-        except RuntimeError as e: raise e
-        except Exception as e: _log_message(log_queue, f"点赞意外错误: ID={dynamic_id}, Err:{e}", target_uid=target_uid); traceback.print_exc(); return False
-    _log_message(log_queue, f"点赞 ID {dynamic_id} 重试多次后失败。", target_uid=target_uid)
-    return False
+def _open_url(url):
+    import webbrowser
+    webbrowser.open_new_tab(url)
 
 # --- GUI Application Class ---
 class BiliLikerApp:
@@ -258,17 +53,32 @@ class BiliLikerApp:
             if os.path.exists(icon_path): icon_image = PhotoImage(file=icon_path); self.root.iconphoto(False, icon_image); self._app_icon = icon_image; print(f"成功加载并设置图标: {icon_path}")
             else: print(f"警告：图标文件未找到: '{icon_path}'")
         except Exception as e: print(f"设置图标失败: {e}"); traceback.print_exc()
-        self.cookies_dict = None; self.csrf_token = None; self.session = requests.Session(); self.is_logged_in = False; self.is_running = False; self.backend_thread = None; self.stop_event = threading.Event(); self.log_queue = queue.Queue(); self.qr_window = None; self.login_stop_event = threading.Event(); self._qr_tk_image_ref = None
-        self.cookie_file_path = "bilibili_cookies.txt"
-        self.uid_log_widgets = {}
+        self.cookies_dict = None; self.csrf_token = None; self.session = create_session(); self.is_logged_in = False; self.is_running = False; self.backend_thread = None; self.stop_event = threading.Event(); self.log_queue = BoundedLogQueue(); self.qr_window = None; self.login_stop_event = threading.Event(); self._qr_tk_image_ref = None
+        self.cookie_file_path = DEFAULT_COOKIE_FILE; self._session_ready_recorded = False
+        self.uid_set = set(); self.engine = None; self.import_stop_event = threading.Event()  # uid_set 与 uid_listbox 内容一致，用于查重；engine 为运行中的 LikerEngine，增删 UID 时同步给它
+        # 单一日志视图：log_store 保存全部日志并按 UID 建索引，log_filter 为 None (全部)、'main' 或某个 UID；log_view_lines 为视图当前行数，用于裁剪到 LOG_MAX_LINES
+        self.log_store = LogStore(); self.log_filter = None; self.log_view_lines = 0; self._log_filter_choices = {}
+        self.uid_summary = UidSummary()  # UID 概览表的数据，引擎线程写入，_check_log_queue 只刷新有变化的行
         self.default_font = tkFont.Font(family="Microsoft YaHei UI", size=10); self.label_font = tkFont.Font(family="Microsoft YaHei UI", size=10); self.button_font = tkFont.Font(family="Microsoft YaHei UI", size=10, weight='bold'); self.entry_font = tkFont.Font(family="Microsoft YaHei UI", size=10); self.label_frame_font = tkFont.Font(family="Microsoft YaHei UI", size=10, weight="bold"); self.log_font = tkFont.Font(family="Microsoft YaHei UI", size=9); self.text_widget_font = tkFont.Font(family="Consolas", size=10)
         self.style = ttk.Style();
         try: self.style.theme_use('clam')
         except tk.TclError: print("Clam theme not available.")
         self._apply_styles(); self._create_widgets(); self._create_menu()
-        self._initialize_session_and_login()
+        # Cookie 加载与 nav 验证放到后台线程，窗口先绘制；结果通过 LOGIN_SUCCESS / LOGIN_FAILED / LOGIN_PROCESS_FINISHED 返回
+        self.login_status_label.config(text="状态: 检查登录..."); self.login_button.config(state=tk.DISABLED)
+        threading.Thread(target=self._initialize_session_and_login, daemon=True).start()
+        self.root.after_idle(self._record_window_ready)
         self.root.after(100, self._check_log_queue); self.root.protocol("WM_DELETE_WINDOW", self._on_closing)
 
+    def _record_window_ready(self):
+        """主循环首次空闲 (窗口已绘制、可以响应操作) 时记录启动耗时"""
+        elapsed = time.perf_counter() - _PROCESS_START; STARTUP_SECONDS.set(elapsed, stage="window_ready")
+        _log_message(self.log_queue, f"界面就绪，启动耗时 {elapsed:.2f} 秒。")
+
+    def _record_session_ready(self):
+        if self._session_ready_recorded: return
+        self._session_ready_recorded = True; STARTUP_SECONDS.set(time.perf_counter() - _PROCESS_START, stage="session_ready")
+
     def _apply_styles(self):
         """配置ttk部件的样式"""
         self.style.configure('.', background=BG_LIGHT_PRIMARY, foreground=FG_TEXT_DARK, font=self.default_font, borderwidth=1)
@@ -286,6 +96,9 @@ class BiliLikerApp:
         self.style.configure('TNotebook', background=BG_LIGHT_PRIMARY, borderwidth=0)
         self.style.configure('TNotebook.Tab', padding=(10, 5), font=self.default_font)
         self.style.map("TNotebook.Tab", background=[("selected", BG_LIGHT_PRIMARY)], foreground=[("selected", ACCENT_BRIGHT_BLUE)])
+        self.style.configure('Treeview', background=BG_WIDGET_ALT, fieldbackground=BG_WIDGET_ALT, foreground=FG_TEXT_DARK, font=self.log_font, rowheight=22)
+        self.style.configure('Treeview.Heading', font=self.default_font)
+        self.style.map('Treeview', background=[('selected', ACCENT_BRIGHT_BLUE)], foreground=[('selected', BUTTON_FG)])
 
     def _create_menu(self):
         """创建顶部菜单栏"""
@@ -309,9 +122,9 @@ class BiliLikerApp:
         ttk.Label(content_frame, text="作者: 四季Destination", style='TLabel').pack(pady=2)
         link_font = tkFont.Font(family="Microsoft YaHei UI", size=10, underline=True)
         github_link = tk.Label(content_frame, text="访问 GitHub 主页", fg=ACCENT_BRIGHT_BLUE, cursor="hand2", font=link_font, bg=BG_LIGHT_PRIMARY); github_link.pack(pady=5)
-        github_link.bind("<Button-1>", lambda e: webbrowser.open_new_tab("https://github.com/forSeasons333"))
+        github_link.bind("<Button-1>", lambda e: _open_url("https://github.com/forSeasons333"))
         bili_link = tk.Label(content_frame, text="访问 Bilibili 主页", fg=ACCENT_BRIGHT_BLUE, cursor="hand2", font=link_font, bg=BG_LIGHT_PRIMARY); bili_link.pack(pady=5)
-        bili_link.bind("<Button-1>", lambda e: webbrowser.open_new_tab("https://space.bilibili.com/403039446"))
+        bili_link.bind("<Button-1>", lambda e: _open_url("https://space.bilibili.com/403039446"))
         ok_button = ttk.Button(content_frame, text="确定", command=about_window.destroy, width=10, style='TButton'); ok_button.pack(pady=(15, 0))
         about_window.update_idletasks(); win_w = about_window.winfo_width(); win_h = about_window.winfo_height()
         min_width = 420;
@@ -336,41 +149,100 @@ class BiliLikerApp:
         self.uid_list_scrollbar = ttk.Scrollbar(uid_list_frame, orient=tk.VERTICAL, command=self.uid_listbox.yview); self.uid_listbox['yscrollcommand'] = self.uid_list_scrollbar.set
         self.uid_listbox.grid(row=0, column=0, sticky=tk.NSEW); self.uid_list_scrollbar.grid(row=0, column=1, sticky=tk.NS)
         uid_entry_frame = ttk.Frame(uid_manage_frame, style='TFrame'); uid_entry_frame.grid(row=0, column=2, padx=(10, 5), sticky=tk.NW)
-        ttk.Label(uid_entry_frame, text="添加UID:", style='TLabel').pack(anchor=tk.W)
+        ttk.Label(uid_entry_frame, text="添加UID (可粘贴多个):", style='TLabel').pack(anchor=tk.W)
         self.uid_add_entry_var = tk.StringVar(); self.uid_add_entry = ttk.Entry(uid_entry_frame, width=18, style='TEntry', textvariable=self.uid_add_entry_var); self.uid_add_entry.pack(anchor=tk.W, pady=(2, 5))
         self.add_uid_button = ttk.Button(uid_entry_frame, text="添加", command=self._add_uid, width=8, style='TButton'); self.add_uid_button.pack(anchor=tk.W)
         self.remove_uid_button = ttk.Button(uid_manage_frame, text="移除选中", command=self._remove_selected_uid, width=10, style='TButton'); self.remove_uid_button.grid(row=1, column=2, padx=(10, 5), pady=5, sticky=tk.NW)
+        uid_import_frame = ttk.Frame(uid_manage_frame, style='TFrame'); uid_import_frame.grid(row=2, column=2, padx=(10, 5), sticky=tk.NW)
+        self.import_file_button = ttk.Button(uid_import_frame, text="从文件导入", command=self._import_uid_file, width=10, style='TButton'); self.import_file_button.pack(side=tk.LEFT)
+        self.import_following_button = ttk.Button(uid_import_frame, text="导入关注列表", command=self._import_following, width=12, style='TButton'); self.import_following_button.pack(side=tk.LEFT, padx=(5, 0))
         other_config_frame = ttk.Frame(config_frame, style='TFrame'); other_config_frame.pack(fill=tk.X, padx=5, pady=5); other_config_frame.columnconfigure(1, weight=1); other_config_frame.columnconfigure(3, weight=1)
         ttk.Label(other_config_frame, text="初始点赞数:", style='TLabel').grid(row=0, column=0, padx=(0,5), pady=3, sticky=tk.W)
         self.max_likes_entry = ttk.Entry(other_config_frame, width=8, style='TEntry'); self.max_likes_entry.grid(row=0, column=1, pady=3, sticky=tk.W); self.max_likes_entry.insert(0, "30")
         ttk.Label(other_config_frame, text="监控间隔(秒):", style='TLabel').grid(row=0, column=2, padx=(15,5), pady=3, sticky=tk.W)
         self.interval_entry = ttk.Entry(other_config_frame, width=8, style='TEntry'); self.interval_entry.grid(row=0, column=3, pady=3, sticky=tk.W); self.interval_entry.insert(0, "60")
+        self.backfill_var = tk.BooleanVar(value=False); self.backfill_check = ttk.Checkbutton(other_config_frame, text="首页不足时翻页回溯", variable=self.backfill_var); self.backfill_check.grid(row=0, column=4, padx=(15,0), pady=3, sticky=tk.W)
         action_frame = ttk.Frame(control_frame, style='TFrame'); action_frame.pack(pady=(5, 10))
         self.action_button = ttk.Button(action_frame, text="启动任务", command=self._start_stop_liking, state=tk.DISABLED, width=15, style='TButton'); self.action_button.pack()
         log_notebook_frame = ttk.Frame(self.root, padding=(10, 0, 10, 5)); log_notebook_frame.pack(fill=tk.BOTH, expand=True)
         self.log_notebook = ttk.Notebook(log_notebook_frame, style='TNotebook'); self.log_notebook.pack(fill=tk.BOTH, expand=True)
-        main_log_frame = ttk.Frame(self.log_notebook, padding=2, style='TFrame'); self.log_notebook.add(main_log_frame, text="主日志")
-        self.main_log_text = scrolledtext.ScrolledText(main_log_frame, wrap=tk.WORD, state=tk.DISABLED, bd=1, relief=tk.SOLID, bg=BG_WIDGET_ALT, fg=FG_TEXT_DARK, insertbackground=FG_TEXT_DARK, font=self.log_font, borderwidth=1, highlightthickness=1, highlightcolor=ACCENT_BRIGHT_BLUE, highlightbackground=BORDER_LIGHT); self.main_log_text.pack(fill=tk.BOTH, expand=True)
-        self.uid_log_widgets['main'] = self.main_log_text
+        # 控件数量与 UID 数量无关：一个日志视图 (按 UID 过滤) + 一个 UID 概览表
+        log_frame = ttk.Frame(self.log_notebook, padding=2, style='TFrame'); self.log_notebook.add(log_frame, text="日志")
+        log_filter_frame = ttk.Frame(log_frame, style='TFrame'); log_filter_frame.pack(fill=tk.X, pady=(0, 3))
+        ttk.Label(log_filter_frame, text="显示:", style='TLabel').pack(side=tk.LEFT)
+        self.log_filter_var = tk.StringVar(value=LOG_FILTER_ALL)
+        self.log_filter_combo = ttk.Combobox(log_filter_frame, textvariable=self.log_filter_var, state="readonly", width=30, postcommand=self._refresh_log_filter_choices); self.log_filter_combo.pack(side=tk.LEFT, padx=5)
+        self.log_filter_combo.bind("<<ComboboxSelected>>", lambda event: self._set_log_filter(self._log_filter_choices.get(self.log_filter_var.get())))
+        self.log_text = scrolledtext.ScrolledText(log_frame, wrap=tk.WORD, state=tk.DISABLED, bd=1, relief=tk.SOLID, bg=BG_WIDGET_ALT, fg=FG_TEXT_DARK, insertbackground=FG_TEXT_DARK, font=self.log_font, borderwidth=1, highlightthickness=1, highlightcolor=ACCENT_BRIGHT_BLUE, highlightbackground=BORDER_LIGHT); self.log_text.pack(fill=tk.BOTH, expand=True)
+        summary_frame = ttk.Frame(self.log_notebook, padding=2, style='TFrame'); self.log_notebook.add(summary_frame, text="UID 概览"); summary_frame.rowconfigure(0, weight=1); summary_frame.columnconfigure(0, weight=1)
+        self.summary_tree = ttk.Treeview(summary_frame, columns=("uid", "uname", "latest_id", "checked_at", "liked"), show="headings", selectmode="browse")
+        for column, heading, width, anchor in (("uid", "UID", 100, tk.W), ("uname", "昵称", 160, tk.W), ("latest_id", "最新动态 ID", 170, tk.W), ("checked_at", "上次检查", 80, tk.CENTER), ("liked", "点赞数", 60, tk.E)):
+            self.summary_tree.heading(column, text=heading); self.summary_tree.column(column, width=width, anchor=anchor, stretch=column == "uname")
+        summary_scrollbar = ttk.Scrollbar(summary_frame, orient=tk.VERTICAL, command=self.summary_tree.yview); self.summary_tree['yscrollcommand'] = summary_scrollbar.set
+        self.summary_tree.grid(row=0, column=0, sticky=tk.NSEW); summary_scrollbar.grid(row=0, column=1, sticky=tk.NS)
+        self.summary_tree.bind("<Double-1>", self._show_selected_uid_log)  # 双击某行: 切换到日志视图并只显示该 UID
         self.status_bar = ttk.Label(self.root, text="准备就绪", relief=tk.FLAT, anchor=tk.W, style='Status.TLabel', borderwidth=0); self.status_bar.pack(side=tk.BOTTOM, fill=tk.X)
 
 
+    def _add_uids(self, uids, source="手动输入"):
+        """把一批 UID 加入列表 (uid_set 查重)，任务运行中同时交给引擎，返回新增的 UID 列表"""
+        new_uids = [uid for uid in dict.fromkeys(uids) if uid not in self.uid_set]
+        if not new_uids: return []
+        self.uid_set.update(new_uids); self.uid_listbox.insert(tk.END, *new_uids)
+        for uid in new_uids: self.summary_tree.insert("", tk.END, iid=uid, values=(uid, self.uid_summary.uname(uid) or "", "-", "-", 0))
+        if self.is_running:
+            if self.engine: self.engine.add_targets(new_uids)  # 引擎尚未创建时由 _run_backend_process 补齐
+        shown = ', '.join(new_uids[:10]) + (f" 等 {len(new_uids)} 个" if len(new_uids) > 10 else "")
+        _log_message(self.log_queue, f"已添加 UID ({source}): {shown}{'，将在下一次检查前生效' if self.is_running else ''}")
+        return new_uids
+
     def _add_uid(self):
-        """添加用户输入的UID到列表框"""
-        uid_to_add = self.uid_add_entry_var.get().strip()
-        if not uid_to_add.isdigit(): messagebox.showerror("错误", "请输入纯数字的有效UID！", parent=self.root); return
-        current_uids = self.uid_listbox.get(0, tk.END)
-        if uid_to_add in current_uids: messagebox.showwarning("提示", f"UID {uid_to_add} 已在列表中。", parent=self.root); self.uid_add_entry_var.set(""); return
-        self.uid_listbox.insert(tk.END, uid_to_add); self.uid_add_entry_var.set("")
-        _log_message(self.log_queue, f"已添加 UID: {uid_to_add}")
+        """添加输入框中的UID (可用空格、逗号或换行分隔多个，也可粘贴个人空间链接)"""
+        uids, invalid = parse_uids(self.uid_add_entry_var.get())
+        if not uids: messagebox.showerror("错误", "请输入纯数字的有效UID！", parent=self.root); return
+        added = self._add_uids(uids); self.uid_add_entry_var.set("")
+        skipped = len(uids) - len(added)
+        if invalid or skipped: messagebox.showwarning("提示", f"已添加 {len(added)} 个 UID" + (f"，{skipped} 个已在列表中" if skipped else "") + (f"，忽略无效内容: {' '.join(invalid[:5])}" if invalid else "") + "。", parent=self.root)
+
+    def _import_uid_file(self):
+        """从文本文件批量导入UID (空白、逗号或换行分隔，# 开头为注释)"""
+        from tkinter import filedialog
+        path = filedialog.askopenfilename(parent=self.root, title="选择 UID 文件", filetypes=[("文本文件", "*.txt"), ("所有文件", "*.*")])
+        if not path: return
+        try: uids = read_uid_file(path)
+        except (OSError, UnicodeDecodeError) as e: messagebox.showerror("错误", f"读取文件失败: {e}", parent=self.root); return
+        added = self._add_uids(uids, source=os.path.basename(path))
+        _log_message(self.log_queue, f"从文件导入: 共 {len(uids)} 个 UID，新增 {len(added)} 个。")
+
+    def _import_following(self):
+        """在后台线程拉取登录账号的关注列表，完成后在主线程加入UID列表"""
+        if not self.is_logged_in: messagebox.showerror("错误", "请先登录！", parent=self.root); return
+        self.import_following_button.config(state=tk.DISABLED); _log_message(self.log_queue, "正在获取关注列表...")
+        def worker():
+            followings = following_uids(self.session, self.log_queue, self.import_stop_event)
+            self.root.after(0, self._finish_import_following, followings)
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _finish_import_following(self, followings):
+        self.import_following_button.config(state=tk.NORMAL)
+        if followings is None: messagebox.showerror("错误", "获取关注列表失败，详见主日志。", parent=self.root); return
+        added = self._add_uids([uid for uid, _ in followings], source="关注列表")
+        _log_message(self.log_queue, f"从关注列表导入: 共关注 {len(followings)} 个 UP 主，新增 {len(added)} 个。")
 
     def _remove_selected_uid(self):
-        """从列表框移除当前选中的UID"""
+        """从列表框移除当前选中的UID，任务运行中同时从引擎移除 (其余 UID 继续监控)"""
         selected_indices = self.uid_listbox.curselection()
         if not selected_indices: messagebox.showwarning("提示", "请先在列表中选择要移除的UID。", parent=self.root); return
-        for index in reversed(selected_indices):
-            removed_uid = self.uid_listbox.get(index); self.uid_listbox.delete(index)
-            _log_message(self.log_queue, f"已移除 UID: {removed_uid}")
+        removed_uids = [self.uid_listbox.get(index) for index in selected_indices]
+        for index in reversed(selected_indices): self.uid_listbox.delete(index)
+        self.uid_set.difference_update(removed_uids)
+        for uid in removed_uids:
+            self.uid_summary.remove(uid); self.log_store.forget(uid)
+            if self.summary_tree.exists(uid): self.summary_tree.delete(uid)
+        if self.log_filter in removed_uids: self._set_log_filter(None)
+        if self.is_running:
+            if self.engine: self.engine.remove_targets(removed_uids)
+        _log_message(self.log_queue, f"已移除 UID: {', '.join(removed_uids[:10])}{f' 等 {len(removed_uids)} 个' if len(removed_uids) > 10 else ''}")
 
     # --- 添加回 _logout 方法 ---
     def _logout(self):
@@ -379,7 +251,7 @@ class BiliLikerApp:
         if self.is_running: messagebox.showwarning("提示", "请先中止当前任务再退出登录。", parent=self.root); return
         if messagebox.askyesno("确认退出登录", "确定要退出当前账号并删除本地 Cookie 文件吗？", parent=self.root):
             _log_message(self.log_queue, "正在退出登录...")
-            self.is_logged_in = False; self.cookies_dict = None; self.csrf_token = None; self.session = requests.Session()
+            self.is_logged_in = False; self.cookies_dict = None; self.csrf_token = None; self.session = create_session()
             try:
                 if os.path.exists(self.cookie_file_path): os.remove(self.cookie_file_path); _log_message(self.log_queue, f"已删除本地 Cookie 文件: {self.cookie_file_path}")
             except Exception as e: _log_message(self.log_queue, f"警告: 删除 Cookie 文件失败: {e}")
@@ -387,66 +259,109 @@ class BiliLikerApp:
             _log_message(self.log_queue, "退出登录完成。")
     # --- _logout 方法结束 ---
     def _initialize_session_and_login(self):
+        """在后台线程运行：只通过 log_queue 与界面通信，不直接操作 Tk 控件"""
         _log_message(self.log_queue, "正在初始化会话并检查本地 Cookie...")
-        self.session = requests.Session()
-        cookie_jar = http.cookiejar.MozillaCookieJar(self.cookie_file_path)
-        if os.path.exists(self.cookie_file_path):
-            try:
-                cookie_jar.load(ignore_discard=True, ignore_expires=True); self.session.cookies.update(cookie_jar)
-                _log_message(self.log_queue, f"成功加载本地 Cookie 文件: {self.cookie_file_path}")
+        try:
+            if load_cookies(self.session, self.cookie_file_path, self.log_queue):
                 if self._check_cookie_valid():
                     _log_message(self.log_queue, "本地 Cookie 有效，自动登录成功。")
                     self.cookies_dict = self.session.cookies.get_dict(); self.csrf_token = self.session.cookies.get('bili_jct')
                     self.log_queue.put({'target':'main', 'message':"LOGIN_SUCCESS"})
                 else: _log_message(self.log_queue, "本地 Cookie 已失效，请重新扫码登录。"); self.session.cookies.clear(); self.log_queue.put({'target':'main', 'message':"LOGIN_FAILED"})
-            except Exception as e: _log_message(self.log_queue, f"加载 Cookie 文件失败: {e}，请扫码登录。"); self.session.cookies.clear(); self.log_queue.put({'target':'main', 'message':"LOGIN_FAILED"})
-        else:
-            _log_message(self.log_queue, "未找到本地 Cookie 文件，请扫码登录。")
-            self.root.after(10, lambda: [self.login_status_label.config(text="状态: 未登录", foreground=FG_TEXT_MUTED), self.action_button.config(state=tk.DISABLED), self.logout_button.config(state=tk.DISABLED), self.login_button.config(state=tk.NORMAL)])
+            else:
+                _log_message(self.log_queue, "未找到本地 Cookie 文件，请扫码登录。"); self.log_queue.put({'target':'main', 'message':"LOGIN_PROCESS_FINISHED"})
+        except Exception as e: _log_message(self.log_queue, f"加载 Cookie 文件失败: {e}，请扫码登录。"); self.session.cookies.clear(); self.log_queue.put({'target':'main', 'message':"LOGIN_FAILED"})
 
     def _check_cookie_valid(self):
-        if not self.session or not self.session.cookies: return False
-        _log_message(self.log_queue, "正在验证 Cookie 有效性...")
-        try:
-            response = self.session.get(NAV_URL, headers={'User-Agent': HEADERS['User-Agent'], 'Referer': 'https://www.bilibili.com/'}, timeout=10)
-            response.raise_for_status(); data = response.json()
-            is_login = data.get('data', {}).get('isLogin', False); uname = data.get('data', {}).get('uname', '未知用户')
-            if data.get('code') == 0 and is_login: _log_message(self.log_queue, f"Cookie 验证成功，当前用户: {uname}"); return True
-            else: _log_message(self.log_queue, f"Cookie 验证失败: Code={data.get('code')}, isLogin={is_login}"); return False
-        except requests.exceptions.RequestException as e: _log_message(self.log_queue, f"Cookie 验证请求失败: {e}"); return False
-        except Exception as e: _log_message(self.log_queue, f"Cookie 验证时发生未知错误: {e}"); traceback.print_exc(); return False
+        return check_cookie_valid(self.session, self.log_queue, self.login_stop_event)  # 关闭窗口时设置，不再等待限流器
 
     def _save_cookies(self):
-        if not self.session: _log_message(self.log_queue, "错误: 无法保存 Cookie，Session 未初始化。"); return
-        cookie_jar = http.cookiejar.MozillaCookieJar(self.cookie_file_path)
-        for cookie in self.session.cookies: cookie_jar.set_cookie(cookie)
-        try: cookie_jar.save(ignore_discard=True, ignore_expires=True); _log_message(self.log_queue, f"Cookie 已成功保存到: {self.cookie_file_path}")
-        except Exception as e: _log_message(self.log_queue, f"错误: 保存 Cookie 到文件失败: {e}"); traceback.print_exc()
+        save_cookies(self.session, self.cookie_file_path, self.log_queue)
 
     def _log_to_gui(self, target, message):
-        log_widget = self.uid_log_widgets.get(target)
-        if not log_widget: log_widget = self.uid_log_widgets.get('main'); message = f"[Target({target})? Addr? ] {message}"
-        if log_widget:
-            try: log_widget.config(state=tk.NORMAL); log_widget.insert(tk.END, str(message) + "\n"); log_widget.see(tk.END); log_widget.config(state=tk.DISABLED)
-            except tk.TclError as e: print(f"GUI Log Error: {e}")
-            except Exception as e: print(f"Unexpected GUI Log Error: {e}")
+        self._append_log_lines(target, [str(message)])
+
+    def _uid_label(self, uid):
+        uname = self.uid_summary.uname(uid)
+        return f"{uname} ({uid})" if uname else f"UID {uid}"
+
+    def _format_view_lines(self, entries):
+        """“全部”视图中 UID 的日志行加上昵称/UID 前缀"""
+        return [line if target == 'main' else f"[{self._uid_label(target)}] {line}" for target, line in entries]
+
+    def _append_log_lines(self, target, lines):
+        """存入 log_store；只有符合当前过滤条件的行才插入视图"""
+        if not lines: return
+        if target != 'main' and target not in self.uid_set: lines = [f"[Target({target})? Addr? ] {line}" for line in lines]; target = 'main'
+        self.log_store.append(target, lines)
+        if self.log_filter is None: self._insert_view_lines(self._format_view_lines((target, line) for line in lines))
+        elif self.log_filter == target: self._insert_view_lines(lines)
+
+    def _insert_view_lines(self, lines):
+        """一次插入多行并删除超出 LOG_MAX_LINES 的最早行；视图原本停在底部时才自动滚动"""
+        text = "\n".join(lines[-LOG_MAX_LINES:]) + "\n"
+        try:
+            at_bottom = self.log_text.yview()[1] >= 0.999
+            self.log_text.config(state=tk.NORMAL); self.log_text.insert(tk.END, text)
+            line_count = self.log_view_lines + text.count("\n")
+            if line_count > LOG_MAX_LINES: self.log_text.delete('1.0', f"{line_count - LOG_MAX_LINES + 1}.0"); line_count = LOG_MAX_LINES
+            self.log_view_lines = line_count
+            if at_bottom: self.log_text.see(tk.END)
+            self.log_text.config(state=tk.DISABLED)
+        except tk.TclError as e: print(f"GUI Log Error: {e}")
+        except Exception as e: print(f"Unexpected GUI Log Error: {e}")
+
+    def _set_log_filter(self, target):
+        """切换日志视图的过滤条件 (None 为全部)，从 log_store 重新渲染最后 LOG_MAX_LINES 行"""
+        self.log_filter = target
+        self.log_filter_var.set(LOG_FILTER_ALL if target is None else LOG_FILTER_MAIN if target == 'main' else self._uid_label(target))
+        lines = self._format_view_lines(self.log_store.lines()) if target is None else self.log_store.lines(target)
+        try:
+            self.log_text.config(state=tk.NORMAL); self.log_text.delete('1.0', tk.END); self.log_view_lines = 0
+            self.log_text.config(state=tk.DISABLED)
+            if lines: self._insert_view_lines(lines)
+        except tk.TclError as e: print(f"GUI Log Error: {e}")
+
+    def _refresh_log_filter_choices(self):
+        """下拉框展开时才生成选项 (UID 较多时不必随每次增删维护)"""
+        self._log_filter_choices = {LOG_FILTER_ALL: None, LOG_FILTER_MAIN: 'main'}
+        for uid in self.uid_listbox.get(0, tk.END): self._log_filter_choices[self._uid_label(uid)] = uid
+        self.log_filter_combo.config(values=list(self._log_filter_choices))
+
+    def _show_selected_uid_log(self, event=None):
+        selected = self.summary_tree.selection()
+        if selected: self._set_log_filter(selected[0]); self.log_notebook.select(0)
+
+    def _refresh_summary_rows(self):
+        """只更新自上次轮询以来有变化的 UID 行"""
+        for uid, row in self.uid_summary.take_dirty().items():
+            if not self.summary_tree.exists(uid): continue
+            checked_at = time.strftime('%H:%M:%S', time.localtime(row["checked_at"])) if row["checked_at"] else "-"
+            self.summary_tree.item(uid, values=(uid, row["uname"] or "", row["latest_id"] or "-", checked_at, row["liked"]))
+
+    def _handle_control_message(self, message):
+        if message in ("LOGIN_SUCCESS", "LOGIN_FAILED", "LOGIN_PROCESS_FINISHED"): self._record_session_ready()
+        if message == "LOGIN_SUCCESS": self.is_logged_in = True; self.login_status_label.config(text="状态: 已登录", foreground=SUCCESS_FG); self.action_button.config(state=tk.NORMAL); self.login_button.config(state=tk.DISABLED); self.logout_button.config(state=tk.NORMAL); self._close_qr_window(); self.status_bar.config(text="登录成功。")
+        elif message == "LOGIN_FAILED": self.is_logged_in = False; self.login_status_label.config(text="状态: 登录失败", foreground=ERROR_FG); self.action_button.config(state=tk.DISABLED); self.login_button.config(state=tk.NORMAL); self.logout_button.config(state=tk.DISABLED); self._close_qr_window(); self.status_bar.config(text="登录失败，请重试。")
+        elif message == "LOGIN_PROCESS_FINISHED":
+             if not self.is_logged_in: self.login_button.config(state=tk.NORMAL); self.login_status_label.config(text="状态: 未登录", foreground=FG_TEXT_MUTED)
+             self.logout_button.config(state=tk.DISABLED); self._close_qr_window()
+        elif message == "BACKEND_STARTED": self.is_running = True; self.action_button.config(text="中止任务", style='Stop.TButton', state=tk.NORMAL); self.status_bar.config(text="运行中..."); self._set_config_state(tk.DISABLED); self.logout_button.config(state=tk.DISABLED)
+        elif message == "BACKEND_STOPPED_MANUAL" or message == "BACKEND_STOPPED_ERROR": self.is_running = False; self.action_button.config(text="启动任务", style='TButton', state=tk.NORMAL if self.is_logged_in else tk.DISABLED); self.status_bar.config(text="已停止" if message.endswith("MANUAL") else "错误停止。"); self._set_config_state(tk.NORMAL); self.stop_event.clear(); self.logout_button.config(state=tk.NORMAL if self.is_logged_in else tk.DISABLED)
 
     def _check_log_queue(self):
+        """每次最多处理 LOG_BATCH_PER_TICK 条：控制消息按顺序执行，普通日志按标签页合并成一次插入"""
+        next_check_ms = 150
         try:
-            while not self.log_queue.empty():
-                log_entry = self.log_queue.get_nowait()
-                target = log_entry.get('target', 'main'); message = log_entry.get('message', '')
-                if message == "LOGIN_SUCCESS": self.is_logged_in = True; self.login_status_label.config(text="状态: 已登录", foreground=SUCCESS_FG); self.action_button.config(state=tk.NORMAL); self.login_button.config(state=tk.DISABLED); self.logout_button.config(state=tk.NORMAL); self._close_qr_window(); self.status_bar.config(text="登录成功。")
-                elif message == "LOGIN_FAILED": self.is_logged_in = False; self.login_status_label.config(text="状态: 登录失败", foreground=ERROR_FG); self.action_button.config(state=tk.DISABLED); self.login_button.config(state=tk.NORMAL); self.logout_button.config(state=tk.DISABLED); self._close_qr_window(); self.status_bar.config(text="登录失败，请重试。")
-                elif message == "LOGIN_PROCESS_FINISHED":
-                     if not self.is_logged_in: self.login_button.config(state=tk.NORMAL); self.login_status_label.config(text="状态: 未登录", foreground=FG_TEXT_MUTED)
-                     self.logout_button.config(state=tk.DISABLED); self._close_qr_window()
-                elif message == "BACKEND_STARTED": self.is_running = True; self.action_button.config(text="中止任务", style='Stop.TButton', state=tk.NORMAL); self.status_bar.config(text="运行中..."); self._set_config_state(tk.DISABLED); self.logout_button.config(state=tk.DISABLED)
-                elif message == "BACKEND_STOPPED_MANUAL" or message == "BACKEND_STOPPED_ERROR": self.is_running = False; self.action_button.config(text="启动任务", style='TButton', state=tk.NORMAL if self.is_logged_in else tk.DISABLED); self.status_bar.config(text="已停止" if message.endswith("MANUAL") else "错误停止。"); self._set_config_state(tk.NORMAL); self.stop_event.clear(); self.logout_button.config(state=tk.NORMAL if self.is_logged_in else tk.DISABLED)
-                else: self._log_to_gui(target, message)
-        except queue.Empty: pass
+            entries = self.log_queue.drain(LOG_BATCH_PER_TICK)
+            if len(entries) == LOG_BATCH_PER_TICK: next_check_ms = 20  # 仍有积压：尽快处理下一批，但先让出主循环
+            controls, lines_by_target = group_log_entries(entries)
+            for message in controls: self._handle_control_message(message)
+            for target, count in self.log_queue.take_dropped().items(): lines_by_target.setdefault(target, []).append(f"... 日志过多，已丢弃 {count} 条 ...")
+            for target, lines in lines_by_target.items(): self._append_log_lines(target, lines)
+            self._refresh_summary_rows()
         except Exception as e: self._log_to_gui('main', f"处理日志队列时出错: {e}"); traceback.print_exc()
-        self.root.after(150, self._check_log_queue)
+        self.root.after(next_check_ms, self._check_log_queue)
 
     def _display_qr_code_window(self, qr_pil_image):
         self.root.after(0, self._create_qr_window_in_main_thread, qr_pil_image)
@@ -460,6 +375,7 @@ class BiliLikerApp:
             if self._app_icon:
                 try: self.qr_window.iconphoto(False, self._app_icon)
                 except Exception as e: print(f"设置QR窗口图标失败: {e}")
+            from PIL import ImageTk
             self._qr_tk_image_ref = ImageTk.PhotoImage(qr_pil_image)
             qr_label = tk.Label(self.qr_window, image=self._qr_tk_image_ref, bg=BG_WIDGET_ALT, relief=tk.FLAT, bd=0)
             qr_label.pack(padx=10, pady=10)
@@ -491,7 +407,8 @@ class BiliLikerApp:
 
     def _perform_login_threaded(self, log_queue, qr_callback, stop_event):
         login_cookies_dict = None
-        try: login_cookies_dict = login_via_qrcode(log_queue, qr_callback, stop_event)
+        try:
+            with StopCanceller(self.session, stop_event): login_cookies_dict = login_via_qrcode(log_queue, qr_callback, stop_event, session=self.session)  # 与后台共用连接池与 Cookie Jar；取消登录时中断轮询请求
         except Exception as e: _log_message(log_queue, f"登录线程异常: {e}"); traceback.print_exc()
         if stop_event.is_set(): _log_message(log_queue,"登录线程收到停止信号。"); log_queue.put({'target':'main', 'message':"LOGIN_PROCESS_FINISHED"}); return
         if login_cookies_dict:
@@ -504,16 +421,15 @@ class BiliLikerApp:
     def _set_config_state(self, state):
         """启用或禁用配置相关的控件"""
         try:
-            listbox_state = tk.NORMAL if state == tk.NORMAL else tk.DISABLED; button_state = tk.NORMAL if state == tk.NORMAL else tk.DISABLED
-            self.uid_listbox.config(state=listbox_state); self.uid_add_entry.config(state=state); self.add_uid_button.config(state=button_state); self.remove_uid_button.config(state=button_state)
-            self.max_likes_entry.config(state=state); self.interval_entry.config(state=state)
+            # UID 列表在任务运行中仍可编辑，增删通过 engine.add_targets / remove_targets 实时生效
+            self.max_likes_entry.config(state=state); self.interval_entry.config(state=state); self.backfill_check.config(state=state)
             if state == tk.DISABLED: self.login_button.config(state=tk.DISABLED); self.logout_button.config(state=tk.DISABLED)
             else: self.login_button.config(state=tk.NORMAL if not self.is_logged_in else tk.DISABLED); self.logout_button.config(state=tk.NORMAL if self.is_logged_in else tk.DISABLED)
         except tk.TclError as e: print(f"GUI Config State Error: {e}")
         except Exception as e: print(f"Unexpected GUI Config State Error: {e}")
 
     def _start_stop_liking(self):
-        """处理“启动/中止任务”按钮的点击事件 (多UID + Notebook)"""
+        """处理“启动/中止任务”按钮的点击事件"""
         if not self.is_logged_in: messagebox.showerror("错误", "请先登录！", parent=self.root); return
         if self.is_running: _log_message(self.log_queue, "收到中止任务请求..."); self.stop_event.set(); self.action_button.config(state=tk.DISABLED); self.status_bar.config(text="正在中止任务...")
         else:
@@ -524,140 +440,35 @@ class BiliLikerApp:
             except (ValueError, AssertionError): messagebox.showerror("错误", "初始点赞数必须是正整数！", parent=self.root); return
             try: interval_sec = float(interval_sec_str); assert interval_sec > 0
             except (ValueError, AssertionError): messagebox.showerror("错误", "监控间隔秒数必须是正数！", parent=self.root); return
-            self._clear_and_create_log_tabs(target_uids_list)
-            _log_message(self.log_queue, f"启动任务: UIDs={','.join(target_uids_list)}, 初始上限={max_likes}, 间隔={interval_sec:.1f}秒")
+            self._reset_log_view(target_uids_list)
+            _log_message(self.log_queue, f"启动任务: UIDs={','.join(target_uids_list[:10])}{f' 等 {len(target_uids_list)} 个' if len(target_uids_list) > 10 else ''}, 初始上限={max_likes}, 间隔={interval_sec:.1f}秒{', 翻页回溯' if self.backfill_var.get() else ''}")
             self.stop_event.clear()
             if not self.session: _log_message(self.log_queue, "错误：内部会话未初始化。"); messagebox.showerror("错误", "登录会话丢失。", parent=self.root); self.is_logged_in = False; self.login_status_label.config(text="状态: 未登录", foreground=FG_TEXT_MUTED); self.action_button.config(state=tk.DISABLED); self.login_button.config(state=tk.NORMAL); return
-            self.backend_thread = threading.Thread(target=self._run_backend_process, args=(target_uids_list, max_likes, interval_sec, self.session, self.csrf_token, self.log_queue, self.stop_event), daemon=True);
+            self.backend_thread = threading.Thread(target=self._run_backend_process, args=(target_uids_list, max_likes, interval_sec, self.session, self.csrf_token, self.log_queue, self.stop_event, self.backfill_var.get()), daemon=True);
             self.log_queue.put({'target':'main', 'message':"BACKEND_STARTED"}); self.backend_thread.start()
 
-    def _clear_and_create_log_tabs(self, uids_to_monitor):
-        """清理旧的UID日志标签页并为新的UID列表创建标签页"""
-        current_tabs = list(self.log_notebook.tabs());
-        for tab_id in current_tabs:
-            if self.log_notebook.index(tab_id) != 0: self.log_notebook.forget(tab_id)
-        main_log_widget = self.uid_log_widgets.get('main'); self.uid_log_widgets.clear()
-        if main_log_widget:
-            self.uid_log_widgets['main'] = main_log_widget
-            try: main_log_widget.config(state=tk.NORMAL); main_log_widget.delete('1.0', tk.END); main_log_widget.config(state=tk.DISABLED)
-            except Exception as e: print(f"Error clearing main log: {e}")
-        for uid in uids_to_monitor:
-            uid_str = str(uid); tab_frame = ttk.Frame(self.log_notebook, padding=2, style='TFrame')
-            tab_text = f"UID: {uid_str}"; self.log_notebook.add(tab_frame, text=tab_text)
-            log_text_widget = scrolledtext.ScrolledText(tab_frame, wrap=tk.WORD, state=tk.DISABLED, bd=1, relief=tk.SOLID, bg=BG_WIDGET_ALT, fg=FG_TEXT_DARK, insertbackground=FG_TEXT_DARK, font=self.log_font, borderwidth=1, highlightthickness=1, highlightcolor=ACCENT_BRIGHT_BLUE, highlightbackground=BORDER_LIGHT);
-            log_text_widget.pack(fill=tk.BOTH, expand=True); self.uid_log_widgets[uid_str] = log_text_widget
-
-    def _update_tab_text(self, uid_str, new_text):
-        """在主线程中安全地更新Notebook标签页的文本"""
-        try:
-            target_widget_id = None
-            # 可能需要检查 notebook 是否还存在
-            if not self.log_notebook.winfo_exists(): return
-            for tab_id in self.log_notebook.tabs():
-                current_text = self.log_notebook.tab(tab_id, "text")
-                if current_text == f"UID: {uid_str}" or current_text == f"{new_text} ({uid_str})": target_widget_id = tab_id; break
-            if target_widget_id: self.log_notebook.tab(target_widget_id, text=f"{new_text} ({uid_str})")
-        except tk.TclError as e: print(f"Error updating tab text for UID {uid_str}: {e}")
-        except Exception as e: print(f"Unexpected error updating tab text for UID {uid_str}: {e}")
-
-    def _run_backend_process(self, target_uids_list, max_initial_likes, polling_interval_seconds, session, csrf_token, log_queue, stop_event):
-        """后台核心工作线程，处理多个UID，使用Wbi签名，并添加计时"""
-        latest_dynamic_ids = {}; uid_to_uname = {}; error_occurred = False; stop_message_sent = False
-        try:
-            phase1_start_time = time.time(); _log_message(log_queue, f"--- Phase 1: 开始高速扫描 UIDs: {','.join(target_uids_list)} (检查首页) ---", target_uid='main'); initial_dynamics_to_like = []; processed_dynamic_ids_initial = set(); uid_scan_delay_min = 0.8; uid_scan_delay_max = 2.0
-            for index, current_target_uid in enumerate(target_uids_list):
-                if stop_event.is_set(): _log_message(log_queue, f"初始扫描中断。", target_uid='main'); break
-                _log_message(log_queue, f"--- 开始检查首页动态 ---", target_uid=current_target_uid)
-                dynamics_batch, _, _, host_uname = get_up_dynamics(session, current_target_uid, "", log_queue, stop_event)
-                if host_uname and host_uname != f"UID_{current_target_uid}": uid_to_uname[current_target_uid] = host_uname; self.root.after(0, self._update_tab_text, current_target_uid, host_uname)
-                uname_display = uid_to_uname.get(current_target_uid, f"UID {current_target_uid}")
-                if stop_event.is_set(): break
-                if dynamics_batch is None: _log_message(log_queue, f"获取首页动态失败，跳过。", target_uid=current_target_uid); continue
-                current_batch_latest_id = "0"
-                if not dynamics_batch: _log_message(log_queue,f"首页未找到任何动态。", target_uid=current_target_uid)
-                else:
-                    _log_message(log_queue, f"获取到 {len(dynamics_batch)} 条首页动态，快速检查中...", target_uid=current_target_uid)
-                    for dynamic_data in dynamics_batch:
-                         dynamic_id = dynamic_data.get("dynamic_id", "0");
-                         if dynamic_id > current_batch_latest_id: current_batch_latest_id = dynamic_id
-                    latest_dynamic_ids[current_target_uid] = current_batch_latest_id
-                    for dynamic_data in dynamics_batch:
-                        if stop_event.is_set(): break
-                        dynamic_id = dynamic_data.get("dynamic_id"); needs_like = dynamic_data.get("needs_like", False)
-                        if not dynamic_id or dynamic_id in processed_dynamic_ids_initial: continue
-                        processed_dynamic_ids_initial.add(dynamic_id)
-                        if needs_like: initial_dynamics_to_like.append({'id': dynamic_id, 'uid': current_target_uid})
-                _log_message(log_queue, f"检查完毕 (最新ID: {latest_dynamic_ids.get(current_target_uid, 'N/A')})", target_uid=current_target_uid)
-                if stop_event.is_set(): break
-                if len(target_uids_list) > 1 and index < len(target_uids_list) - 1: uid_wait = random.uniform(uid_scan_delay_min, uid_scan_delay_max); _log_message(log_queue, f"等待 {uid_wait:.1f} 秒...", target_uid='main'); stop_event.wait(timeout=uid_wait)
-            scan_duration = time.time() - phase1_start_time; _log_message(log_queue, f"--- 初始扫描: 高速检查完成，共收集 {len(initial_dynamics_to_like)} 条待点赞动态，耗时 {scan_duration:.2f} 秒。---", target_uid='main')
-            liked_count_actual = 0; initial_like_start_time = time.time()
-            if not stop_event.is_set() and initial_dynamics_to_like:
-                 _log_message(log_queue, f"--- 开始慢速点赞初始动态 (上限: {max_initial_likes}) ---", target_uid='main'); like_delay_min=4.0; like_delay_max=8.0
-                 for i, like_info in enumerate(initial_dynamics_to_like):
-                     dyn_id = like_info['id']; owner_uid = like_info['uid']; uname_display = uid_to_uname.get(owner_uid, f"UID {owner_uid}")
-                     if liked_count_actual >= max_initial_likes: _log_message(log_queue, f"初始点赞已达到上限 ({max_initial_likes})。", target_uid='main'); break
-                     if stop_event.is_set(): _log_message(log_queue, "初始点赞被中断。", target_uid='main'); break
-                     _log_message(log_queue, f"点赞 ({liked_count_actual + 1}/{max_initial_likes}): {uname_display} 的动态 ID {dyn_id}", target_uid=owner_uid)
-                     like_success = like_dynamic(session, dyn_id, csrf_token, log_queue, stop_event, target_uid=owner_uid)
-                     if stop_event.is_set(): break
-                     if like_success: liked_count_actual += 1
-                     like_wait = random.uniform(like_delay_min, like_delay_max); _log_message(log_queue, f"    ...等待 {like_wait:.1f} 秒...", target_uid=owner_uid); stop_event.wait(timeout=like_wait)
-                 initial_like_duration = time.time() - initial_like_start_time; _log_message(log_queue, f"--- 初始点赞处理完成，实际成功点赞 {liked_count_actual} 条，耗时 {initial_like_duration:.2f} 秒。 ---", target_uid='main')
-            elif not stop_event.is_set(): _log_message(log_queue, "--- 初始扫描: 未收集到需要点赞的动态。 ---", target_uid='main')
-            phase1_duration = time.time() - phase1_start_time
-            if not stop_event.is_set(): _log_message(log_queue, f"--- 初始扫描阶段彻底完成 (总耗时: {phase1_duration:.2f} 秒) ---", target_uid='main')
-            else: return
-            _log_message(log_queue, f"--- Phase 2: 进入监控模式 (间隔: {polling_interval_seconds:.1f} 秒) ---", target_uid='main'); processed_dynamic_ids_monitor = processed_dynamic_ids_initial
-            while not stop_event.is_set():
-                wait_time = polling_interval_seconds * random.uniform(0.8, 1.2); _log_message(log_queue, f"监控: 等待 {wait_time:.1f} 秒...", target_uid='main'); stop_event.wait(timeout=wait_time);
-                if stop_event.is_set(): break
-                new_dynamics_this_cycle = []; _log_message(log_queue, f"监控: 开始检查 {len(target_uids_list)} 个UP主...", target_uid='main')
-                uid_check_delay_min = 1.5; uid_check_delay_max = 3.5; check_start_time = time.time()
-                for index, current_target_uid in enumerate(target_uids_list):
-                    if stop_event.is_set(): break
-                    last_seen_id = latest_dynamic_ids.get(current_target_uid, "0"); uname_display = uid_to_uname.get(current_target_uid, f"UID {current_target_uid}")
-                    _log_message(log_queue, f"检查 {uname_display} (上次ID: {last_seen_id})", target_uid=current_target_uid)
-                    dynamics_latest_batch, _, _, host_uname_latest = get_up_dynamics(session, current_target_uid, "", log_queue, stop_event)
-                    if host_uname_latest and host_uname_latest != f"UID_{current_target_uid}": uid_to_uname[current_target_uid] = host_uname_latest; uname_display = host_uname_latest; self.root.after(0, self._update_tab_text, current_target_uid, host_uname_latest)
-                    if stop_event.is_set(): break
-                    if dynamics_latest_batch is None: _log_message(log_queue, f"获取最新动态失败。", target_uid=current_target_uid); continue
-                    current_check_latest_id = "0"; found_new_for_this_uid = False
-                    for dynamic_data in dynamics_latest_batch:
-                        dynamic_id = dynamic_data.get("dynamic_id", "0");
-                        if not dynamic_id or dynamic_id == "0": continue
-                        if dynamic_id > current_check_latest_id: current_check_latest_id = dynamic_id
-                        if dynamic_id > last_seen_id and dynamic_id not in processed_dynamic_ids_monitor:
-                            needs_like = dynamic_data.get("needs_like", False);
-                            if needs_like: new_dynamics_this_cycle.append({'id': dynamic_id, 'uid': current_target_uid, 'uname': uname_display}); found_new_for_this_uid = True; _log_message(log_queue, f"发现新动态 -> {dynamic_data.get('desc_text')}", target_uid=current_target_uid)
-                            processed_dynamic_ids_monitor.add(dynamic_id)
-                    if current_check_latest_id > last_seen_id: _log_message(log_queue, f"更新最新动态 ID 为 {current_check_latest_id}", target_uid=current_target_uid); latest_dynamic_ids[current_target_uid] = current_check_latest_id
-                    if len(target_uids_list) > 1 and index < len(target_uids_list) - 1: uid_wait = random.uniform(uid_check_delay_min, uid_check_delay_max); stop_event.wait(timeout=uid_wait)
-                check_duration = time.time() - check_start_time; _log_message(log_queue, f"监控: 本轮检查完毕，耗时 {check_duration:.2f} 秒。", target_uid='main')
-                if stop_event.is_set(): break
-                if new_dynamics_this_cycle:
-                    monitor_like_start_time = time.time(); _log_message(log_queue, f"监控: 本轮共发现 {len(new_dynamics_this_cycle)} 条新动态，开始慢速点赞...", target_uid='main')
-                    liked_in_monitor_batch = 0; monitor_like_delay_min = 4.0; monitor_like_delay_max = 8.0
-                    for like_info in reversed(new_dynamics_this_cycle):
-                        dyn_id = like_info['id']; owner_uid = like_info['uid']; uname_display = like_info['uname']
-                        if stop_event.is_set(): break
-                        _log_message(log_queue, f"尝试点赞 {uname_display} 的新动态 ID: {dyn_id}", target_uid=owner_uid)
-                        like_success = like_dynamic(session, dyn_id, csrf_token, log_queue, stop_event, target_uid=owner_uid)
-                        if stop_event.is_set(): break
-                        if like_success: liked_in_monitor_batch += 1
-                        monitor_like_wait = random.uniform(monitor_like_delay_min, monitor_like_delay_max); _log_message(log_queue, f"    ...等待 {monitor_like_wait:.1f} 秒...", target_uid=owner_uid); stop_event.wait(timeout=monitor_like_wait)
-                    monitor_like_duration = time.time() - monitor_like_start_time
-                    if not stop_event.is_set(): _log_message(log_queue, f"监控: 本轮点赞完成，成功 {liked_in_monitor_batch} 条，耗时 {monitor_like_duration:.2f} 秒。", target_uid='main')
-                else: _log_message(log_queue, "监控: 本轮未发现需点赞的新动态。", target_uid='main')
-        except RuntimeError as e: _log_message(log_queue, f"严重运行时错误: {e}。线程终止。", target_uid='main'); error_occurred = True; traceback.print_exc()
-        except Exception as e: _log_message(log_queue, f"后台线程发生意外错误: {e}", target_uid='main'); log_queue.put({'target':'main', 'message':traceback.format_exc()}); error_occurred = True
+    def _reset_log_view(self, uids_to_monitor):
+        """新任务开始：清空日志存储与视图，概览表中各 UID 的进度归零 (保留昵称)"""
+        self.log_store.clear(); self.uid_summary.reset(uids_to_monitor); self._set_log_filter(None)
+
+    def _run_backend_process(self, target_uids_list, max_initial_likes, polling_interval_seconds, session, csrf_token, log_queue, stop_event, backfill=False):
+        """后台工作线程：运行无界面引擎，昵称与各 UID 进度写入 uid_summary，由主线程轮询刷新概览表"""
+        from engine import LikerEngine
+        from state_store import DEFAULT_STATE_DB, StateStore, account_state_path
+        state_store = None; state_path = account_state_path(DEFAULT_STATE_DB, session.cookies.get('DedeUserID'))  # 每个账号单独的状态库，切换账号后不会沿用上一个账号的进度
+        if not state_path: _log_message(log_queue, "警告: Cookie 中没有 DedeUserID，无法区分账号，本次不保存进度。")
+        else:
+            try: state_store = StateStore(state_path)
+            except Exception as e: _log_message(log_queue, f"警告: 打开状态库失败，本次不保存进度: {e}")
+        engine = LikerEngine(session, csrf_token, log_queue, stop_event, on_uname=lambda uid, uname: self.uid_summary.update(uid, uname=uname), on_progress=self.uid_summary.update, state_store=state_store, backfill=backfill)
+        self.engine = engine
+        # 启动到引擎创建之间界面上增删的 UID
+        current_uids = set(self.uid_set); started_uids = set(target_uids_list)
+        engine.add_targets([uid for uid in current_uids if uid not in started_uids]); engine.remove_targets([uid for uid in started_uids if uid not in current_uids])
+        try: engine.run(target_uids_list, max_initial_likes, polling_interval_seconds)
         finally:
-            if not stop_message_sent:
-                stop_msg = {'target':'main', 'message': ""};
-                if stop_event.is_set(): stop_msg['message'] = "BACKEND_STOPPED_MANUAL"
-                elif error_occurred: stop_msg['message'] = "BACKEND_STOPPED_ERROR"
-                else: stop_msg['message'] = "BACKEND_STOPPED_MANUAL"
-                log_queue.put(stop_msg); stop_message_sent = True
+            self.engine = None
+            if state_store: state_store.close()
 
     def _on_closing(self):
         """处理主窗口关闭事件"""
@@ -665,9 +476,12 @@ class BiliLikerApp:
         if self.is_running: should_exit = messagebox.askyesno("确认退出", "点赞/监控任务仍在运行中，确定要停止并退出吗？", parent=self.root)
         if should_exit:
             _log_message(self.log_queue, "收到退出请求，正在停止后台任务...")
-            self.stop_event.set(); self.login_stop_event.set(); self._close_qr_window()
+            self.stop_event.set(); self.login_stop_event.set(); self.import_stop_event.set(); self._close_qr_window()
             if self.backend_thread and self.backend_thread.is_alive():
-                 if threading.current_thread() != self.backend_thread: self.backend_thread.join(timeout=1.5)
+                 # 在途请求由引擎的 StopCanceller 中断，后台线程通常在几百毫秒内写完状态退出；给足时间，避免状态库写到一半时进程退出
+                 if threading.current_thread() != self.backend_thread:
+                     self.backend_thread.join(timeout=5.0)
+                     if self.backend_thread.is_alive(): print("警告: 后台线程 5 秒内未退出，未保存的状态可能丢失。")
                  else: print("Warning: _on_closing called from backend thread?")
             try: self.root.destroy()
             except tk.TclError as e: print(f"Error destroying main window: {e}")
@@ -0,0 +1,323 @@
+# metrics.py
+# -*- coding: utf-8 -*-
+# 进程内指标：计数器 / 仪表 / 直方图，可通过本地 HTTP 端点 (Prometheus 文本格式) 或定期写入的 JSON 快照导出。
+# 只依赖标准库，GUI、无界面引擎与 login.py 都可以直接导入。
+
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 请求耗时的默认分桶 (秒)
+DEFAULT_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# 新动态时效 (发布 -> 检测 / 点赞) 的分桶 (秒)，覆盖几秒到几小时的轮询间隔
+FRESHNESS_BUCKETS = (1, 2.5, 5, 10, 20, 30, 45, 60, 90, 120, 180, 300, 450, 600, 900, 1200, 1800, 2700, 3600, 7200, 14400)
+SUMMARY_QUANTILES = (0.5, 0.95, 0.99)
+DEFAULT_METRICS_INTERVAL = 30.0  # JSON 快照写入间隔 (秒)
+
+
+def _label_key(labelnames, labels):
+    if set(labels) != set(labelnames): raise ValueError(f"标签应为 {labelnames}，实际为 {tuple(labels)}")
+    return tuple(str(labels[name]) for name in labelnames)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _format_labels(labelnames, key, extra=()):
+    pairs = list(zip(labelnames, key)) + list(extra)
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}" if pairs else ""
+
+def _format_value(value):
+    if value == float("inf"): return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name; self.help = help_text; self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock(); self._values = {}
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type_name}"]
+
+
+class Counter(_Metric):
+    """只增不减的计数器"""
+    type_name = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock: self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock: return self._values.get(_label_key(self.labelnames, labels), 0)
+
+    def total(self):
+        with self._lock: return sum(self._values.values())
+
+    def samples(self):
+        with self._lock: return sorted(self._values.items())
+
+    def render(self):
+        return self._header() + [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in self.samples()]
+
+    def snapshot(self):
+        return {"type": self.type_name, "samples": [{"labels": dict(zip(self.labelnames, key)), "value": value} for key, value in self.samples()]}
+
+
+class Gauge(Counter):
+    """可任意设置的数值；set_function() 注册的回调在导出时求值 (用于队列深度等)"""
+    type_name = "gauge"
+
+    def __init__(self, name, help_text, labelnames=()):
+        super().__init__(name, help_text, labelnames); self._functions = {}
+
+    def set(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock: self._values[key] = value
+
+    def set_function(self, func, **labels):
+        """func 为 None 时取消注册"""
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            if func is None: self._functions.pop(key, None); self._values.pop(key, None)
+            else: self._functions[key] = func
+
+    def samples(self):
+        with self._lock: values = dict(self._values); functions = list(self._functions.items())
+        for key, func in functions:
+            try: values[key] = func()
+            except Exception: continue  # 回调出错时不影响其他指标导出
+        return sorted(values.items())
+
+
+class Histogram(_Metric):
+    """固定分桶直方图，quantile() 在桶内线性插值估计分位数。
+    render_labels=False 时 /metrics 只导出所有标签合并后的一条序列 (标签取值无界时使用，例如 UID)，分标签的数据仍可由 summary() / snapshot() 查询"""
+    type_name = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_LATENCY_BUCKETS, render_labels=True):
+        super().__init__(name, help_text, labelnames); self.buckets = tuple(sorted(buckets)); self.render_labels = render_labels
+
+    def observe(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None: state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]  # 各桶计数 (非累计), 总和, 总数
+            state[0][bisect.bisect_left(self.buckets, value)] += 1; state[1] += value; state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """with histogram.time(endpoint="fetch"): ... 记录代码块耗时"""
+        start_time = time.perf_counter()
+        try: yield
+        finally: self.observe(time.perf_counter() - start_time, **labels)
+
+    def _state(self, key):
+        with self._lock:
+            state = self._values.get(key)
+            return (list(state[0]), state[1], state[2]) if state else None
+
+    def _merged_state(self):
+        """所有标签合并后的状态，没有数据时返回 None"""
+        with self._lock: states = [(list(state[0]), state[1], state[2]) for state in self._values.values()]
+        if not states: return None
+        return [sum(column) for column in zip(*(state[0] for state in states))], sum(state[1] for state in states), sum(state[2] for state in states)
+
+    def quantile(self, q, **labels):
+        """估计分位数 (q 取 0~1)，没有数据时返回 None"""
+        state = self._state(_label_key(self.labelnames, labels))
+        return self._quantile(state, q) if state else None
+
+    def _summarize(self, state):
+        counts, total_sum, total = state
+        summary = {"count": total, "sum": round(total_sum, 6)}
+        for q in SUMMARY_QUANTILES: summary[f"p{q * 100:g}"] = self._quantile(state, q)
+        return summary
+
+    def summary(self):
+        """{"overall": 所有标签合并的 count/sum/p50/p95/p99, "samples": {标签值 (单标签时为字符串，否则为元组): 同上}}，没有数据时 overall 为 None"""
+        with self._lock: keys = sorted(self._values)
+        merged = self._merged_state()
+        return {"overall": self._summarize(merged) if merged else None,
+                "samples": {(key[0] if len(key) == 1 else key): self._summarize(self._state(key)) for key in keys}}
+
+    def _quantile(self, state, q):
+        counts, _, total = state
+        if not total: return None
+        rank = q * total; cumulative = 0
+        for index, count in enumerate(counts):
+            if count and cumulative + count >= rank:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                if index >= len(self.buckets): return lower  # 落在 +Inf 桶，只能给出最后一个边界
+                return lower + (self.buckets[index] - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+    def render(self):
+        lines = self._header()
+        if self.render_labels:
+            with self._lock: keys = sorted(self._values)
+            labelnames = self.labelnames; series = [(key, self._state(key)) for key in keys]
+        else: merged = self._merged_state(); labelnames = (); series = [((), merged)] if merged else []
+        for key, (counts, total_sum, total) in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(labelnames, key, [('le', _format_value(float(bound)))])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labelnames, key)} {_format_value(total_sum)}")
+            lines.append(f"{self.name}_count{_format_labels(labelnames, key)} {total}")
+        return lines
+
+    def snapshot(self):
+        with self._lock: keys = sorted(self._values)
+        samples = [dict({"labels": dict(zip(self.labelnames, key))}, **self._summarize(self._state(key))) for key in keys]
+        snapshot = {"type": self.type_name, "buckets": list(self.buckets), "samples": samples}
+        if self.labelnames and keys: snapshot["overall"] = self._summarize(self._merged_state())  # 所有标签合并 (例如全部 UID 的时效分位数)
+        return snapshot
+
+
+class MetricsRegistry:
+    """按名称登记指标；重复登记同名指标时返回已有对象"""
+
+    def __init__(self):
+        self._lock = threading.Lock(); self._metrics = {}
+
+    def _register(self, cls, name, help_text, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None: metric = self._metrics[name] = cls(name, help_text, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames): raise ValueError(f"指标 {name} 已以不同类型或标签登记")
+            return metric
+
+    def counter(self, name, help_text, labelnames=()): return self._register(Counter, name, help_text, labelnames)
+    def gauge(self, name, help_text, labelnames=()): return self._register(Gauge, name, help_text, labelnames)
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_LATENCY_BUCKETS, render_labels=True): return self._register(Histogram, name, help_text, labelnames, buckets=buckets, render_labels=render_labels)
+
+    def get(self, name):
+        with self._lock: return self._metrics.get(name)
+
+    def render_prometheus(self):
+        with self._lock: metrics = list(self._metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+    def snapshot(self):
+        with self._lock: metrics = list(self._metrics.values())
+        return {"timestamp": time.time(), "metrics": {metric.name: metric.snapshot() for metric in metrics}}
+
+    def write_snapshot(self, path):
+        """原子地写入 JSON 快照 (先写临时文件再替换)"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f: json.dump(self.snapshot(), f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, path)
+
+
+# 进程内共享的指标注册表
+metrics = MetricsRegistry()
+
+# --- 预定义指标 (endpoint 与 rate_limit 的类别一致：fetch = feed/space，like = thumb，另有 detail / nav / qrcode_poll) ---
+REQUEST_LATENCY = metrics.histogram("bili_request_duration_seconds", "Bilibili 接口请求耗时 (秒)", ("endpoint",))
+REQUESTS = metrics.counter("bili_requests_total", "Bilibili 接口请求次数，按结果 (ok / limited / error) 划分", ("endpoint", "outcome"))
+REQUEST_RETRIES = metrics.counter("bili_request_retries_total", "Bilibili 接口重试次数", ("endpoint",))
+RATE_LIMIT_HITS = metrics.counter("bili_rate_limit_hits_total", "收到的限流/风控响应次数，按 API code 划分", ("endpoint", "code"))
+POLL_ROUND_SECONDS = metrics.histogram("bili_poll_round_duration_seconds", "监控阶段每轮检查耗时 (秒)", buckets=(1, 2.5, 5, 10, 30, 60, 120, 300, 600))
+LIKES = metrics.counter("bili_likes_total", "点赞结果次数", ("result",))
+LIKES_PER_MINUTE = metrics.gauge("bili_likes_per_minute", "最近 5 分钟内平均每分钟成功点赞数")
+QUEUE_DEPTH = metrics.gauge("bili_queue_depth", "各队列当前积压数量", ("queue",))
+STOP_SECONDS = metrics.histogram("bili_stop_duration_seconds", "从检测到停止信号到后台任务退出 (在途请求已中断、状态已写入) 的耗时 (秒)", buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0))
+# 时效按 UID 记录，但 UID 数量无界：/metrics 只导出全部 UID 合并的分布，每个 UID 的分位数见 freshness_summary() 与 JSON 快照
+DETECT_LATENCY = metrics.histogram("bili_detect_latency_seconds", "监控发现的新动态从发布 (pub_ts) 到被检测到的耗时 (秒)", ("uid",), buckets=FRESHNESS_BUCKETS, render_labels=False)
+TIME_TO_LIKE = metrics.histogram("bili_time_to_like_seconds", "监控发现的新动态从发布 (pub_ts) 到点赞成功的耗时 (秒)", ("uid",), buckets=FRESHNESS_BUCKETS, render_labels=False)
+STARTUP_SECONDS = metrics.gauge("bili_startup_seconds", "GUI 启动各阶段距进程启动的秒数：window_ready 界面可交互，session_ready 登录状态已确定", ("stage",))
+
+
+class EventRate:
+    """滑动窗口内的事件速率 (例如每分钟点赞数)"""
+
+    def __init__(self, window=300.0, clock=time.monotonic):
+        self.window = window; self.clock = clock; self._lock = threading.Lock(); self._events = []
+
+    def mark(self):
+        with self._lock: self._events.append(self.clock()); self._trim()
+
+    def _trim(self):
+        cutoff = self.clock() - self.window
+        if self._events and self._events[0] < cutoff: self._events = self._events[bisect.bisect_left(self._events, cutoff):]
+
+    def per_minute(self):
+        with self._lock: self._trim(); return len(self._events) * 60.0 / self.window
+
+
+like_rate = EventRate()
+LIKES_PER_MINUTE.set_function(like_rate.per_minute)
+
+
+def record_like(success):
+    LIKES.inc(result="success" if success else "failed")
+    if success: like_rate.mark()
+
+
+def record_detected(uid, pub_ts, detected_at=None):
+    """记录新动态的检测时效；pub_ts 未知 (0) 时忽略。返回耗时秒数或 None"""
+    if not pub_ts: return None
+    latency = max(0.0, (time.time() if detected_at is None else detected_at) - pub_ts); DETECT_LATENCY.observe(latency, uid=uid); return latency
+
+
+def record_time_to_like(uid, pub_ts, liked_at=None):
+    """记录新动态从发布到点赞成功的耗时；pub_ts 未知 (0) 时忽略。返回耗时秒数或 None"""
+    if not pub_ts: return None
+    latency = max(0.0, (time.time() if liked_at is None else liked_at) - pub_ts); TIME_TO_LIKE.observe(latency, uid=uid); return latency
+
+
+def freshness_summary():
+    """可查询的时效汇总: {"detect": DETECT_LATENCY.summary(), "like": TIME_TO_LIKE.summary()} (整体与每个 UID 的 p50/p95/p99)"""
+    return {"detect": DETECT_LATENCY.summary(), "like": TIME_TO_LIKE.summary()}
+
+
+# --- 导出 ---
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = metrics
+
+    def do_GET(self):
+        if self.path.split("?")[0] in ("/metrics", "/"): body = self.registry.render_prometheus().encode("utf-8"); content_type = "text/plain; version=0.0.4; charset=utf-8"
+        elif self.path.split("?")[0] == "/metrics.json": body = json.dumps(self.registry.snapshot(), ensure_ascii=False).encode("utf-8"); content_type = "application/json; charset=utf-8"
+        else: self.send_error(404); return
+        self.send_response(200); self.send_header("Content-Type", content_type); self.send_header("Content-Length", str(len(body))); self.end_headers(); self.wfile.write(body)
+
+    def log_message(self, format, *args): pass  # 不把每次抓取写到 stderr
+
+
+class MetricsExporter:
+    """可选的导出器：port 不为 None 时在 host:port 提供 /metrics (Prometheus) 与 /metrics.json；
+    snapshot_path 不为 None 时每 interval 秒写一次 JSON 快照，stop() 时再写最后一次。"""
+
+    def __init__(self, registry=metrics, port=None, host="127.0.0.1", snapshot_path=None, interval=DEFAULT_METRICS_INTERVAL):
+        self.registry = registry; self.port = port; self.host = host; self.snapshot_path = snapshot_path; self.interval = interval
+        self._server = None; self._stop_event = threading.Event(); self._threads = []
+
+    def start(self):
+        if self.port is not None:
+            handler = type("MetricsHandler", (_MetricsHandler,), {"registry": self.registry})
+            self._server = ThreadingHTTPServer((self.host, self.port), handler); self._server.daemon_threads = True
+            self.port = self._server.server_address[1]  # port=0 时取系统分配的端口
+            self._threads.append(threading.Thread(target=self._server.serve_forever, daemon=True, name="metrics-http"))
+        if self.snapshot_path: self._threads.append(threading.Thread(target=self._snapshot_loop, daemon=True, name="metrics-snapshot"))
+        for thread in self._threads: thread.start()
+        return self
+
+    def _write_snapshot(self):
+        try: self.registry.write_snapshot(self.snapshot_path)
+        except OSError as e: print(f"写入指标快照失败: {e}")
+
+    def _snapshot_loop(self):
+        while not self._stop_event.wait(self.interval): self._write_snapshot()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._server: self._server.shutdown(); self._server.server_close(); self._server = None
+        if self.snapshot_path: self._write_snapshot()
@@ -0,0 +1,340 @@
+# mock_server.py
+# -*- coding: utf-8 -*-
+# 本地模拟 Bilibili 接口 (feed/space + Wbi 校验、feed/all 关注时间线、关注关系与关注列表、点赞、动态详情、nav、扫码登录)，用于基准测试与回归测试，不访问真实 API。
+# 用法: python mock_server.py --port 8000 --latency 0.05 --post-rate 0.01
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from hashlib import md5
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+
+from bili_api import mixinKeyEncTab
+from http_session import _PooledAdapter, create_session
+
+MOCK_IMG_KEY = "7cd084941338484aae1ad9425b84077c"; MOCK_SUB_KEY = "4932caff0ff746eab6f01bf08b70ac45"
+MOCK_CSRF = "mockcsrf0123456789abcdef"
+FIRST_DYNAMIC_ID = 900000000000000000
+
+
+def _expected_w_rid(params):
+    """按 Wbi 规则独立计算签名 (不复用 bili_api 的签名代码，便于发现客户端的签名错误)"""
+    orig = MOCK_IMG_KEY + MOCK_SUB_KEY; mixin_key = "".join(orig[i] for i in mixinKeyEncTab)[:32]
+    unsigned = {k: "".join(ch for ch in str(v) if ch not in "!'()*") for k, v in sorted(params.items()) if k != "w_rid"}
+    return md5((urlencode(unsigned) + mixin_key).encode()).hexdigest()
+
+
+class MockBiliState:
+    """模拟服务器的数据：每个 UID 一条按 ID 递增的时间线，新动态按 post_rate (条/秒/UID) 的泊松过程随时间产生"""
+
+    def __init__(self, initial_posts=40, post_rate=0.0, page_size=12, pinned=True, liked_fraction=0.0, followed_fraction=1.0, followings=(), seed=None, clock=time.time):
+        self.initial_posts = initial_posts; self.post_rate = post_rate; self.page_size = page_size; self.pinned = pinned
+        self.followed_fraction = followed_fraction  # 按 UID 尾数确定登录账号关注了哪些 UP 主
+        self.followings = [str(uid) for uid in followings]  # 关注列表接口返回的 UID (从新到旧)
+        self.liked_fraction = liked_fraction; self.clock = clock; self.random = random.Random(seed)
+        self._lock = threading.Lock(); self._next_id = FIRST_DYNAMIC_ID
+        self.timelines = {}  # uid -> [动态 dict] (按 ID 从旧到新)
+        self._next_post_at = {}; self.liked = set(); self.posts = {}  # dynamic_id -> 动态
+
+    def _new_post(self, uid, pub_ts):
+        self._next_id += self.random.randint(1, 1000); dynamic_id = str(self._next_id)
+        post = {"id": dynamic_id, "uid": uid, "pub_ts": int(pub_ts), "text": f"UID {uid} 的第 {len(self.timelines.get(uid, ())) + 1} 条模拟动态"}
+        self.timelines.setdefault(uid, []).append(post); self.posts[dynamic_id] = post
+        if self.random.random() < self.liked_fraction: self.liked.add(dynamic_id)
+        return post
+
+    def _advance(self, uid):
+        """调用方持有锁：补齐该 UID 到当前时间为止应产生的动态"""
+        now = self.clock()
+        if uid not in self.timelines:
+            self.timelines[uid] = []
+            for index in range(self.initial_posts): self._new_post(uid, now - (self.initial_posts - index) * 3600)
+            self._next_post_at[uid] = now + self.random.expovariate(self.post_rate) if self.post_rate > 0 else None
+        while self._next_post_at.get(uid) is not None and self._next_post_at[uid] <= now:
+            self._new_post(uid, self._next_post_at[uid]); self._next_post_at[uid] += self.random.expovariate(self.post_rate)
+
+    def publish(self, uid, count=1):
+        """立即为 uid 发布 count 条新动态 (基准测试中模拟监控阶段出现的新动态)"""
+        with self._lock:
+            self._advance(uid); return [self._new_post(uid, self.clock())["id"] for _ in range(count)]
+
+    def page(self, uid, offset):
+        """返回 (本页动态, 下一页 offset, has_more)；置顶动态 (最旧的一条) 只出现在第一页顶部"""
+        with self._lock:
+            self._advance(uid); timeline = self.timelines[uid]
+            newest_first = [post for post in reversed(timeline) if not offset or int(post["id"]) < int(offset)]
+            page = newest_first[:self.page_size]; has_more = len(newest_first) > self.page_size
+            pinned = timeline[0] if self.pinned and not offset and timeline else None
+            if pinned is not None: page = [pinned] + [post for post in page if post is not pinned]
+            next_offset = page[-1]["id"] if page else ""
+            return [(post, post is pinned) for post in page], next_offset, has_more
+
+    def is_followed(self, uid):
+        return uid.isdigit() and int(uid) % 100 < self.followed_fraction * 100
+
+    def following_page(self, offset):
+        """关注时间线 (feed/all)：已生成时间线且已关注的 UID 的动态按 ID 倒序合并，不含置顶标记。返回值同 page()"""
+        with self._lock:
+            followed = [uid for uid in self.timelines if self.is_followed(uid)]
+            for uid in followed: self._advance(uid)
+            newest_first = sorted((post for uid in followed for post in self.timelines[uid] if not offset or int(post["id"]) < int(offset)), key=lambda post: int(post["id"]), reverse=True)
+            page = newest_first[:self.page_size]; has_more = len(newest_first) > self.page_size
+            return [(post, False) for post in page], (page[-1]["id"] if page else ""), has_more
+
+    def like(self, dynamic_id):
+        """返回 API code：0 成功，71000 已赞过，-400 动态不存在"""
+        with self._lock:
+            if dynamic_id not in self.posts: return -400
+            if dynamic_id in self.liked: return 71000
+            self.liked.add(dynamic_id); return 0
+
+
+class _MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "MockBili/1.0"
+
+    def log_message(self, format, *args): pass
+
+    def _send_json(self, payload, status=200, headers=()):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status); self.send_header("Content-Type", "application/json; charset=utf-8"); self.send_header("Content-Length", str(len(body)))
+        for name, value in headers: self.send_header(name, value)
+        self.end_headers(); self.wfile.write(body)
+
+    def _route(self, method):
+        url = urlsplit(self.path); query = dict(parse_qsl(url.query, keep_blank_values=True))
+        if method == "POST":
+            length = int(self.headers.get("Content-Length") or 0); query.update(parse_qsl(self.rfile.read(length).decode("utf-8"), keep_blank_values=True))
+        self._dispatch(method, url.path, query)
+
+    def _dispatch(self, method, path, query):
+        server = self.server; server.count_request(path)
+        if server.latency: time.sleep(max(0.0, server.random.gauss(server.latency, server.latency_jitter)))
+        handler = server.routes.get((method, path))
+        if handler is None: self._send_json({"code": -404, "message": "啥都木有"}, status=404); return
+        if path != "/x/web-interface/nav" and not path.startswith("/x/passport-login"):
+            injected = server.inject()
+            if injected == "HTTP 412": self._send_json({"code": -412, "message": "请求被拦截"}, status=412); return
+            if injected == -412: self._send_json({"code": -412, "message": "请求被拦截"}); return
+        handler(self, query)
+
+    def do_GET(self): self._route("GET")
+    def do_POST(self): self._route("POST")
+
+    # --- 各接口 ---
+    def feed_space(self, query):
+        if "w_rid" not in query or query["w_rid"] != _expected_w_rid(query) or self.server.inject_once(self.server.inject_352): self._send_json({"code": -352, "message": "风控校验失败"}); return
+        uid = query.get("host_mid", ""); page, next_offset, has_more = self.server.state.page(uid, query.get("offset", ""))
+        self._send_items(page, next_offset, has_more)
+
+    def feed_all(self, query):
+        page, next_offset, has_more = self.server.state.following_page(query.get("offset", ""))
+        self._send_items(page, next_offset, has_more)
+
+    def _send_items(self, page, next_offset, has_more):
+        liked = self.server.state.liked; items = []
+        for post, pinned in page:
+            uid = post["uid"]
+            item = {"id_str": post["id"], "type": "DYNAMIC_TYPE_WORD", "modules": {
+                "module_author": {"mid": int(uid) if uid.isdigit() else 0, "name": f"模拟UP主{uid}", "pub_ts": post["pub_ts"]},
+                "module_dynamic": {"desc": {"text": post["text"]}, "major": None},
+                "module_stat": {"like_info": {"count": 0, "is_liked": 1 if post["id"] in liked else 0}}}}
+            if pinned: item["modules"]["module_tag"] = {"text": "置顶"}
+            items.append(item)
+        self._send_json({"code": 0, "message": "0", "data": {"items": items, "has_more": has_more, "offset": next_offset}})
+
+    def relations(self, query):
+        fids = [fid for fid in query.get("fids", "").split(",") if fid]
+        self._send_json({"code": 0, "data": {fid: {"mid": int(fid), "attribute": 2 if self.server.state.is_followed(fid) else 0} for fid in fids if fid.isdigit()}})
+
+    def followings(self, query):
+        page_number = max(1, int(query.get("pn") or 1)); page_size = min(50, int(query.get("ps") or 50)); followings = self.server.state.followings
+        page = followings[(page_number - 1) * page_size:page_number * page_size]
+        self._send_json({"code": 0, "data": {"list": [{"mid": int(uid), "uname": f"模拟UP主{uid}"} for uid in page], "total": len(followings)}})
+
+    def thumb(self, query):
+        if query.get("csrf") != MOCK_CSRF: self._send_json({"code": -111, "message": "csrf 校验失败"}); return
+        code = self.server.state.like(query.get("dynamic_id", ""))
+        self._send_json({"code": code, "message": "0" if code == 0 else "已赞过" if code == 71000 else "动态不存在"})
+
+    def dynamic_detail(self, query):
+        dynamic_id = query.get("dynamic_id", ""); post = self.server.state.posts.get(dynamic_id)
+        if post is None: self._send_json({"code": 500404, "message": "动态不存在"}); return
+        like_state = 1 if dynamic_id in self.server.state.liked else 0
+        self._send_json({"code": 0, "data": {"card": {"desc": {"dynamic_id_str": dynamic_id, "uid": post["uid"], "like_state": like_state}}}})
+
+    def nav(self, query):
+        self._send_json({"code": 0, "data": {"isLogin": True, "uname": "模拟用户", "mid": 1,
+                                             "wbi_img": {"img_url": f"https://i0.hdslb.com/bfs/wbi/{MOCK_IMG_KEY}.png", "sub_url": f"https://i0.hdslb.com/bfs/wbi/{MOCK_SUB_KEY}.png"}}})
+
+    def qrcode_generate(self, query):
+        key = f"mockqr{self.server.random.getrandbits(48):012x}"; self.server.qr_polls[key] = 0
+        self._send_json({"code": 0, "data": {"url": f"https://passport.bilibili.com/h5-app/passport/login/scan?qrcode_key={key}", "qrcode_key": key}})
+
+    def qrcode_poll(self, query):
+        key = query.get("qrcode_key", ""); polls = self.server.qr_polls.get(key)
+        if polls is None: self._send_json({"code": 0, "data": {"code": 86038, "message": "二维码已失效"}}); return
+        self.server.qr_polls[key] = polls + 1
+        if polls + 1 < self.server.qr_polls_until_scanned: self._send_json({"code": 0, "data": {"code": 86101, "message": "未扫码"}}); return
+        if polls + 1 == self.server.qr_polls_until_scanned: self._send_json({"code": 0, "data": {"code": 86090, "message": "二维码已扫码未确认"}}); return
+        cookies = [("Set-Cookie", f"{name}={value}; Path=/") for name, value in (("SESSDATA", "mocksessdata"), ("bili_jct", MOCK_CSRF), ("DedeUserID", "1"))]
+        self._send_json({"code": 0, "data": {"code": 0, "message": "", "url": ""}}, headers=cookies)
+
+
+class _InProcessHandler(_MockHandler):
+    """不经套接字执行路由的处理器：_send_json 只记录应答"""
+
+    def __init__(self, server): self.server = server; self.reply = None
+    def _send_json(self, payload, status=200, headers=()): self.reply = (status, payload, list(headers))
+
+
+class MockBiliServer(ThreadingHTTPServer):
+    """模拟服务器。latency 为每个请求的平均附加延迟 (秒)；inject_412 / inject_352 为注入对应错误的概率，
+    inject_http412 为返回 HTTP 412 的概率。state 为 MockBiliState (可直接调用 publish() 制造新动态，state 参数可传入子类实例)。
+    listen=False 时不监听端口，只能通过 in_process_session() 访问 (不要调用 start() / stop())。"""
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, latency_jitter=None, inject_412=0.0, inject_http412=0.0, inject_352=0.0, qr_polls_until_scanned=3, seed=None, listen=True, state=None, **state_options):
+        super().__init__((host, port), _MockHandler, bind_and_activate=listen)
+        self.latency = latency; self.latency_jitter = latency * 0.2 if latency_jitter is None else latency_jitter
+        self.inject_412 = inject_412; self.inject_http412 = inject_http412; self.inject_352 = inject_352
+        self.random = random.Random(seed); self.state = state if state is not None else MockBiliState(seed=seed, **state_options)
+        self.qr_polls = {}; self.qr_polls_until_scanned = qr_polls_until_scanned
+        self._count_lock = threading.Lock(); self.request_counts = {}; self._thread = None
+        self.routes = {
+            ("GET", "/x/polymer/web-dynamic/v1/feed/space"): _MockHandler.feed_space,
+            ("GET", "/x/polymer/web-dynamic/v1/feed/all"): _MockHandler.feed_all,
+            ("GET", "/x/relation/relations"): _MockHandler.relations,
+            ("GET", "/x/relation/followings"): _MockHandler.followings,
+            ("POST", "/dynamic_like/v1/dynamic_like/thumb"): _MockHandler.thumb,
+            ("GET", "/dynamic_svr/v1/dynamic_svr/get_dynamic_detail"): _MockHandler.dynamic_detail,
+            ("GET", "/x/web-interface/nav"): _MockHandler.nav,
+            ("GET", "/x/passport-login/web/qrcode/generate"): _MockHandler.qrcode_generate,
+            ("GET", "/x/passport-login/web/qrcode/poll"): _MockHandler.qrcode_poll,
+        }
+
+    @property
+    def base_url(self): return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def count_request(self, path):
+        with self._count_lock: self.request_counts[path] = self.request_counts.get(path, 0) + 1
+
+    def handle_error(self, request, client_address):
+        if isinstance(sys.exc_info()[1], ConnectionError): return  # 客户端停止时中断了在途请求 (StopCanceller)
+        super().handle_error(request, client_address)
+
+    def inject_once(self, probability):
+        return probability > 0 and self.random.random() < probability
+
+    def inject(self):
+        """按概率返回要注入的限流错误 (-412 / "HTTP 412")，不注入时返回 None"""
+        if self.inject_once(self.inject_http412): return "HTTP 412"
+        if self.inject_once(self.inject_412): return -412
+        return None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True, name="mock-bili"); self._thread.start(); return self
+
+    def stop(self):
+        self.shutdown(); self.server_close()
+
+    def handle(self, method, path, query):
+        """在调用线程内执行一个请求 (计数、延迟、错误注入与路由同 HTTP 请求)，返回 (HTTP 状态码, JSON 应答, 附加响应头)"""
+        handler = _InProcessHandler(self); handler._dispatch(method, path, query); return handler.reply
+
+
+class _RedirectAdapter(_PooledAdapter):
+    """把请求改发到本地模拟服务器 (保留路径与查询串)，连接复用统计与正常会话一致"""
+
+    def __init__(self, base_url, pool_maxsize=32):
+        super().__init__("mock", pool_maxsize); self.base_url = base_url.rstrip("/")
+
+    def send(self, request, **kwargs):
+        url = urlsplit(request.url); request.url = f"{self.base_url}{url.path}" + (f"?{url.query}" if url.query else "")
+        return super().send(request, **kwargs)
+
+
+class _InProcessAdapter(BaseAdapter):
+    """直接调用 server.handle() 的适配器 (无网络、无连接池)。before_handle(method, path, query) 返回 (状态码, JSON 应答) 时以它代替服务器应答"""
+
+    def __init__(self, server, before_handle=None):
+        super().__init__(); self.server = server; self.before_handle = before_handle
+
+    def send(self, request, **kwargs):
+        url = urlsplit(request.url); query = dict(parse_qsl(url.query, keep_blank_values=True))
+        if request.body: query.update(parse_qsl(request.body if isinstance(request.body, str) else request.body.decode("utf-8"), keep_blank_values=True))
+        reply = self.before_handle(request.method, url.path, query) if self.before_handle else None
+        status, payload, headers = (reply + ([],)) if reply is not None else self.server.handle(request.method, url.path, query)
+        response = Response(); response.status_code = status; response.reason = "OK" if status == 200 else "Error"
+        response._content = json.dumps(payload, ensure_ascii=False).encode("utf-8"); response.encoding = "utf-8"
+        response.headers = CaseInsensitiveDict({"Content-Type": "application/json; charset=utf-8"})
+        for name, value in headers: response.headers[name] = value
+        response.url = request.url; response.request = request; response.connection = self
+        return response
+
+    def close(self): pass
+
+
+def in_process_session(server, before_handle=None):
+    """返回在调用线程内直接执行 server 路由的 requests.Session (不经网络，server 可用 listen=False 创建)；Cookie 同 mock_session。
+    simulate.py 用它在虚拟时钟上运行引擎"""
+    session = requests.Session(); adapter = _InProcessAdapter(server, before_handle)
+    session.mount("https://", adapter); session.mount("http://", adapter); _set_mock_cookies(session)
+    return session
+
+
+def mock_session(server, session=None):
+    """返回请求全部转发到 server 的 requests.Session (带模拟登录 Cookie)；与 bili_api 的函数直接配合使用"""
+    return _redirected_session(server.base_url, session)
+
+
+class MockSessionFactory:
+    """可 pickle 的会话工厂，供分片模式 (sharded.ShardedEngine 的 session_factory) 的工作进程创建转发到模拟服务器的会话"""
+
+    def __init__(self, base_url): self.base_url = base_url
+    def __call__(self, cookies=None): return _redirected_session(self.base_url)
+
+
+def _redirected_session(base_url, session=None):
+    session = session or create_session(); adapter = _RedirectAdapter(base_url)
+    for prefix in list(session.adapters) + ["https://", "http://"]: session.mount(prefix, adapter)
+    return _set_mock_cookies(session)
+
+
+def _set_mock_cookies(session):
+    for name, value in (("SESSDATA", "mocksessdata"), ("bili_jct", MOCK_CSRF), ("DedeUserID", "1")): session.cookies.set(name, value, domain=".bilibili.com")
+    return session
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="本地模拟 Bilibili 接口")
+    parser.add_argument("--host", default="127.0.0.1"); parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的平均附加延迟秒数")
+    parser.add_argument("--page-size", type=int, default=12, help="feed/space 每页动态数")
+    parser.add_argument("--initial-posts", type=int, default=40, help="每个 UID 初始已有的动态数")
+    parser.add_argument("--post-rate", type=float, default=0.0, help="每个 UID 每秒新发动态数 (泊松过程)")
+    parser.add_argument("--followed-fraction", type=float, default=1.0, help="登录账号已关注的 UID 比例 (按 UID 尾数确定)")
+    parser.add_argument("--inject-412", type=float, default=0.0, help="返回 code=-412 的概率")
+    parser.add_argument("--inject-http412", type=float, default=0.0, help="返回 HTTP 412 的概率")
+    parser.add_argument("--inject-352", type=float, default=0.0, help="feed/space 返回 -352 的概率")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+    server = MockBiliServer(args.host, args.port, latency=args.latency, inject_412=args.inject_412, inject_http412=args.inject_http412, inject_352=args.inject_352,
+                            seed=args.seed, page_size=args.page_size, initial_posts=args.initial_posts, post_rate=args.post_rate, followed_fraction=args.followed_fraction)
+    print(f"模拟服务器已启动: {server.base_url} (Ctrl+C 退出)")
+    try: server.serve_forever()
+    except KeyboardInterrupt: pass
+    finally: server.server_close()
+
+
+if __name__ == "__main__":
+    main()
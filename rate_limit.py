@@ -0,0 +1,153 @@
+# rate_limit.py
+# -*- coding: utf-8 -*-
+# 所有 Bilibili 请求共用的限流层：按接口类别划分的令牌桶 (AIMD 自适应速率) + 账号级熔断器
+
+import threading
+import time
+
+STOP_POLL_INTERVAL = 0.1  # 阻塞等待期间检查 stop_event 的间隔 (秒)，决定停止任务的响应延迟
+
+# 熔断器状态
+CLOSED = "closed"; OPEN = "open"; HALF_OPEN = "half_open"
+
+# 触发熔断的风控信号：API code -412 / -799 与 HTTP 412
+BREAKER_CODES = (-412, -799, "HTTP 412")
+
+# 各接口类别的默认 (每秒令牌数, 桶容量)
+DEFAULT_BUCKETS = {
+    "fetch": (2.0, 4),    # feed/space 动态列表
+    "like": (0.5, 1),     # dynamic_like/thumb
+    "detail": (1.0, 2),   # get_dynamic_detail
+    "nav": (0.5, 2),      # web-interface/nav (Wbi Keys / Cookie 验证)
+    "feed_all": (1.0, 2), # feed/all 关注动态时间线 (汇聚监控)
+    "relation": (0.5, 2), # relation/relations 关注关系批量查询
+}
+
+
+class TokenBucket:
+    """令牌桶。被限流时速率减半 (不低于 min_rate)，之后每次成功按 recover_step 线性恢复到 max_rate。"""
+
+    def __init__(self, rate, capacity, min_rate=None, recover_step=None, clock=time.monotonic):
+        self.max_rate = float(rate); self.rate = float(rate); self.capacity = float(capacity)
+        self.min_rate = min_rate if min_rate is not None else self.max_rate / 16
+        self.recover_step = recover_step if recover_step is not None else self.max_rate / 20
+        self.tokens = float(capacity); self.clock = clock; self._last = clock()
+        self.throttled = 0; self.granted = 0
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self._last) * self.rate); self._last = now
+
+    def try_take(self, now):
+        """取一个令牌，成功返回 0，否则返回还需等待的秒数"""
+        self._refill(now)
+        if self.tokens >= 1: self.tokens -= 1; self.granted += 1; return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def on_success(self):
+        self.rate = min(self.max_rate, self.rate + self.recover_step)
+
+    def on_throttled(self):
+        self.throttled += 1; self.rate = max(self.min_rate, self.rate / 2); self.tokens = min(self.tokens, 0.0)
+
+
+class RateLimiter:
+    """acquire() 在发请求前调用，请求结束后用 record_success() / record_limited() 反馈结果。
+    熔断器打开期间所有类别的请求都会等待；冷却结束后只放行一个探测请求，探测成功才关闭熔断器。"""
+
+    def __init__(self, buckets=None, cooldown=30.0, max_cooldown=600.0, probe_timeout=60.0, clock=time.monotonic):
+        # clock 可以是普通的计时函数，也可以是 clock.py 的时钟对象 (等待与轮询间隔随之使用虚拟时间)
+        self.clock = clock; self._cond = getattr(clock, "condition", threading.Condition)(); self._poll_interval = getattr(clock, "poll_interval", STOP_POLL_INTERVAL)
+        self.buckets = {name: TokenBucket(rate, capacity, clock=clock) for name, (rate, capacity) in (buckets or DEFAULT_BUCKETS).items()}
+        self.base_cooldown = cooldown; self.max_cooldown = max_cooldown; self.probe_timeout = probe_timeout
+        self.breaker_state = CLOSED; self.cooldown = cooldown; self.open_until = 0.0; self.probe_started = None
+        self.trips = 0; self.last_trip_code = None
+
+    def _bucket(self, endpoint):
+        bucket = self.buckets.get(endpoint)
+        if bucket is None: bucket = self.buckets[endpoint] = TokenBucket(1.0, 2, clock=self.clock)
+        return bucket
+
+    def configure(self, endpoint, rate, capacity=None):
+        """调整某类请求的最大速率 (例如按命令行 --rps 放宽抓取速率)"""
+        with self._cond:
+            old = self._bucket(endpoint); capacity = capacity if capacity is not None else old.capacity
+            self.buckets[endpoint] = TokenBucket(rate, capacity, clock=self.clock); self._cond.notify_all()
+
+    def _try_acquire(self, bucket, now):
+        """放行返回 0，否则返回最长需要等待的秒数 (熔断冷却剩余时间、探测超时剩余时间或令牌补充时间)"""
+        if self.breaker_state == OPEN:
+            if now < self.open_until: return self.open_until - now
+            self.breaker_state = HALF_OPEN; self.probe_started = None
+        if self.breaker_state == HALF_OPEN:
+            if self.probe_started is not None and now - self.probe_started < self.probe_timeout: return self.probe_started + self.probe_timeout - now
+            self.probe_started = now; bucket.granted += 1; return 0.0  # 本请求作为探测
+        return bucket.try_take(now)
+
+    def acquire(self, endpoint, stop_event=None):
+        """阻塞直到允许发出一个 endpoint 类请求；stop_event 被设置时返回 False"""
+        bucket = self._bucket(endpoint)
+        with self._cond:
+            while True:
+                if stop_event is not None and stop_event.is_set(): return False
+                wait = self._try_acquire(bucket, self.clock())
+                if wait <= 0: return True
+                self._cond.wait(min(wait, self._poll_interval))  # 探测结束、速率调整时会被提前唤醒
+
+    def record_success(self, endpoint):
+        """报告请求成功，返回熔断器是否因此关闭 (探测成功)"""
+        with self._cond:
+            self._bucket(endpoint).on_success(); closed = False
+            if self.breaker_state == HALF_OPEN:
+                self.breaker_state = CLOSED; self.cooldown = self.base_cooldown; self.probe_started = None; closed = True
+            self._cond.notify_all()
+            return closed
+
+    def record_limited(self, endpoint, code):
+        """报告限流/风控响应。-412 / -799 / HTTP 412 打开熔断器，其余 (如 -509、“频繁”) 只降低该类别的速率。
+        返回本次是否新打开了熔断器。"""
+        with self._cond:
+            self._bucket(endpoint).on_throttled(); opened = False
+            if code in BREAKER_CODES:
+                if self.breaker_state == HALF_OPEN: self.cooldown = min(self.max_cooldown, self.cooldown * 2)  # 探测失败，延长冷却
+                if self.breaker_state != OPEN: self.trips += 1; self.last_trip_code = code; opened = True
+                self.breaker_state = OPEN; self.open_until = self.clock() + self.cooldown; self.probe_started = None
+            self._cond.notify_all()
+            return opened
+
+    def record_failure(self, endpoint):
+        """非限流类失败 (超时/网络错误)：若为探测请求则允许下一个请求重新探测"""
+        with self._cond:
+            if self.breaker_state == HALF_OPEN: self.probe_started = None
+            self._cond.notify_all()
+
+    def state(self):
+        """当前限流状态快照"""
+        with self._cond:
+            now = self.clock()
+            return {
+                "breaker": self.breaker_state, "trips": self.trips, "last_trip_code": self.last_trip_code,
+                "open_remaining": max(0.0, self.open_until - now) if self.breaker_state == OPEN else 0.0, "cooldown": self.cooldown,
+                "buckets": {name: {"rate": round(bucket.rate, 3), "max_rate": bucket.max_rate, "tokens": round(min(bucket.capacity, bucket.tokens + (now - bucket._last) * bucket.rate), 2), "granted": bucket.granted, "throttled": bucket.throttled}
+                            for name, bucket in self.buckets.items()},
+            }
+
+    def summary(self):
+        """单行状态描述，用于日志"""
+        snapshot = self.state()
+        buckets = ", ".join(f"{name} {info['rate']:g}/{info['max_rate']:g}" for name, info in snapshot["buckets"].items() if info["rate"] < info["max_rate"])
+        breaker = snapshot["breaker"] + (f" (剩余 {snapshot['open_remaining']:.0f} 秒)" if snapshot["breaker"] == OPEN else "")
+        return f"熔断器 {breaker}，累计熔断 {snapshot['trips']} 次" + (f"；降速中的类别 (当前/最大 每秒): {buckets}" if buckets else "")
+
+
+# 进程内共享的默认限流器 (抓取、点赞、详情、nav 请求都经过它)
+rate_limiter = RateLimiter()
+
+
+def bind_rate_limiter(session, limiter):
+    """把限流器绑定到会话：经该会话发出的 bili_api 请求都由它放行并接收结果反馈 (分片工作进程绑定 RemoteRateLimiter)"""
+    session.rate_limiter = limiter; return session
+
+
+def session_rate_limiter(session):
+    """会话绑定的限流器，未绑定时为进程内共享的 rate_limiter"""
+    return getattr(session, "rate_limiter", None) or rate_limiter
@@ -0,0 +1,98 @@
+# scheduler.py
+# -*- coding: utf-8 -*-
+# 自适应轮询调度：根据每个 UID 的发帖频率分配各自的检查间隔，用最小堆按下次检查时间出队
+
+import heapq
+import math
+import random
+import time
+from collections import deque
+
+DEFAULT_PRIOR_GAP = 86400.0  # 没有历史数据时假设一天一条
+
+
+def adaptive_interval_bounds(base_interval, min_interval=None, max_interval=None):
+    """未指定时单个 UID 的检查间隔限制在 [max(15, 平均间隔/4), 平均间隔×10] 秒"""
+    return min_interval or max(15.0, base_interval / 4), max_interval or base_interval * 10
+
+
+class AdaptivePollScheduler:
+    """在总请求预算不变 (平均每 base_interval 秒把所有 UID 各查一次；与固定间隔模式比较时应取其一轮的实际时长) 的前提下，
+    按 sqrt(发帖频率) 分配检查次数——这是固定预算下使平均发现延迟最小的分配方式；
+    单个 UID 的间隔被限制在 [min_interval, max_interval] 内。"""
+
+    def __init__(self, base_interval, min_interval, max_interval, jitter=0.2, history=20, clock=time.time, rng=random):
+        self.base_interval = float(base_interval); self.min_interval = float(min_interval); self.max_interval = float(max_interval)
+        self.jitter = jitter; self.history = history; self.clock = clock; self.rng = rng  # rng: 间隔抖动的随机源
+        self._heap = []; self._due = {}; self._seq = 0
+        self._pub_ts = {}; self._rates = {}; self._sqrt_rate_sum = 0.0
+
+    def set_budget(self, base_interval, min_interval, max_interval):
+        """调整请求预算与间隔限制 (例如 UID 增删后一轮时长变化)，从各 UID 的下一次安排起生效"""
+        self.base_interval = float(base_interval); self.min_interval = float(min_interval); self.max_interval = float(max_interval)
+
+    # --- 频率估计 ---
+    def _set_rate(self, uid, rate):
+        old = self._rates.get(uid)
+        if old is not None: self._sqrt_rate_sum -= math.sqrt(old)
+        self._rates[uid] = rate; self._sqrt_rate_sum += math.sqrt(rate)
+
+    def rate(self, uid):
+        """估计的发帖频率 (条/秒)"""
+        return self._rates.get(uid, 1.0 / DEFAULT_PRIOR_GAP)
+
+    def interval(self, uid):
+        """该 UID 当前的检查间隔 (秒)"""
+        if not self._rates: return self.base_interval
+        scale = self.base_interval * self._sqrt_rate_sum / len(self._rates)
+        return min(self.max_interval, max(self.min_interval, scale / math.sqrt(self.rate(uid))))
+
+    def observe(self, uid, pub_ts_list=(), now=None):
+        """记录一次检查看到的发布时间戳并重新安排下次检查"""
+        now = self.clock() if now is None else now
+        window = self._pub_ts.setdefault(uid, deque(maxlen=self.history))
+        known = set(window)
+        for pub_ts in sorted(ts for ts in pub_ts_list if ts and ts not in known): window.append(pub_ts)
+        if window:
+            # 窗口内 n 条动态覆盖的时间跨度一直延伸到现在，长期不发帖时频率会自然下降
+            span = max(now - min(window), self.min_interval)
+            self._set_rate(uid, len(window) / span)
+        elif uid not in self._rates: self._set_rate(uid, 1.0 / DEFAULT_PRIOR_GAP)
+        self._schedule(uid, now + self.interval(uid) * self.rng.uniform(1 - self.jitter, 1 + self.jitter))
+
+    # --- 堆调度 ---
+    def _schedule(self, uid, due_time):
+        self._seq += 1; self._due[uid] = due_time
+        heapq.heappush(self._heap, (due_time, self._seq, uid))
+
+    def add(self, uid, due_time=None):
+        """加入 UID (默认立即到期)"""
+        if uid not in self._rates: self._set_rate(uid, 1.0 / DEFAULT_PRIOR_GAP)
+        self._schedule(uid, self.clock() if due_time is None else due_time)
+
+    def remove(self, uid):
+        self._due.pop(uid, None); self._pub_ts.pop(uid, None)
+        rate = self._rates.pop(uid, None)
+        if rate is not None: self._sqrt_rate_sum -= math.sqrt(rate)
+
+    def _peek(self):
+        while self._heap:
+            due_time, _, uid = self._heap[0]
+            if self._due.get(uid) == due_time: return due_time, uid
+            heapq.heappop(self._heap)  # 已被重新安排或移除的过期条目
+        return None
+
+    def time_until_next(self, now=None):
+        now = self.clock() if now is None else now; head = self._peek()
+        return None if head is None else max(0.0, head[0] - now)
+
+    def pop_due(self, now=None):
+        """取出所有已到期的 UID (按到期时间排序)"""
+        now = self.clock() if now is None else now; due = []
+        while True:
+            head = self._peek()
+            if head is None or head[0] > now: return due
+            heapq.heappop(self._heap); self._due.pop(head[1], None); due.append(head[1])
+
+    def __len__(self):
+        return len(self._rates)
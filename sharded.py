@@ -0,0 +1,222 @@
+# sharded.py
+# -*- coding: utf-8 -*-
+# 分片多进程引擎：目标 UID 按 UID 取模分给多个工作进程，每个进程运行自己的 LikerEngine 扫描循环 (解析与去重不受主进程 GIL 限制)；
+# 所有请求的放行 (全局限流 + 熔断)、点赞与状态库写入都汇总到协调进程，整个账号的请求速率仍由一个 rate_limiter 控制。
+
+import multiprocessing
+import queue
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from bili_api import _log_message, wbi_signer
+from engine import LikerEngine
+from like_queue import LikeWorker
+from http_session import StopCanceller, create_session
+from metrics import STOP_SECONDS, record_detected
+from rate_limit import STOP_POLL_INTERVAL
+
+# 工作进程 -> 协调进程的消息: (类型, ...)
+#   ("acquire", 分片号, endpoint, 申请号)      请求放行一个请求，协调进程在该分片的回复队列放入 (申请号, True/False)
+#   ("limiter", 方法名, endpoint, code)        record_success / record_limited / record_failure
+#   ("state", 方法名, 参数元组)                  StateStore 写操作
+#   ("like", uid, dynamic_id, fresh, pub_ts, detected_at)  待点赞动态 (fresh: 监控阶段的新动态，其检测时效由协调进程记录)
+#   ("log", 日志条目) / ("done", 分片号, 结束信号)
+STATE_WRITE_METHODS = ("set_watermark", "set_uname", "mark_processed", "mark_liked", "set_backfill_checkpoint")
+WORKER_CONTROL_MESSAGES = ("BACKEND_STOPPED_MANUAL", "BACKEND_STOPPED_ERROR")
+
+
+def shard_uids(uids, shards):
+    """按 UID 数值取模分片 (同一 UID 在重启后仍落在同一分片)，返回非空分片列表"""
+    buckets = [[] for _ in range(max(1, shards))]
+    for uid in uids: buckets[(int(uid) if str(uid).isdigit() else hash(uid)) % len(buckets)].append(uid)
+    return [bucket for bucket in buckets if bucket]
+
+
+# --- 工作进程端 ---
+class RemoteRateLimiter:
+    """工作进程中绑定到会话的限流器：acquire() 向协调进程申请放行，结果反馈转发给协调进程的限流器。
+    每次申请带递增的申请号，因停止而放弃等待的申请之后才到的回复按申请号丢弃，不会被下一次申请误读。"""
+
+    def __init__(self, shard_index, to_coordinator, replies):
+        self.shard_index = shard_index; self.to_coordinator = to_coordinator; self.replies = replies; self._lock = threading.Lock(); self._next_id = 0
+
+    def acquire(self, endpoint, stop_event=None):
+        with self._lock:  # 每个分片同时只有一个申请在等待回复
+            self._next_id += 1; request_id = self._next_id
+            self.to_coordinator.put(("acquire", self.shard_index, endpoint, request_id))
+            while True:
+                try: reply_id, granted = self.replies.get(timeout=STOP_POLL_INTERVAL)
+                except queue.Empty:
+                    if stop_event is not None and stop_event.is_set(): return False
+                    continue
+                if reply_id == request_id: return granted
+
+    def record_success(self, endpoint): self.to_coordinator.put(("limiter", "record_success", endpoint, None)); return False
+    def record_limited(self, endpoint, code): self.to_coordinator.put(("limiter", "record_limited", endpoint, code)); return False
+    def record_failure(self, endpoint): self.to_coordinator.put(("limiter", "record_failure", endpoint, None))
+    def configure(self, endpoint, rate, capacity=None): pass  # 速率由协调进程决定
+    def summary(self): return ""
+
+
+class _ForwardingLog:
+    """主日志加上分片号后转发，各 UID 的日志原样转发"""
+    def __init__(self, to_coordinator, shard_index): self.to_coordinator = to_coordinator; self.prefix = f"[分片{shard_index}]"
+
+    def put(self, entry, block=True, timeout=None):
+        if isinstance(entry, dict) and entry.get('target') == 'main' and entry.get('message') not in WORKER_CONTROL_MESSAGES: entry = dict(entry, message=f"{self.prefix}{entry.get('message', '')}")
+        self.to_coordinator.put(("log", entry))
+
+
+class _ForwardingStateStore:
+    """工作进程中的 StateStore 替身：读取返回协调进程预先加载的分片数据，写入转发给协调进程"""
+
+    def __init__(self, to_coordinator, restored):
+        self.to_coordinator = to_coordinator; self.restored = restored
+
+    def load_watermarks(self): return dict(self.restored["watermarks"])
+    def load_unames(self): return dict(self.restored["unames"])
+    def load_recent_processed(self, uids, limit): return {uid: ids[:limit] for uid, ids in self.restored["recent_processed"].items()}
+    def flush(self): pass
+    def keep_processed(self, window): pass  # 由协调进程的状态库按同一 dedup_window 清理
+
+    def __getattr__(self, name):
+        if name not in STATE_WRITE_METHODS: raise AttributeError(name)
+        return lambda *args: self.to_coordinator.put(("state", name, args))
+
+
+def default_session_factory(cookies):
+    session = create_session(); requests.utils.add_dict_to_cookiejar(session.cookies, cookies); return session
+
+
+def _shard_worker_main(shard_index, uids, cookies, csrf_token, restored, options, session_factory, to_coordinator, replies, stop_event):
+    """工作进程入口：以 RemoteRateLimiter 运行 LikerEngine.run，点赞与状态写入都转发给协调进程"""
+    if options.get("wbi_keys"): wbi_signer.update(*options["wbi_keys"])  # 沿用协调进程的 Keys，省去每个进程的 nav 请求
+    stop_message = "BACKEND_STOPPED_ERROR"
+    try:
+        log_sink = _ForwardingLog(to_coordinator, shard_index)
+        engine = LikerEngine(session_factory(cookies), csrf_token, log_sink, stop_event, state_store=_ForwardingStateStore(to_coordinator, restored), rate_limiter=RemoteRateLimiter(shard_index, to_coordinator, replies),
+                             fetch_concurrency=options.get("fetch_concurrency", 1), fetch_rps=options.get("fetch_rps", 2.0), dedup_window=options.get("dedup_window", 256),
+                             adaptive_poll=options.get("adaptive_poll", False), poll_min_interval=options.get("poll_min_interval"), poll_max_interval=options.get("poll_max_interval"),
+                             like_sink=lambda dynamic_id, uid, fresh, pub_ts, detected_at: to_coordinator.put(("like", uid, dynamic_id, fresh, pub_ts, detected_at)))
+        # run() 结束时会放入 BACKEND_STOPPED_*，由 _ForwardingLog 转给协调进程
+        engine.run(uids, options["max_initial_likes"], options["polling_interval"]); stop_message = None
+    except Exception: to_coordinator.put(("log", {'target': 'main', 'message': f"分片 {shard_index} 异常退出:\n{traceback.format_exc()}"}))
+    finally: to_coordinator.put(("done", shard_index, stop_message))
+
+
+# --- 协调进程端 ---
+class ShardedEngine:
+    """与 LikerEngine 相同的 run() 接口。workers 个工作进程分担扫描；协调进程负责:
+    放行请求 (共用协调进程会话的限流器，熔断时所有进程一起暂停)、按原有节奏逐条点赞、写入状态库、转发日志与昵称。
+    分片模式不支持回溯 (backfill)、延迟确认 (deferred) 与汇聚监控 (feed)；工作进程中的请求指标不汇总到协调进程。"""
+
+    def __init__(self, session, csrf_token, log_queue=None, stop_event=None, on_uname=None, workers=2, fetch_concurrency=1, fetch_rps=2.0, state_store=None, dedup_window=256,
+                 adaptive_poll=False, poll_min_interval=None, poll_max_interval=None, session_factory=default_session_factory, mp_context=None, rate_limiter=None):
+        self.session = session; self.csrf_token = csrf_token; self.log_queue = log_queue; self.on_uname = on_uname
+        self.stop_event = stop_event if stop_event is not None else threading.Event(); self.workers = max(1, workers)
+        self.state_store = state_store; self.session_factory = session_factory
+        self.options = {"fetch_concurrency": fetch_concurrency, "fetch_rps": fetch_rps, "dedup_window": dedup_window,
+                        "adaptive_poll": adaptive_poll, "poll_min_interval": poll_min_interval, "poll_max_interval": poll_max_interval}
+        self.ctx = mp_context or multiprocessing.get_context("spawn")
+        # 点赞、确认、状态写入与持久化点赞队列沿用 LikerEngine 的实现 (不启动扫描)；它绑定的限流器同时放行所有分片的请求
+        self.liker = LikerEngine(session, csrf_token, log_queue, self.stop_event, state_store=state_store, dedup_window=dedup_window, rate_limiter=rate_limiter); self.rate_limiter = self.liker.rate_limiter
+        # 所有分片的抓取请求共用一个令牌桶，总速率即 fetch_rps (与单进程并发模式的含义相同)
+        if fetch_rps and fetch_rps > 0: self.rate_limiter.configure("fetch", fetch_rps, capacity=max(1, int(fetch_concurrency)))
+        self.like_queue = self.liker.like_queue; self.requests_granted = 0
+
+    def _restore_shard(self, uids, stored_watermarks, stored_unames):
+        recent = self.state_store.load_recent_processed(uids, self.options["dedup_window"]) if self.state_store else {}
+        return {"watermarks": {uid: stored_watermarks[uid] for uid in uids if uid in stored_watermarks},
+                "unames": {uid: stored_unames[uid] for uid in uids if uid in stored_unames},
+                "recent_processed": {uid: recent[uid] for uid in uids if uid in recent}}
+
+    def _grant(self, shard_index, endpoint, request_id, replies, stop_flag):
+        granted = self.rate_limiter.acquire(endpoint, stop_flag)
+        if granted: self.requests_granted += 1
+        replies[shard_index].put((request_id, granted))
+
+    def _apply_limiter(self, method, endpoint, code):
+        if method == "record_success":
+            if self.rate_limiter.record_success(endpoint): _log_message(self.log_queue, "限流: 探测请求成功，熔断器已关闭，恢复正常请求。", target_uid='main')
+        elif method == "record_limited":
+            if self.rate_limiter.record_limited(endpoint, code): _log_message(self.log_queue, f"限流: 收到风控响应 ({endpoint}, {code})，所有分片暂停 {self.rate_limiter.cooldown:.0f} 秒后探测恢复。", target_uid='main')
+        else: self.rate_limiter.record_failure(endpoint)
+
+    def _apply_state(self, method, args):
+        if method == "set_uname":
+            self.liker.uid_to_uname[args[0]] = args[1]
+            if self.on_uname:
+                try: self.on_uname(*args)
+                except Exception as e: print(f"on_uname 回调出错: {e}")
+        if self.state_store: getattr(self.state_store, method)(*args)
+
+    def run(self, target_uids_list, max_initial_likes, polling_interval_seconds):
+        """阻塞运行直到 stop_event 被设置或工作进程全部退出；结束时向 log_queue 发送 BACKEND_STOPPED_*"""
+        log_queue = self.log_queue; stop_event = self.stop_event; error_occurred = False
+        shards = shard_uids(target_uids_list, self.workers)
+        to_coordinator = self.ctx.Queue(); replies = [self.ctx.Queue() for _ in shards]; worker_stop = self.ctx.Event()
+        processes = []; running = set(range(len(shards)))
+        gate = ThreadPoolExecutor(max_workers=len(shards) * 2, thread_name_prefix="shard-gate")
+        # 初始点赞上限在这里统一计算 (各分片的积压都进入同一个队列)
+        like_worker = LikeWorker(self.like_queue, self.liker._like, log_queue, stop_event, self.liker.like_delay, initial_budget=max_initial_likes, uname_of=lambda uid: self.liker.uid_to_uname.get(uid, f"UID {uid}"))
+        canceller = StopCanceller(self.session, stop_event).start()  # 中断主进程的在途点赞请求；工作进程各自的引擎同样会中断自己的请求
+        try:
+            stored_watermarks = self.state_store.load_watermarks() if self.state_store else {}
+            stored_unames = self.state_store.load_unames() if self.state_store else {}
+            for uid, uname in stored_unames.items(): self.liker.uid_to_uname[uid] = uname
+            keys = wbi_signer.keys(self.session, log_queue, stop_event)
+            cookies = self.session.cookies.get_dict()
+            _log_message(log_queue, f"--- 分片模式: {len(target_uids_list)} 个 UID 分给 {len(shards)} 个工作进程 (每个 {min(map(len, shards))} ~ {max(map(len, shards))} 个) ---", target_uid='main')
+            for shard_index, uids in enumerate(shards):
+                options = dict(self.options, max_initial_likes=max_initial_likes, polling_interval=polling_interval_seconds, wbi_keys=keys[:2] if keys else None)
+                process = self.ctx.Process(target=_shard_worker_main, name=f"bili-shard-{shard_index}", daemon=True,
+                                           args=(shard_index, uids, cookies, self.csrf_token, self._restore_shard(uids, stored_watermarks, stored_unames), options, self.session_factory, to_coordinator, replies[shard_index], worker_stop))
+                process.start(); processes.append(process)
+            like_worker.start()
+            while running:
+                if stop_event.is_set(): worker_stop.set()
+                try: message = to_coordinator.get(timeout=STOP_POLL_INTERVAL)
+                except queue.Empty:
+                    for shard_index in list(running):
+                        if not processes[shard_index].is_alive(): running.discard(shard_index); error_occurred = True; _log_message(log_queue, f"分片 {shard_index} 意外退出 (exitcode={processes[shard_index].exitcode})。", target_uid='main')
+                    continue
+                kind = message[0]
+                if kind == "acquire": gate.submit(self._grant, message[1], message[2], message[3], replies, worker_stop)
+                elif kind == "limiter": self._apply_limiter(*message[1:])
+                elif kind == "state": self._apply_state(*message[1:])
+                elif kind == "like":
+                    _, uid, dynamic_id, fresh, pub_ts, detected_at = message
+                    if fresh: record_detected(uid, pub_ts, detected_at)
+                    self.like_queue.put(dynamic_id, uid, fresh, pub_ts)
+                elif kind == "log":
+                    entry = message[1]
+                    if isinstance(entry, dict) and entry.get('message') in WORKER_CONTROL_MESSAGES:  # 分片的结束信号不转发，出错时整体记为出错
+                        if entry['message'] == "BACKEND_STOPPED_ERROR" and not stop_event.is_set(): error_occurred = True
+                        continue
+                    if log_queue: log_queue.put(entry)
+                    else: print(entry.get('message') if isinstance(entry, dict) else entry)
+                elif kind == "done":
+                    running.discard(message[1])
+                    if message[2] == "BACKEND_STOPPED_ERROR" and not stop_event.is_set(): error_occurred = True
+                    if running and not stop_event.is_set(): _log_message(log_queue, f"分片 {message[1]} 已结束，剩余 {len(running)} 个。", target_uid='main')
+        except Exception as e: _log_message(log_queue, f"分片协调进程发生意外错误: {e}", target_uid='main'); _log_message(log_queue, traceback.format_exc(), target_uid='main'); error_occurred = True
+        finally:
+            worker_stop.set(); gate.shutdown(wait=False)
+            for process in processes:
+                process.join(timeout=5)
+                if process.is_alive(): process.terminate()
+            like_worker.stop(); like_worker.join(timeout=5)
+            if self.state_store:
+                try: self.state_store.flush()
+                except Exception as e: _log_message(log_queue, f"写入状态库失败: {e}", target_uid='main')
+            self.liker._log_freshness(final=True); canceller.close()
+            if canceller.stopped_at is not None:
+                stop_duration = time.monotonic() - canceller.stopped_at; STOP_SECONDS.observe(stop_duration)
+                _log_message(log_queue, f"已停止: 耗时 {stop_duration * 1000:.0f} 毫秒 (含等待 {len(processes)} 个工作进程退出)，状态已保存。", target_uid='main')
+            _log_message(log_queue, f"--- 分片模式结束: 放行请求 {self.requests_granted} 次，成功点赞 {like_worker.liked_fresh + like_worker.liked_backlog} 条，未处理的待点赞 {len(self.like_queue)} 条 ---", target_uid='main')
+            stop_msg = "BACKEND_STOPPED_ERROR" if error_occurred and not stop_event.is_set() else "BACKEND_STOPPED_MANUAL"
+            if log_queue: log_queue.put({'target':'main', 'message': stop_msg})
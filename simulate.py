@@ -0,0 +1,253 @@
+# simulate.py
+# -*- coding: utf-8 -*-
+# 虚拟时钟模拟：在合成 (或导入的) 发帖轨迹上运行真实的 LikerEngine.run，几十秒内跑完数周的模拟时间，
+# 输出请求数、检测时效、点赞时效与完成的点赞数，用于离线比较监控间隔、点赞节奏、UID 间隔与自适应轮询等参数。
+# 引擎注入 clock.VirtualClock 与 random.Random(seed)，请求经 mock_server.in_process_session 在进程内应答 (不发出任何网络请求)，
+# 服务端模型在应答前加入延迟与风控 (-412 / -509)。并发抓取 (--concurrency) 使用 asyncio 的真实时钟，不在模拟范围内。
+# 用法: python simulate.py --uids 50 --days 7 --interval 30 60 120 [--adaptive] [--like-delay 4 8] [--trace 轨迹.csv] [--output 结果.json] [--compare 上次.json]
+
+import argparse
+import csv
+import json
+import math
+import random
+import sys
+import threading
+import time
+from collections import deque
+
+from bili_api import wbi_signer
+from clock import VirtualClock
+from engine import LIKE_DELAY, MONITOR_UID_DELAY, POLL_JITTER, LikerEngine
+from mock_server import MOCK_CSRF, MOCK_IMG_KEY, MOCK_SUB_KEY, MockBiliServer, MockBiliState, in_process_session
+from rate_limit import RateLimiter
+
+DAY = 86400.0
+HIGHER_IS_BETTER = {"liked", "liked_within_slo"}
+# 请求路径 -> 风控模型中的请求类别 (与 rate_limit 的令牌桶类别一致)
+ENDPOINTS = {"/x/polymer/web-dynamic/v1/feed/space": "fetch", "/dynamic_like/v1/dynamic_like/thumb": "like",
+             "/dynamic_svr/v1/dynamic_svr/get_dynamic_detail": "detail", "/x/web-interface/nav": "nav"}
+
+
+# --- 发帖轨迹 ---
+def synthetic_trace(uid_count, start, end, posts_per_day=2.0, spread=1.0, diurnal=0.6, seed=1):
+    """为 uid_count 个 UP 主生成 [start, end) 内的发帖时间 {uid: [pub_ts, ...]}。
+    各 UP 主的日均发帖数服从均值为 posts_per_day 的对数正态分布 (spread 为对数标准差)，
+    一天内的强度按 1 + diurnal·cos(2π(小时 - 20)/24) 变化 (晚上 8 点最活跃)"""
+    rng = random.Random(seed); trace = {}
+    for index in range(uid_count):
+        uid = str(100000 + index); rate = posts_per_day * math.exp(rng.gauss(-spread * spread / 2, spread)) / DAY
+        peak = rate * (1 + diurnal); pub_ts = start; posts = []
+        while True:
+            pub_ts += rng.expovariate(peak)
+            if pub_ts >= end: break
+            hour = (pub_ts % DAY) / 3600
+            if rng.random() * (1 + diurnal) < 1 + diurnal * math.cos(2 * math.pi * (hour - 20) / 24): posts.append(pub_ts)
+        trace[uid] = posts
+    return trace
+
+
+def load_trace(path):
+    """读取 CSV 轨迹 (每行 uid,pub_ts，pub_ts 为 Unix 秒；# 开头为注释)"""
+    trace = {}
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        for row in csv.reader(f):
+            if not row or row[0].lstrip().startswith("#"): continue
+            try: trace.setdefault(row[0].strip(), []).append(float(row[1]))
+            except (IndexError, ValueError): continue
+    for posts in trace.values(): posts.sort()
+    return trace
+
+
+# --- 模拟服务器 ---
+class TraceState(MockBiliState):
+    """按轨迹发布动态的模拟服务器数据：虚拟时钟到达 pub_ts 时动态出现在该 UID 的时间线上。
+    记录每条动态首次出现在动态列表应答中的时间 (检测) 与点赞成功的时间，结果统计以服务端看到的为准"""
+
+    def __init__(self, trace, clock, page_size=12, seed=None):
+        super().__init__(initial_posts=0, page_size=page_size, pinned=False, seed=seed, clock=clock)
+        self.trace = trace; self._published = {}; self.first_seen = {}; self.liked_at = {}
+
+    def _advance(self, uid):
+        now = self.clock(); posts = self.trace.get(uid, ()); index = self._published.get(uid, 0); self.timelines.setdefault(uid, [])
+        while index < len(posts) and posts[index] <= now: self._new_post(uid, posts[index]); index += 1
+        self._published[uid] = index
+
+    def page(self, uid, offset):
+        result = super().page(uid, offset); now = self.clock()
+        for post, _ in result[0]: self.first_seen.setdefault(post["id"], now)
+        return result
+
+    def like(self, dynamic_id):
+        code = super().like(dynamic_id)
+        if code == 0: self.liked_at[dynamic_id] = self.clock()
+        return code
+
+
+class ServerModel:
+    """服务端延迟与风控模型 (in_process_session 的 before_handle)：每个请求先等待 latency 上下浮动 50% 的虚拟时间；
+    某类请求在 window 秒内超过 limits[endpoint] 次时返回 -412 (触发熔断)，另按概率随机注入 -412 / -509"""
+
+    def __init__(self, clock, rng, latency=0.3, limits=None, window=60.0, inject_412=0.0, inject_509=0.0):
+        self.clock = clock; self.rng = rng; self.latency = latency; self.limits = limits or {}; self.window = window
+        self.inject_412 = inject_412; self.inject_509 = inject_509
+        self._recent = {}; self.requests = {}
+
+    def __call__(self, method, path, query):
+        endpoint = ENDPOINTS.get(path, path)
+        if self.latency: self.clock.wait(None, self.latency * self.rng.uniform(0.5, 1.5))
+        now = self.clock.time(); recent = self._recent.setdefault(endpoint, deque())
+        while recent and recent[0] <= now - self.window: recent.popleft()
+        recent.append(now); limit = self.limits.get(endpoint)
+        if limit and len(recent) > limit: code = -412
+        elif self.rng.random() < self.inject_412: code = -412
+        elif self.rng.random() < self.inject_509: code = -509
+        else: code = 0
+        counts = self.requests.setdefault(endpoint, {"total": 0, "limited": 0})
+        counts["total"] += 1; counts["limited"] += code != 0
+        if code: return 200, {"code": code, "message": "请求被拦截" if code == -412 else "请求过于频繁，请稍后再试"}
+        return None
+
+
+class _DiscardLog:
+    """丢弃引擎日志"""
+    def put(self, entry, block=True, timeout=None): pass
+
+
+def _percentiles(values):
+    if not values: return None
+    ordered = sorted(values); last = len(ordered) - 1
+    pick = lambda q: round(ordered[min(last, int(math.ceil(q * len(ordered))) - 1)], 1)
+    return {"count": len(ordered), "mean": round(sum(ordered) / len(ordered), 1), "p50": pick(0.5), "p95": pick(0.95), "p99": pick(0.99), "max": round(ordered[-1], 1)}
+
+
+class Simulation:
+    """在虚拟时钟上运行真实的 LikerEngine.run (首页扫描、监控轮次与点赞线程)，请求在进程内由模拟服务器应答。
+    引擎的计时、等待与随机间隔都来自注入的 VirtualClock 与 random.Random(seed)，同一种子的结果可复现；
+    到达 end 时时钟设置停止信号，引擎按正常的停止流程退出。初始点赞数为 0 (首页上已有的动态不点赞)"""
+
+    def __init__(self, trace, start, end, interval=60.0, adaptive=False, min_interval=None, max_interval=None,
+                 uid_delay=MONITOR_UID_DELAY, poll_jitter=POLL_JITTER, like_delay=LIKE_DELAY, verify="detail", page_size=12, slo=300.0,
+                 latency=0.3, limits=None, inject_412=0.0, inject_509=0.0, breaker_cooldown=30.0, seed=1):
+        self.start = start; self.end = end; self.interval = interval; self.page_size = page_size; self.slo = slo
+        self.trace = trace; self.uids = sorted(trace); self.rng = random.Random(seed)
+        self.stop_event = threading.Event(); self.clock = VirtualClock(start, end, self.stop_event)
+        self.state = TraceState(trace, self.clock, page_size, seed); self.server = MockBiliServer(listen=False, state=self.state, seed=seed)
+        self.model = ServerModel(self.clock, random.Random(self.rng.getrandbits(64)), latency, limits, inject_412=inject_412, inject_509=inject_509)
+        self.limiter = RateLimiter(cooldown=breaker_cooldown, clock=self.clock)
+        self.engine = LikerEngine(in_process_session(self.server, self.model), MOCK_CSRF, _DiscardLog(), self.stop_event, verify_mode=verify,
+                                  adaptive_poll=adaptive, poll_min_interval=min_interval, poll_max_interval=max_interval, rate_limiter=self.limiter, clock=self.clock, rng=self.rng)
+        self.engine.like_delay = tuple(like_delay); self.engine.poll_jitter = tuple(poll_jitter); self.engine.monitor_uid_delay = tuple(uid_delay)
+
+    def run(self):
+        wall_start = time.perf_counter(); wbi_signer.update(MOCK_IMG_KEY, MOCK_SUB_KEY)  # 模拟服务器的 Keys，省去 nav 请求
+        try: self.clock.start_thread(self.engine.run, "simulated-engine", args=(self.uids, 0, self.interval)).join()
+        finally: self.server.server_close()
+        return self._results(time.perf_counter() - wall_start)
+
+    def _results(self, wall_s):
+        """按服务端记录统计：检测 = 动态首次出现在应答中，漏检 = 始终未出现且已被挤出首页，点赞 = 点赞请求成功"""
+        detect_latency = []; time_to_like = []; published = missed = liked_within_slo = 0
+        for uid in self.uids:
+            posts = [pub_ts for pub_ts in self.trace[uid] if pub_ts <= self.end]; timeline = self.state.timelines.get(uid, [])
+            for index, pub_ts in enumerate(posts):
+                if pub_ts <= self.start: continue
+                published += 1; dynamic_id = timeline[index]["id"] if index < len(timeline) else None
+                seen_at = self.state.first_seen.get(dynamic_id)
+                if seen_at is None: missed += len(posts) - 1 - index >= self.page_size; continue
+                detect_latency.append(seen_at - pub_ts); liked_at = self.state.liked_at.get(dynamic_id)
+                if liked_at is not None:
+                    time_to_like.append(liked_at - pub_ts); liked_within_slo += liked_at - pub_ts <= self.slo
+        requests = {endpoint: dict(counts) for endpoint, counts in sorted(self.model.requests.items())}
+        total_requests = sum(counts["total"] for counts in requests.values()); hours = (self.end - self.start) / 3600
+        fetch = requests.get("fetch", {"total": 0, "limited": 0}); like_worker = self.engine.like_worker
+        return {
+            "simulated_days": round((self.end - self.start) / DAY, 2), "wall_s": round(wall_s, 2), "uids": len(self.uids),
+            "checks": fetch["total"] - fetch["limited"], "requests": requests, "requests_per_hour": round(total_requests / hours, 1) if hours else None,
+            "breaker_trips": self.limiter.trips, "published": published, "detected": len(detect_latency), "missed": missed,
+            "liked": len(time_to_like), "like_failed": like_worker.failed if like_worker else 0, "queue_remaining": len(self.engine.like_queue),
+            "liked_within_slo": round(liked_within_slo / published, 4) if published else None,
+            "detect_latency_s": _percentiles(detect_latency), "time_to_like_s": _percentiles(time_to_like),
+        }
+
+
+def _print_table(rows):
+    header = f"{'配置':<28}{'请求/时':>9}{'熔断':>6}{'发布':>7}{'漏检':>6}{'点赞':>7}{'SLO内':>8}{'检测p50':>9}{'检测p95':>9}{'点赞p50':>9}{'点赞p95':>9}{'点赞p99':>9}"
+    print(header)
+    for label, result in rows:
+        detect = result["detect_latency_s"] or {}; like = result["time_to_like_s"] or {}
+        slo = result["liked_within_slo"]
+        print(f"{label:<28}{result['requests_per_hour'] or 0:>9.0f}{result['breaker_trips']:>6}{result['published']:>7}{result['missed']:>6}{result['liked']:>7}{(f'{slo:.1%}' if slo is not None else '-'):>8}"
+              f"{detect.get('p50', '-'):>9}{detect.get('p95', '-'):>9}{like.get('p50', '-'):>9}{like.get('p95', '-'):>9}{like.get('p99', '-'):>9}")
+
+
+def compare(current, previous):
+    """打印与上一次结果的对比 (单一配置)"""
+    print("\n与上次结果对比:")
+    pairs = [("requests_per_hour", current.get("requests_per_hour"), previous.get("requests_per_hour")), ("breaker_trips", current.get("breaker_trips"), previous.get("breaker_trips")),
+             ("missed", current.get("missed"), previous.get("missed")), ("liked", current.get("liked"), previous.get("liked")), ("liked_within_slo", current.get("liked_within_slo"), previous.get("liked_within_slo"))]
+    for section in ("detect_latency_s", "time_to_like_s"):
+        for q in ("p50", "p95", "p99"): pairs.append((f"{section}.{q}", (current.get(section) or {}).get(q), (previous.get(section) or {}).get(q)))
+    for key, new, old in pairs:
+        if not old or new is None: continue
+        change = (new - old) / old * 100; better = change > 0 if key in HIGHER_IS_BETTER else change < 0
+        print(f"  {key:<24} {old:>10} -> {new:<10} ({change:+.1f}%{'，变好' if better else '，变差' if change else ''})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="在虚拟时钟上模拟监控与点赞调度，比较不同参数下的请求量与时效")
+    parser.add_argument("--uids", type=int, default=50, help="合成轨迹的 UP 主数量")
+    parser.add_argument("--days", type=float, default=7.0, help="模拟天数")
+    parser.add_argument("--warmup-days", type=float, default=3.0, help="模拟开始前的历史天数 (自适应轮询据此估计发帖频率)")
+    parser.add_argument("--posts-per-day", type=float, default=2.0, help="合成轨迹中每个 UP 主的平均日发帖数")
+    parser.add_argument("--spread", type=float, default=1.0, help="各 UP 主发帖频率的对数标准差 (0 为全部相同)")
+    parser.add_argument("--diurnal", type=float, default=0.6, help="发帖强度的昼夜波动幅度 (0~1)")
+    parser.add_argument("--trace", help="CSV 发帖轨迹 (uid,pub_ts)，代替合成轨迹；前 --warmup-days 天作为历史")
+    parser.add_argument("--interval", type=float, nargs="+", default=[60.0], help="监控间隔秒数，给出多个值时逐一模拟并列表对比")
+    parser.add_argument("--adaptive", action="store_true", help="自适应轮询 (同 python -m engine --adaptive)")
+    parser.add_argument("--min-interval", type=float, default=None); parser.add_argument("--max-interval", type=float, default=None)
+    parser.add_argument("--uid-delay", type=float, nargs=2, default=list(MONITOR_UID_DELAY), metavar=("MIN", "MAX"), help="相邻 UID 之间的等待秒数")
+    parser.add_argument("--poll-jitter", type=float, nargs=2, default=list(POLL_JITTER), metavar=("MIN", "MAX"), help="固定间隔模式每轮等待的随机系数")
+    parser.add_argument("--like-delay", type=float, nargs=2, default=list(LIKE_DELAY), metavar=("MIN", "MAX"), help="相邻两次点赞之间的等待秒数")
+    parser.add_argument("--verify", choices=("detail", "deferred"), default="detail", help="点赞结果确认方式 (同 python -m engine --verify)")
+    parser.add_argument("--page-size", type=int, default=12, help="每次检查可见的首页动态数 (两次检查之间超出的部分计为漏检)")
+    parser.add_argument("--slo", type=float, default=300.0, help="目标时效秒数：统计发布后该时间内完成点赞的比例")
+    parser.add_argument("--latency", type=float, default=0.3, help="模拟请求的平均延迟秒数")
+    parser.add_argument("--fetch-limit", type=int, default=None, help="服务端风控：每分钟动态列表请求超过该数时返回 -412")
+    parser.add_argument("--like-limit", type=int, default=None, help="服务端风控：每分钟点赞请求超过该数时返回 -412")
+    parser.add_argument("--inject-412", type=float, default=0.0, help="随机注入 -412 的概率"); parser.add_argument("--inject-509", type=float, default=0.0, help="随机注入 -509 的概率")
+    parser.add_argument("--breaker-cooldown", type=float, default=30.0, help="熔断冷却秒数 (同限流器默认值)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="结果 JSON 写入路径"); parser.add_argument("--compare", help="上一次结果 JSON，打印对比 (只比较第一个配置)")
+    args = parser.parse_args(argv)
+
+    if args.trace:
+        trace = load_trace(args.trace)
+        if not trace: print("轨迹文件中没有有效的记录"); return 1
+        first = min(posts[0] for posts in trace.values() if posts); last = max(posts[-1] for posts in trace.values() if posts)
+        start = first + args.warmup_days * DAY; end = min(last, start + args.days * DAY)
+        if end <= start: print("轨迹时间跨度不足 --warmup-days"); return 1
+    else:
+        start = args.warmup_days * DAY; end = start + args.days * DAY
+        trace = synthetic_trace(args.uids, 0.0, end, args.posts_per_day, args.spread, args.diurnal, args.seed)
+    limits = {endpoint: limit for endpoint, limit in (("fetch", args.fetch_limit), ("like", args.like_limit)) if limit}
+    rows = []
+    for interval in args.interval:
+        simulation = Simulation(trace, start, end, interval=interval, adaptive=args.adaptive, min_interval=args.min_interval, max_interval=args.max_interval,
+                                uid_delay=tuple(args.uid_delay), poll_jitter=tuple(args.poll_jitter), like_delay=tuple(args.like_delay),
+                                verify=args.verify, page_size=args.page_size, slo=args.slo, latency=args.latency, limits=limits, inject_412=args.inject_412, inject_509=args.inject_509,
+                                breaker_cooldown=args.breaker_cooldown, seed=args.seed)
+        result = simulation.run(); result["config"] = dict(vars(args), interval=interval); del result["config"]["output"], result["config"]["compare"]
+        rows.append((f"{'自适应' if args.adaptive else '间隔'} {interval:g} 秒", result))
+    print(f"模拟 {rows[0][1]['simulated_days']:g} 天，{rows[0][1]['uids']} 个 UID ({'轨迹 ' + args.trace if args.trace else '合成轨迹'})，SLO {args.slo:g} 秒，耗时 {sum(result['wall_s'] for _, result in rows):.1f} 秒:")
+    _print_table(rows)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f: previous = json.load(f)
+        compare(rows[0][1], previous[0] if isinstance(previous, list) else previous)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f: json.dump([result for _, result in rows] if len(rows) > 1 else rows[0][1], f, ensure_ascii=False, indent=1)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
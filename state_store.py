@@ -0,0 +1,153 @@
+# state_store.py
+# -*- coding: utf-8 -*-
+# SQLite 持久化状态：每个 UID 的最新动态水位线、已处理/已点赞动态、UP 主昵称缓存、未完成的点赞队列
+# 已处理/已点赞与点赞队列都属于某个登录账号，每个账号使用单独的状态库文件 (account_state_path)
+
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_STATE_DB = "bili_state.db"
+
+
+def account_state_path(path, account_id):
+    """按登录账号 (Cookie 中的 DedeUserID) 区分状态库：bili_state.db -> bili_state_<账号>.db；账号未知时返回 None (不使用状态库)"""
+    account_id = str(account_id or "").strip()
+    if not account_id.isdigit(): return None
+    root, ext = os.path.splitext(path)
+    return f"{root}_{account_id}{ext or '.db'}"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS watermarks (uid TEXT PRIMARY KEY, latest_id TEXT NOT NULL, updated_at REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS processed (dynamic_id TEXT PRIMARY KEY, uid TEXT NOT NULL, liked INTEGER NOT NULL DEFAULT 0, updated_at REAL NOT NULL);
+CREATE INDEX IF NOT EXISTS idx_processed_uid ON processed (uid);
+CREATE TABLE IF NOT EXISTS unames (uid TEXT PRIMARY KEY, uname TEXT NOT NULL, updated_at REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS backfill (uid TEXT PRIMARY KEY, next_offset TEXT NOT NULL, done INTEGER NOT NULL DEFAULT 0, updated_at REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS like_queue (dynamic_id TEXT PRIMARY KEY, uid TEXT NOT NULL, priority INTEGER NOT NULL, enqueued_at REAL NOT NULL, pub_ts INTEGER NOT NULL DEFAULT 0);
+"""
+
+
+class StateStore:
+    """写操作先进入内存缓冲，攒够 flush_every 条或距上次写入超过 flush_interval 秒时在一个事务中批量落盘。
+    keep_processed(window) 之后，落盘时 processed 表中每个 UID 只保留数值最大的 window 条 (更早的动态已在水位线之下，去重不再需要)。"""
+
+    def __init__(self, path=DEFAULT_STATE_DB, flush_every=200, flush_interval=5.0):
+        self.path = path; self.flush_every = flush_every; self.flush_interval = flush_interval
+        self._lock = threading.Lock(); self._last_flush = time.monotonic()
+        self._pending_watermarks = {}; self._pending_processed = {}; self._pending_unames = {}; self._pending_backfill = {}
+        self._pending_like_queue = {}  # dynamic_id -> (uid, priority, enqueued_at, pub_ts)，None 表示出队
+        self.processed_window = None  # processed 表每个 UID 保留的条数，None 为不清理
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL"); self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        # 旧版本创建的 like_queue 没有 pub_ts 列 (动态发布时间，用于统计点赞时效)
+        if "pub_ts" not in {row[1] for row in self._conn.execute("PRAGMA table_info(like_queue)")}: self._conn.execute("ALTER TABLE like_queue ADD COLUMN pub_ts INTEGER NOT NULL DEFAULT 0")
+        self._conn.commit()
+
+    # --- 读取 (启动时调用一次；包含尚未落盘的缓冲，与已落盘的数据合并) ---
+    def load_watermarks(self):
+        with self._lock:
+            watermarks = dict(self._conn.execute("SELECT uid, latest_id FROM watermarks").fetchall()); watermarks.update(self._pending_watermarks)
+        return watermarks
+
+    def load_unames(self):
+        with self._lock:
+            unames = dict(self._conn.execute("SELECT uid, uname FROM unames").fetchall()); unames.update(self._pending_unames)
+        return unames
+
+    def load_recent_processed(self, uids, limit):
+        """按 UID 返回数值最大的 limit 个已处理动态 ID (整数，从大到小)，用于恢复有界去重窗口"""
+        uids = list(uids); wanted = set(uids); recent = {}
+        with self._lock:
+            for i in range(0, len(uids), 500):
+                chunk = uids[i:i + 500]
+                rows = self._conn.execute(f"SELECT uid, dynamic_id FROM (SELECT uid, dynamic_id, ROW_NUMBER() OVER (PARTITION BY uid ORDER BY CAST(dynamic_id AS INTEGER) DESC) AS rn FROM processed WHERE uid IN ({','.join('?' * len(chunk))})) WHERE rn <= ?", chunk + [limit]).fetchall()
+                for uid, dynamic_id in rows: recent.setdefault(uid, set()).add(int(dynamic_id))
+            for dynamic_id, (uid, _) in self._pending_processed.items():
+                if uid in wanted: recent.setdefault(uid, set()).add(int(dynamic_id))
+        return {uid: sorted(ids, reverse=True)[:limit] for uid, ids in recent.items()}
+
+    def load_backfill_checkpoint(self, uid):
+        """返回 (next_offset, done)，没有断点时返回 None"""
+        with self._lock:
+            pending = self._pending_backfill.get(str(uid))
+            if pending: return pending
+            row = self._conn.execute("SELECT next_offset, done FROM backfill WHERE uid = ?", (str(uid),)).fetchone()
+        return (row[0], bool(row[1])) if row else None
+
+    def load_like_queue(self):
+        """返回未完成的点赞队列 [(dynamic_id, uid, priority, enqueued_at, pub_ts)]，按入队时间排序"""
+        with self._lock:
+            rows = {row[0]: row[1:] for row in self._conn.execute("SELECT dynamic_id, uid, priority, enqueued_at, pub_ts FROM like_queue").fetchall()}
+            for dynamic_id, row in self._pending_like_queue.items():
+                if row is None: rows.pop(dynamic_id, None)
+                else: rows[dynamic_id] = row
+        return sorted(((dynamic_id,) + row for dynamic_id, row in rows.items()), key=lambda row: row[3])
+
+    # --- 写入 (缓冲) ---
+    def set_watermark(self, uid, latest_id):
+        with self._lock: self._pending_watermarks[str(uid)] = str(latest_id)
+        self._maybe_flush()
+
+    def set_uname(self, uid, uname):
+        with self._lock: self._pending_unames[str(uid)] = uname
+        self._maybe_flush()
+
+    def mark_processed(self, dynamic_id, uid, liked=False):
+        with self._lock:
+            previous = self._pending_processed.get(str(dynamic_id))
+            self._pending_processed[str(dynamic_id)] = (str(uid), 1 if liked or (previous and previous[1]) else 0)
+        self._maybe_flush()
+
+    def mark_liked(self, dynamic_id, uid):
+        self.mark_processed(dynamic_id, uid, liked=True)
+
+    def set_backfill_checkpoint(self, uid, next_offset, done=False):
+        with self._lock: self._pending_backfill[str(uid)] = (str(next_offset or ""), bool(done))
+        self._maybe_flush()
+
+    def enqueue_like(self, dynamic_id, uid, priority, enqueued_at, pub_ts=0):
+        with self._lock: self._pending_like_queue[str(dynamic_id)] = (str(uid), int(priority), float(enqueued_at), int(pub_ts or 0))
+        self._maybe_flush()
+
+    def dequeue_like(self, dynamic_id):
+        with self._lock: self._pending_like_queue[str(dynamic_id)] = None
+        self._maybe_flush()
+
+    def keep_processed(self, window):
+        """processed 表每个 UID 至少保留 window 条 (引擎按 dedup_window 调用，多个引擎共用时取最大值)"""
+        with self._lock: self.processed_window = max(self.processed_window or 0, int(window))
+
+    def _maybe_flush(self):
+        pending = len(self._pending_watermarks) + len(self._pending_processed) + len(self._pending_unames) + len(self._pending_backfill) + len(self._pending_like_queue)
+        if pending >= self.flush_every or time.monotonic() - self._last_flush >= self.flush_interval: self.flush()
+
+    def flush(self):
+        """在一个事务中写入所有缓冲的变更"""
+        with self._lock:
+            watermarks, processed, unames, backfill, like_queue = self._pending_watermarks, self._pending_processed, self._pending_unames, self._pending_backfill, self._pending_like_queue
+            self._last_flush = time.monotonic()
+            if not (watermarks or processed or unames or backfill or like_queue): return
+            self._pending_watermarks, self._pending_processed, self._pending_unames, self._pending_backfill, self._pending_like_queue = {}, {}, {}, {}, {}
+            now = time.time()
+            with self._conn:
+                self._conn.executemany("INSERT INTO watermarks (uid, latest_id, updated_at) VALUES (?, ?, ?) ON CONFLICT(uid) DO UPDATE SET latest_id = excluded.latest_id, updated_at = excluded.updated_at",
+                                       [(uid, latest_id, now) for uid, latest_id in watermarks.items()])
+                self._conn.executemany("INSERT INTO processed (dynamic_id, uid, liked, updated_at) VALUES (?, ?, ?, ?) ON CONFLICT(dynamic_id) DO UPDATE SET liked = MAX(liked, excluded.liked), updated_at = excluded.updated_at",
+                                       [(dynamic_id, uid, liked, now) for dynamic_id, (uid, liked) in processed.items()])
+                if self.processed_window:  # 只清理本批写入过的 UID，每个 UID 的行数保持在 processed_window 以内
+                    self._conn.executemany("DELETE FROM processed WHERE uid = ? AND dynamic_id IN (SELECT dynamic_id FROM processed WHERE uid = ? ORDER BY CAST(dynamic_id AS INTEGER) DESC LIMIT -1 OFFSET ?)",
+                                           [(uid, uid, self.processed_window) for uid in {uid for uid, _ in processed.values()}])
+                self._conn.executemany("INSERT INTO unames (uid, uname, updated_at) VALUES (?, ?, ?) ON CONFLICT(uid) DO UPDATE SET uname = excluded.uname, updated_at = excluded.updated_at",
+                                       [(uid, uname, now) for uid, uname in unames.items()])
+                self._conn.executemany("INSERT INTO backfill (uid, next_offset, done, updated_at) VALUES (?, ?, ?, ?) ON CONFLICT(uid) DO UPDATE SET next_offset = excluded.next_offset, done = excluded.done, updated_at = excluded.updated_at",
+                                       [(uid, next_offset, int(done), now) for uid, (next_offset, done) in backfill.items()])
+                self._conn.executemany("INSERT INTO like_queue (dynamic_id, uid, priority, enqueued_at, pub_ts) VALUES (?, ?, ?, ?, ?) ON CONFLICT(dynamic_id) DO UPDATE SET priority = excluded.priority",
+                                       [(dynamic_id,) + row for dynamic_id, row in like_queue.items() if row is not None])
+                self._conn.executemany("DELETE FROM like_queue WHERE dynamic_id = ?", [(dynamic_id,) for dynamic_id, row in like_queue.items() if row is None])
+
+    def close(self):
+        try: self.flush()
+        finally:
+            with self._lock: self._conn.close()
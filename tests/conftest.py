@@ -0,0 +1,8 @@
+# conftest.py
+# -*- coding: utf-8 -*-
+# 模块都在仓库根目录 (平铺布局)，测试从 tests/ 运行时把根目录加入导入路径
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
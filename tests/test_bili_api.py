@@ -0,0 +1,70 @@
+# test_bili_api.py
+# -*- coding: utf-8 -*-
+# bili_api 针对本地模拟服务器 (mock_server.py) 的回归测试
+
+import queue
+import threading
+import time
+
+import pytest
+
+import bili_api
+from mock_server import MOCK_CSRF, MOCK_IMG_KEY, MOCK_SUB_KEY, MockBiliServer, mock_session
+import rate_limit
+from rate_limit import RateLimiter
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    """替换共享限流器：冷却很短，测试不受其他用例留下的熔断状态影响"""
+    limiter = RateLimiter(cooldown=0.05, max_cooldown=0.2); monkeypatch.setattr(rate_limit, "rate_limiter", limiter)
+    return limiter
+
+
+@pytest.fixture
+def server():
+    server = MockBiliServer(seed=1).start()
+    yield server
+    server.stop()
+
+
+def test_like_http412_opens_breaker(server, limiter):
+    server.inject_http412 = 1.0; log_queue = queue.Queue(); dynamic_id = server.state.publish("100")[0]
+    assert not bili_api.like_dynamic(mock_session(server), dynamic_id, MOCK_CSRF, log_queue, threading.Event(), verify=False)
+    messages = [log_queue.get_nowait()["message"] for _ in range(log_queue.qsize())]
+    assert limiter.trips >= 1 and limiter.last_trip_code == "HTTP 412"
+    assert any("Status=412" in message for message in messages) and not any("Status=N/A" in message for message in messages)
+
+
+def test_like_succeeds_without_injection(server, limiter):
+    dynamic_id = server.state.publish("100")[0]
+    assert bili_api.like_dynamic(mock_session(server), dynamic_id, MOCK_CSRF, queue.Queue(), threading.Event())
+    assert dynamic_id in server.state.liked and limiter.trips == 0
+
+
+def test_cookie_check_reports_http412(server, limiter):
+    server.routes[("GET", "/x/web-interface/nav")] = lambda handler, query: handler._send_json({"code": -412, "message": "请求被拦截"}, status=412)
+    assert not bili_api.check_cookie_valid(mock_session(server))
+    assert limiter.trips == 1 and limiter.last_trip_code == "HTTP 412"
+
+
+def test_cookie_check_stops_while_breaker_open(server, monkeypatch):
+    limiter = RateLimiter(cooldown=60.0); monkeypatch.setattr(rate_limit, "rate_limiter", limiter)
+    limiter.record_limited("fetch", -412); stop_event = threading.Event(); stop_event.set()
+    assert not bili_api.check_cookie_valid(mock_session(server), stop_event=stop_event)
+    assert server.request_counts.get("/x/web-interface/nav") is None
+
+
+def test_wbi_signer_invalidates_only_current_keys(server, limiter):
+    """只有当前 generation 的失效报告生效：软失效继续返回旧 Keys 并在后台刷新，硬失效丢弃 Keys，同一批被拒的请求只触发一次刷新"""
+    limiter.configure("nav", 100.0, capacity=10); session = mock_session(server); signer = bili_api.WbiSigner()
+    keys = signer.keys(session); generation = keys[3]
+    assert keys[:2] == (MOCK_IMG_KEY, MOCK_SUB_KEY) and signer.refresh_count == 1
+    assert signer.invalidate(generation - 1) is False and signer.keys(session) == keys
+    assert signer.invalidate(generation, hard=False) is True and signer.keys(session) == keys
+    deadline = time.monotonic() + 5
+    while signer.refresh_count < 2 and time.monotonic() < deadline: time.sleep(0.01)
+    assert signer.refresh_count == 2 and signer.generation == generation  # Keys 没有变化，generation 不变
+    assert signer.invalidate(generation) is True and signer.invalidate(generation) is False
+    new_keys = signer.keys(session)
+    assert new_keys[:3] == keys[:3] and new_keys[3] > generation and signer.refresh_count == 3
@@ -0,0 +1,16 @@
+# test_dedup_index.py
+# -*- coding: utf-8 -*-
+# 按 UID 划分的去重索引的单元测试
+
+from dedup_index import UidDedupIndex
+
+
+def test_window_evicts_oldest_ids():
+    """每个 UID 最多保留 window 个 ID，超出时丢弃数值最小的；窗口外的旧 ID 由水位线挡住"""
+    index = UidDedupIndex(window=3)
+    for dynamic_id in (50, 10, 40, 30): assert index.add("100", dynamic_id)
+    assert not index.add("100", 40) and len(index) == 3
+    assert not index.seen("100", 10) and all(index.seen("100", dynamic_id) for dynamic_id in (30, 40, 50))
+    index.set_watermark("100", 50)
+    assert not index.is_new("100", 10) and not index.is_new("100", 50) and index.is_new("100", 60)
+    assert index.add("200", 10) and index.seen("200", 10) and len(index) == 4  # 各 UID 的窗口互不影响
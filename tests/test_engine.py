@@ -0,0 +1,46 @@
+# test_engine.py
+# -*- coding: utf-8 -*-
+# LikerEngine 针对本地模拟服务器的测试：停止/重启时的状态持久化
+
+import threading
+
+import pytest
+
+from engine import LikerEngine
+from like_queue import FRESH
+from mock_server import MOCK_CSRF, MockBiliServer, mock_session
+import rate_limit
+from rate_limit import RateLimiter
+from state_store import StateStore
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(rate_limit, "rate_limiter", RateLimiter({name: (1000.0, 1000) for name in ("fetch", "like", "detail", "nav")}))
+    server = MockBiliServer(initial_posts=5, seed=4).start()
+    yield server
+    server.stop()
+
+
+def test_stop_mid_round_keeps_new_post(server, tmp_path):
+    """监控轮次中途停止：已前移的水位线与新动态的点赞队列条目一起落盘，新动态不会丢失"""
+    path = str(tmp_path / "state.db"); stop_event = threading.Event(); new_ids = []
+
+    def on_progress(uid, latest_id=None, **fields):
+        if not new_ids and latest_id is None: return
+        if not new_ids: new_ids.extend(server.state.publish(uid)); return  # Phase 1 完成后发布一条新动态
+        if latest_id is not None and str(latest_id) == new_ids[0]: stop_event.set()  # 本轮发现新动态后立即停止
+
+    store = StateStore(path, flush_every=1000, flush_interval=3600)
+    engine = LikerEngine(mock_session(server), MOCK_CSRF, None, stop_event, state_store=store, on_progress=on_progress)
+    engine.like_delay = (0, 0)
+    thread = threading.Thread(target=engine.run, args=(["100"], 5, 0.2)); thread.start(); thread.join(timeout=30)
+    assert not thread.is_alive() and new_ids
+    store.close()
+
+    restored = StateStore(path)
+    try:
+        assert restored.load_watermarks()["100"] == new_ids[0]
+        queued = {row[0]: row[2] for row in restored.load_like_queue()}
+        assert queued.get(new_ids[0]) == FRESH or new_ids[0] in server.state.liked  # 仍在队列中，或停止前已点赞
+    finally: restored.close()
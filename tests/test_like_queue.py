@@ -0,0 +1,119 @@
+# test_like_queue.py
+# -*- coding: utf-8 -*-
+# 点赞队列/点赞线程与回溯入队的测试
+
+import threading
+import time
+
+import pytest
+
+import bili_api
+from backfill import Backfiller
+from engine import LikerEngine
+from like_queue import LikeQueue, LikeWorker
+from mock_server import MOCK_CSRF, MockBiliServer, mock_session
+import rate_limit
+from rate_limit import RateLimiter
+from state_store import StateStore
+
+
+class ListLog:
+    """只收集日志文本的 log_queue"""
+
+    def __init__(self): self.messages = []
+    def put(self, entry, block=True, timeout=None): self.messages.append(entry["message"])
+
+
+def _run_worker(like_queue, like_func, initial_budget=None, until=None, timeout=5.0):
+    stop_event = threading.Event(); worker = LikeWorker(like_queue, like_func, stop_event=stop_event, like_delay=(0, 0), initial_budget=initial_budget).start()
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and not (until() if until else like_queue.unfinished() == 0): time.sleep(0.01)
+    stop_event.set(); worker.join(timeout=2)
+    return worker
+
+
+def test_fresh_before_backlog():
+    like_queue = LikeQueue()
+    like_queue.put("1", "10", fresh=False); like_queue.put("2", "10", fresh=False); like_queue.put("3", "10", fresh=True)
+    assert like_queue.put("2", "10", fresh=True) is False  # 已排队的积压提升为新动态，不算新条目
+    order = [like_queue.get(timeout=0)[0] for _ in range(3)]
+    assert order == ["3", "2", "1"] and like_queue.get(timeout=0) is None
+
+
+def test_backlog_budget_limits_successful_likes():
+    like_queue = LikeQueue(); liked = []
+    for index in range(5): like_queue.put(str(index), "10", fresh=False)
+    like_queue.put("100", "10", fresh=True)
+    worker = _run_worker(like_queue, lambda dynamic_id, uid: liked.append(dynamic_id) or True, initial_budget=2)
+    assert liked == ["100", "0", "1"]  # 新动态不受初始额度限制
+    assert (worker.liked_fresh, worker.liked_backlog, worker.dropped) == (1, 2, 3)
+
+
+def test_failed_backlog_likes_do_not_use_budget():
+    like_queue = LikeQueue(); attempts = []
+    for index in range(4): like_queue.put(str(index), "10", fresh=False)
+    worker = _run_worker(like_queue, lambda dynamic_id, uid: attempts.append(dynamic_id) or dynamic_id != "0", initial_budget=2)
+    assert attempts == ["0", "1", "2"] and (worker.liked_backlog, worker.failed, worker.dropped) == (2, 1, 1)
+
+
+def test_requeue_on_stop(tmp_path):
+    path = str(tmp_path / "state.db"); store = StateStore(path); like_queue = LikeQueue(store)
+    like_queue.put("1", "10", fresh=False, pub_ts=123); like_queue.put("2", "10", fresh=False)
+    stop_event = threading.Event()
+
+    def like_func(dynamic_id, uid):
+        stop_event.set(); return False  # 点赞过程中被停止
+
+    worker = LikeWorker(like_queue, like_func, stop_event=stop_event, like_delay=(0, 0)).start(); worker.join(timeout=2)
+    assert worker.failed == 0; store.close()
+    restored = StateStore(path)
+    try: assert [(row[0], row[4]) for row in restored.load_like_queue()] == [("1", 123), ("2", 0)]
+    finally: restored.close()
+
+
+def test_backlog_capacity():
+    like_queue = LikeQueue(); stop_event = threading.Event()
+    worker = LikeWorker(like_queue, lambda dynamic_id, uid: True, stop_event=stop_event, initial_budget=3)
+    like_queue.put("1", "10", fresh=False); like_queue.put("2", "10", fresh=False); like_queue.put("3", "10", fresh=True)
+    assert worker.wait_backlog_capacity()  # 积压 2 条 < 剩余额度 3
+    like_queue.put("4", "10", fresh=False); stop_event.set()
+    assert not worker.wait_backlog_capacity()  # 额度已被排队中的积压占满，停止时不再等待
+    worker.liked_backlog = 3; stop_event.clear()
+    assert not worker.wait_backlog_capacity()  # 额度用完
+    assert LikeWorker(like_queue, lambda dynamic_id, uid: True).wait_backlog_capacity()  # 不限额度
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(rate_limit, "rate_limiter", RateLimiter({name: (1000.0, 1000) for name in ("fetch", "like", "detail", "nav")}))
+    server = MockBiliServer(initial_posts=40, page_size=12, seed=2).start()
+    yield server
+    server.stop()
+
+
+def test_backfiller_enqueues_backlog_and_checkpoints(server, tmp_path):
+    store = StateStore(str(tmp_path / "state.db")); like_queue = LikeQueue(store); session = mock_session(server)
+    _, second_page, _, _ = bili_api.get_up_dynamics(session, "100", "", None, threading.Event())
+    backfiller = Backfiller(session, lambda record, uid: like_queue.put(record.dynamic_id, uid, False, record.pub_ts), state_store=store, page_delay=(0, 0))
+    assert backfiller.run_uid("100", second_page, max_items=15) == 15
+    assert like_queue.counts() == {"fresh": 0, "backlog": 15}
+    next_offset, done = store.load_backfill_checkpoint("100")
+    assert not done and next_offset  # 第二页全部入队，断点停在第三页
+    assert backfiller.run_uid("100", next_offset) == 13  # 重新处理断点所在页时，已在队列中的 3 条不重复入队
+    assert like_queue.counts()["backlog"] == 28 and store.load_backfill_checkpoint("100")[1]  # 首页以外的 28 条全部入队，回溯完成
+    store.close()
+
+
+def test_backfill_does_not_delay_monitoring(server):
+    """回溯在后台入队，引擎直接进入 Phase 2；积压点赞数受初始额度限制"""
+    log_queue = ListLog(); stop_event = threading.Event()
+    engine = LikerEngine(mock_session(server), MOCK_CSRF, log_queue, stop_event, backfill=True, verify_mode="deferred"); engine.like_delay = (0, 0)
+    thread = threading.Thread(target=engine.run, args=(["100"], 20, 60.0)); thread.start()
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline and not (engine.like_worker and engine.like_worker.liked_backlog >= 20): time.sleep(0.05)
+    stop_event.set(); thread.join(timeout=10)
+    messages = log_queue.messages
+    phase2 = next(index for index, message in enumerate(messages) if "Phase 2" in message)
+    backfill_done = next(index for index, message in enumerate(messages) if "回溯完成" in message or "回溯中断" in message)
+    assert phase2 < backfill_done
+    assert engine.like_worker.liked_backlog == 20 and len(server.state.liked) == 20
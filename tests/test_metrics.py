@@ -0,0 +1,15 @@
+# test_metrics.py
+# -*- coding: utf-8 -*-
+# 指标导出的测试
+
+from metrics import MetricsRegistry
+
+
+def test_unbounded_labels_merged_on_metrics_endpoint():
+    """render_labels=False 的直方图在 /metrics 只导出一条合并序列，JSON 快照仍保留每个标签值的分位数"""
+    registry = MetricsRegistry(); histogram = registry.histogram("freshness_seconds", "时效", ("uid",), buckets=(10, 60), render_labels=False)
+    histogram.observe(5, uid="1"); histogram.observe(30, uid="2")
+    text = registry.render_prometheus()
+    assert 'uid="' not in text and 'freshness_seconds_bucket{le="60.0"} 2' in text and "freshness_seconds_count 2" in text
+    snapshot = registry.snapshot()["metrics"]["freshness_seconds"]
+    assert [sample["labels"] for sample in snapshot["samples"]] == [{"uid": "1"}, {"uid": "2"}] and snapshot["overall"]["count"] == 2
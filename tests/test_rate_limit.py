@@ -0,0 +1,50 @@
+# test_rate_limit.py
+# -*- coding: utf-8 -*-
+# 限流器的单元测试：熔断器状态转换、会话绑定与分片模式的远程限流代理
+
+import queue
+import threading
+
+import rate_limit
+from engine import LikerEngine
+from mock_server import MOCK_CSRF, MockBiliServer, mock_session
+from rate_limit import CLOSED, HALF_OPEN, OPEN, RateLimiter
+from sharded import RemoteRateLimiter
+
+
+def test_breaker_open_half_open_closed():
+    """-412 打开熔断器；冷却结束后只放行一个探测请求，探测失败冷却加倍，探测成功关闭并恢复冷却时间；-509 只降速不熔断"""
+    now = [0.0]; limiter = RateLimiter(cooldown=10.0, probe_timeout=5.0, clock=lambda: now[0])
+    assert limiter.record_limited("fetch", -509) is False and limiter.breaker_state == CLOSED and limiter.buckets["fetch"].rate == 1.0
+    assert limiter.record_limited("fetch", -412) is True and limiter.breaker_state == OPEN and limiter.state()["open_remaining"] == 10.0
+    now[0] = 10.0
+    assert limiter.acquire("like") and limiter.breaker_state == HALF_OPEN
+    stop_event = threading.Event(); threading.Timer(0.3, stop_event.set).start()
+    assert limiter.acquire("fetch", stop_event) is False  # 探测进行中，其他请求等待
+    assert limiter.record_limited("like", -412) is True and limiter.breaker_state == OPEN and limiter.cooldown == 20.0 and limiter.trips == 2
+    now[0] = 30.0
+    assert limiter.acquire("fetch") and limiter.breaker_state == HALF_OPEN
+    assert limiter.record_success("fetch") is True and limiter.breaker_state == CLOSED and limiter.cooldown == 10.0
+
+
+def test_engine_binds_limiter_to_session():
+    """传给 LikerEngine 的限流器绑定到会话：bili_api 请求与 configure()/summary() 都使用它，共享的 rate_limiter 不受影响"""
+    server = MockBiliServer(initial_posts=3, seed=5).start()
+    try:
+        limiter = RateLimiter({name: (1000.0, 1000) for name in ("fetch", "like", "detail", "nav")}); shared_granted = rate_limit.rate_limiter.buckets["fetch"].granted
+        engine = LikerEngine(mock_session(server), MOCK_CSRF, queue.Queue(), fetch_concurrency=2, fetch_rps=500.0, rate_limiter=limiter)
+        assert engine.rate_limiter is limiter and limiter.buckets["fetch"].max_rate == 500.0
+        results = engine.fetcher.scan_uids_blocking(["100", "200"]); engine.fetcher.close()
+        assert all(items is not None for items, _, _, _ in results.values())
+        assert limiter.buckets["fetch"].granted >= 2 and rate_limit.rate_limiter.buckets["fetch"].granted == shared_granted
+    finally: server.stop()
+
+
+def test_remote_limiter_discards_stale_reply():
+    """因停止而放弃的申请，其迟到的回复不会被下一次申请当作自己的结果"""
+    to_coordinator = queue.Queue(); replies = queue.Queue(); limiter = RemoteRateLimiter(0, to_coordinator, replies); stop_event = threading.Event(); stop_event.set()
+    assert limiter.acquire("fetch", stop_event) is False
+    _, _, _, stale_id = to_coordinator.get_nowait()
+    replies.put((stale_id, True)); replies.put((stale_id + 1, False))  # 协调进程先回复已放弃的申请，再回复新申请
+    assert limiter.acquire("fetch") is False
+    assert to_coordinator.get_nowait() == ("acquire", 0, "fetch", stale_id + 1)
@@ -0,0 +1,32 @@
+# test_scheduler.py
+# -*- coding: utf-8 -*-
+# 自适应轮询调度的单元测试
+
+import pytest
+
+from scheduler import AdaptivePollScheduler
+
+NOW = 100000.0
+
+
+def _scheduler(min_interval=1.0, max_interval=1e6):
+    scheduler = AdaptivePollScheduler(60.0, min_interval, max_interval, jitter=0.0, clock=lambda: NOW)
+    scheduler.add("busy"); scheduler.add("quiet")
+    scheduler.observe("busy", [NOW - 100 * (index + 1) for index in range(20)])    # 20 条 / 2000 秒
+    scheduler.observe("quiet", [NOW - 1600 * (index + 1) for index in range(20)])  # 20 条 / 32000 秒，频率为 busy 的 1/16
+    return scheduler
+
+
+def test_intervals_follow_sqrt_rate_within_budget():
+    """检查间隔与 sqrt(发帖频率) 成反比，总请求速率与固定间隔模式 (每 base_interval 秒各查一次) 相同"""
+    scheduler = _scheduler()
+    assert scheduler.interval("quiet") / scheduler.interval("busy") == pytest.approx(4.0)
+    assert 1 / scheduler.interval("busy") + 1 / scheduler.interval("quiet") == pytest.approx(2 / 60.0)
+    assert scheduler.pop_due(NOW + scheduler.interval("busy")) == ["busy"] and scheduler.pop_due(NOW + scheduler.interval("quiet")) == ["quiet"]
+
+
+def test_intervals_clamped_to_bounds():
+    """不受限时分别为 37.5 与 150 秒，被限制到 [min_interval, max_interval]"""
+    scheduler = _scheduler(min_interval=40.0, max_interval=90.0)
+    assert scheduler.interval("busy") == 40.0 and scheduler.interval("quiet") == 90.0
+    assert scheduler.time_until_next() == pytest.approx(40.0)
@@ -0,0 +1,42 @@
+# test_state_store.py
+# -*- coding: utf-8 -*-
+# 状态库测试
+
+from state_store import StateStore, account_state_path
+
+
+def test_account_state_path():
+    assert account_state_path("bili_state.db", "12345") == "bili_state_12345.db"
+    assert account_state_path("data/state", 7) == "data/state_7.db"
+    assert account_state_path("bili_state.db", None) is None and account_state_path("bili_state.db", "abc") is None
+
+
+def test_accounts_do_not_share_state(tmp_path):
+    first = StateStore(account_state_path(str(tmp_path / "bili_state.db"), "1"))
+    first.set_watermark("100", "900"); first.mark_processed("900", "100"); first.enqueue_like("900", "100", 1, 0.0); first.close()
+    second = StateStore(account_state_path(str(tmp_path / "bili_state.db"), "2"))
+    try: assert second.load_watermarks() == {} and second.load_like_queue() == [] and second.load_recent_processed(["100"], 10) == {}
+    finally: second.close()
+
+
+def test_processed_pruned_to_window(tmp_path):
+    """落盘时每个 UID 的 processed 行只保留数值最大的 window 条，其他 UID 不受影响"""
+    store = StateStore(str(tmp_path / "state.db")); store.keep_processed(3)
+    try:
+        for dynamic_id in (95, 100, 1000, 990, 80): store.mark_processed(str(dynamic_id), "100")
+        store.mark_processed("7", "200"); store.flush()
+        assert store._conn.execute("SELECT COUNT(*) FROM processed WHERE uid = '100'").fetchone()[0] == 3
+        assert store.load_recent_processed(["100", "200"], 10) == {"100": [1000, 990, 100], "200": [7]}
+    finally: store.close()
+
+
+def test_loads_include_pending_writes(tmp_path):
+    """尚未落盘的水位线、昵称与已处理动态在读取时与已落盘的数据合并"""
+    store = StateStore(str(tmp_path / "state.db"), flush_every=1000, flush_interval=3600)
+    try:
+        store.set_watermark("100", "900"); store.mark_processed("900", "100"); store.flush()
+        store.set_watermark("100", "950"); store.set_watermark("200", "50"); store.set_uname("100", "UP"); store.mark_processed("950", "100"); store.mark_processed("50", "200")
+        assert store.load_watermarks() == {"100": "950", "200": "50"} and store.load_unames() == {"100": "UP"}
+        assert store.load_recent_processed(["100", "200"], 10) == {"100": [950, 900], "200": [50]}
+        assert store.load_recent_processed(["100"], 1) == {"100": [950]}
+    finally: store.close()
@@ -0,0 +1,35 @@
+# uid_import.py
+# -*- coding: utf-8 -*-
+# 批量导入目标 UID：从粘贴的文本或文件中解析 UID，或拉取登录账号的关注列表。GUI 与命令行 (python -m engine) 共用。
+
+import re
+
+from bili_api import _log_message, get_followings
+
+_SEPARATORS = re.compile(r"[\s,，;；、|]+")
+_SPACE_URL = re.compile(r"[^\s,，;；、|]*space\.bilibili\.com/(\d+)[^\s,，;；、|]*")
+
+
+def parse_uids(text):
+    """从任意分隔 (空白、逗号、分号) 的文本中提取 UID，支持 # 注释与个人空间链接。
+    返回 (UID 列表 (按出现顺序去重), 无法识别的片段列表)"""
+    uids = {}; invalid = []
+    for line in text.splitlines():
+        line = _SPACE_URL.sub(r"\1", line.split('#', 1)[0])
+        for token in _SEPARATORS.split(line):
+            if not token: continue
+            if token.isdigit() and int(token) > 0: uids.setdefault(token, None)
+            else: invalid.append(token)
+    return list(uids), invalid
+
+
+def read_uid_file(path):
+    """读取 UID 文件：每行一个或多个 UID，# 开头为注释；无法识别的片段忽略"""
+    with open(path, encoding='utf-8-sig') as f: return parse_uids(f.read())[0]
+
+
+def following_uids(session, log_queue=None, stop_event=None):
+    """登录账号关注的全部 UP 主，返回 [(uid, 昵称)]；未登录或请求失败返回 None"""
+    mid = session.cookies.get('DedeUserID')
+    if not mid: _log_message(log_queue, "获取关注列表失败: Cookie 中没有 DedeUserID，请重新登录。"); return None
+    return get_followings(session, mid, log_queue, stop_event)